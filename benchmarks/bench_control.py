@@ -0,0 +1,48 @@
+"""benchmark TaskControl initialization (task-graph construction)
+
+usage: python benchmarks/bench_control.py [NUM_TASKS]
+"""
+
+import sys
+import time
+
+from doit.task import Task
+from doit.control import TaskControl
+
+
+def make_tasks(num_tasks):
+    """tasks in groups of 100, every task in a group depends (file_dep)
+    on all targets of previous group and (wild-card) on tasks of the group
+    """
+    tasks = []
+    for num in range(num_tasks):
+        group = num // 100
+        file_dep = ['g{}_{}.out'.format(group - 1, i) for i in range(100)
+                    if group > 0]
+        task_dep = ['g{}_*'.format(group - 1)] if group > 0 else []
+        tasks.append(Task('g{}_{}'.format(group, num % 100), None,
+                          file_dep=file_dep, task_dep=task_dep,
+                          targets=['g{}_{}.out'.format(group, num % 100)]))
+    return tasks
+
+
+def main(num_tasks):
+    start = time.perf_counter()
+    tasks = make_tasks(num_tasks)
+    print('{} tasks'.format(num_tasks))
+    print('{:<30} {:8.3f}s'.format('create tasks',
+                                   time.perf_counter() - start))
+
+    start = time.perf_counter()
+    control = TaskControl(tasks)
+    print('{:<30} {:8.3f}s'.format('TaskControl init',
+                                   time.perf_counter() - start))
+
+    start = time.perf_counter()
+    control.process(['g1_*', 'g{}_0.out'.format((num_tasks - 1) // 100)])
+    print('{:<30} {:8.3f}s'.format('process selection',
+                                   time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,48 @@
+"""benchmark memory used by TaskDispatcher nodes (ExecNode)
+
+usage: python benchmarks/bench_dispatcher.py [NUM_TASKS] [DEPTH]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from doit.task import Task
+from doit.control import TaskControl
+
+
+def make_tasks(num_tasks, depth):
+    """chains of `depth` tasks, each task depends on the next one"""
+    tasks = []
+    for num in range(num_tasks):
+        task_dep = []
+        if (num + 1) % depth:
+            task_dep.append('t{}'.format(num + 1))
+        tasks.append(Task('t{}'.format(num), None, task_dep=task_dep))
+    return tasks
+
+
+def main(num_tasks, depth):
+    control = TaskControl(make_tasks(num_tasks, depth))
+    control.process(None)
+    print('{} tasks, dependency chains of {} tasks'.format(num_tasks, depth))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    dispatcher = control.task_dispatcher()
+    # create nodes for all tasks, following dependency chains
+    for name in control._def_order:
+        node = None
+        while name is not None and name not in dispatcher.nodes:
+            node = dispatcher._gen_node(node, name)
+            name = node.task.task_dep[0] if node.task.task_dep else None
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:<30} {:8.3f}s'.format('create nodes', elapsed))
+    print('{:<30} {:8.1f}MB'.format('peak memory', peak / 2**20))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
@@ -0,0 +1,51 @@
+"""benchmark task-creators discovery and task loading from a dodo file
+
+usage: python benchmarks/bench_loader.py [NUM_CREATORS]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import importlib
+
+from doit import loader
+
+
+def write_dodo(path, num_creators):
+    """write a dodo file with `num_creators` task-creators"""
+    with open(path, 'w') as dodo:
+        for num in range(num_creators):
+            dodo.write('def task_t{0}():\n'
+                       '    """task {0}"""\n'
+                       '    return {{"actions": ["echo {0}"]}}\n\n'.format(num))
+
+
+def measure(label, func, repeat=3):
+    """print best time of `repeat` executions"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('{:<30} {:8.3f}s'.format(label, best))
+
+
+def main(num_creators):
+    tmp_dir = tempfile.mkdtemp()
+    write_dodo(os.path.join(tmp_dir, 'dodo_bench.py'), num_creators)
+    sys.path.insert(0, tmp_dir)
+    start = time.perf_counter()
+    module = importlib.import_module('dodo_bench')
+    print('{:<30} {:8.3f}s'.format('import dodo', time.perf_counter() - start))
+
+    namespace = dict(vars(module))
+    print('{} task-creators'.format(num_creators))
+    measure('discover task-creators',
+            lambda: loader._get_task_creators(namespace, ()))
+    measure('load tasks', lambda: loader.load_tasks(namespace))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
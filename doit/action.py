@@ -3,6 +3,9 @@
 
 import os
 import subprocess, sys
+import codecs
+import tempfile
+from collections import deque
 from io import StringIO
 import inspect
 from pathlib import PurePath
@@ -10,6 +13,11 @@ from threading import Thread
 
 from .exceptions import InvalidTask, TaskFailed, TaskError
 
+try:
+    import selectors
+except ImportError: # pragma: no cover
+    selectors = None # python 3.3
+
 
 def normalize_callable(ref):
     """return a list with (callabe, *args, **kwargs)
@@ -19,13 +27,191 @@ def normalize_callable(ref):
         return list(ref)
     return [ref, (), {}]
 
+# output capture
+CAPTURE_DEFAULT_SIZE = 64 # KB retained by 'tail' and 'file' policies
+
+def parse_capture(policy):
+    """parse an output capture policy
+
+    @param policy: (str) one of:
+        - 'all': keep whole output in memory (default)
+        - 'tail[:<KB>]': keep only the last KB of output
+        - 'file[:<KB>]': write whole output to a temporary file,
+                         keep only the last KB in memory
+        - 'none': discard output
+    @return (tuple) mode, max number of characters retained in memory
+                    (None if unlimited)
+    @raise ValueError: invalid policy
+    """
+    if policy is None:
+        return 'all', None
+    mode, sep, size = policy.partition(':')
+    if mode in ('all', 'none') and not sep:
+        return mode, (None if mode == 'all' else 0)
+    if mode in ('tail', 'file'):
+        if not sep:
+            return mode, CAPTURE_DEFAULT_SIZE * 1024
+        try:
+            kbytes = int(size)
+        except ValueError:
+            kbytes = -1
+        if kbytes >= 0:
+            return mode, kbytes * 1024
+    raise ValueError(
+        "Invalid capture policy '{}', expected one of: all, none, "
+        "tail[:<KB>], file[:<KB>]".format(policy))
+
+
+class TailCapture(object):
+    """capture stream that keeps only the last `size` characters written
+
+    @ivar discarded: (int) number of characters discarded
+    """
+    def __init__(self, size):
+        self.size = size
+        self.discarded = 0
+        self._chunks = deque()
+        self._length = 0 # total length of _chunks
+
+    def write(self, text):
+        self._chunks.append(text)
+        self._length += len(text)
+        # drop whole chunks not required to keep `size` characters
+        while self._chunks and self._length - len(self._chunks[0]) >= self.size:
+            dropped = self._chunks.popleft()
+            self._length -= len(dropped)
+            self.discarded += len(dropped)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        text = ''.join(self._chunks)
+        if len(text) > self.size:
+            self.discarded += len(text) - self.size
+            text = text[len(text) - self.size:]
+        self._chunks = deque([text]) if text else deque()
+        self._length = len(text)
+        return text
+
+
+class FileCapture(TailCapture):
+    """capture stream that writes whole output to a temporary file and
+    keeps only the last `size` characters in memory.
+
+    The file is created only when some output is written,
+    its path is available through `path` (None if no output).
+    """
+    def __init__(self, size):
+        TailCapture.__init__(self, size)
+        self.path = None
+        self._file = None
+
+    def write(self, text):
+        if not text:
+            return
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(prefix='doit-capture-')
+            self._file = open(fd, 'w', encoding='utf-8',
+                              errors='surrogatepass')
+        self._file.write(text)
+        TailCapture.write(self, text)
+
+    def getvalue(self):
+        """close file, return retained output"""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        return TailCapture.getvalue(self)
+
+
+def capture_stream(policy):
+    """create stream to capture the output of an action
+
+    @param policy: (str) see `parse_capture`
+    @return object with `write()` and `getvalue()` methods
+    """
+    mode, size = parse_capture(policy)
+    if mode == 'all':
+        return StringIO()
+    if mode == 'file':
+        return FileCapture(size)
+    return TailCapture(size)
+
+
+class OutputDecoder(object):
+    """decode process output incrementally
+
+    Decoded text is written to 'capture' and 'realtime' streams.
+    On line buffered mode only complete lines are written to 'realtime'.
+    """
+    def __init__(self, action, capture, realtime):
+        self.buffering = action.buffering
+        self.decoder = codecs.getincrementaldecoder(action.encoding)(
+            action.decode_error)
+        self.capture = capture
+        self.realtime = realtime
+        self.pending = '' # incomplete line not written to realtime
+
+    def feed(self, data):
+        """@param data: (bytes) process output, empty on EOF"""
+        text = self.decoder.decode(data, final=not data)
+        self.capture.write(text)
+        if not self.realtime:
+            return
+        if self.buffering:
+            lines = text
+        else:
+            self.pending += text
+            if data:
+                end = self.pending.rfind('\n') + 1
+                lines, self.pending = self.pending[:end], self.pending[end:]
+            else:
+                lines, self.pending = self.pending, ''
+        if lines:
+            self.realtime.write(lines)
+            self.realtime.flush() # required if on byte buffering mode
+
+
 # Actions
 class BaseAction(object):
-    """Base class for all actions"""
+    """Base class for all actions
+
+    @cvar capture: (str) output capture policy set by Task before
+                   executing the action, see `parse_capture`
+    """
 
     # must implement:
     # def execute(self, out=None, err=None)
 
+    capture = None
+
+    def _capture_streams(self):
+        """create streams to capture stdout and stderr
+        @return (tuple) out stream, err stream
+        """
+        output = capture_stream(self.capture)
+        errput = capture_stream(self.capture)
+        self._capture_out = output
+        self._capture_err = errput
+        return output, errput
+
+    @property
+    def out_file(self):
+        """(str) path of file with whole stdout (capture 'file')"""
+        return getattr(getattr(self, '_capture_out', None), 'path', None)
+
+    @property
+    def err_file(self):
+        """(str) path of file with whole stderr (capture 'file')"""
+        return getattr(getattr(self, '_capture_err', None), 'path', None)
+
+    def remove_capture_files(self):
+        """remove files with whole output (capture 'file')"""
+        for path in (self.out_file, self.err_file):
+            if path and os.path.exists(path):
+                os.remove(path)
+        self._capture_out = self._capture_err = None
+
     @staticmethod
     def _prepare_kwargs(task, func, args, kwargs):
         """
@@ -102,7 +288,14 @@ class CmdAction(BaseAction):
     @ivar decode_error (str): value for decode() `errors` param
                               while decoding process output
     @ivar pkwargs: Popen arguments except 'stdout' and 'stderr'
+    @ivar out_file: (str) path of file with whole stdout (capture 'file')
+    @ivar err_file: (str) path of file with whole stderr (capture 'file')
+
+    @cvar USE_SELECTOR: (bool) read process output using `selectors`,
+          otherwise use one thread per pipe (windows can not select pipes,
+          `selectors` is python 3.4+)
     """
+    USE_SELECTOR = (os.name == 'posix' and selectors is not None)
 
     def __init__(self, action, task=None, save_out=None, shell=True,
                  encoding='utf-8', decode_error='replace', buffering=0,
@@ -143,7 +336,7 @@ class CmdAction(BaseAction):
 
     def _print_process_output(self, process, input_, capture, realtime):
         """Reads 'input_' untill process is terminated.
-        Writes 'input_' content to 'capture' (string)
+        Writes 'input_' content to 'capture' (see `capture_stream`)
         and 'realtime' stream
         """
         if self.buffering:
@@ -172,13 +365,15 @@ class CmdAction(BaseAction):
         Execute command action
 
         both stdout and stderr from the command are captured and saved
-        on self.out/err. Real time output is controlled by parameters
+        on self.out/err (according to `capture` policy).
+        Real time output is controlled by parameters
         @param out: None - no real time output
                     a file like object (has write method)
         @param err: idem
         @return failure:
             - None: if successful
             - TaskError: If subprocess return code is greater than 125
+              or its output can not be decoded
             - TaskFailed: If subprocess return code isn't zero (and
         not greater than 125)
         """
@@ -188,50 +383,95 @@ class CmdAction(BaseAction):
             return TaskError(
                 "CmdAction Error creating command string", exc)
 
-        # set environ to change output buffering
-        env = None
-        if self.buffering:
-            env = os.environ.copy()
-            env['PYTHONUNBUFFERED'] = '1'
-
         # spawn task process
         process = subprocess.Popen(
             action,
             shell=self.shell,
             #bufsize=2, # ??? no effect use PYTHONUNBUFFERED instead
             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            env=env,
+            env=self.get_env(),
             **self.pkwargs)
 
-        output = StringIO()
-        errput = StringIO()
-        t_out = Thread(target=self._print_process_output,
-                       args=(process, process.stdout, output, out))
-        t_err = Thread(target=self._print_process_output,
-                       args=(process, process.stderr, errput, err))
-        t_out.start()
-        t_err.start()
-        t_out.join()
-        t_err.join()
-
-        self.out = output.getvalue()
-        self.err = errput.getvalue()
-        self.result = self.out + self.err
+        output, errput = self._capture_streams()
+        try:
+            if (out is None and err is None and
+                    parse_capture(self.capture)[0] == 'all'):
+                # nothing to display in real time and keep whole output
+                out_data, err_data = process.communicate()
+                output.write(out_data.decode(self.encoding,
+                                             self.decode_error))
+                errput.write(err_data.decode(self.encoding,
+                                             self.decode_error))
+            elif self.USE_SELECTOR:
+                self._pump_process_output(
+                    [(process.stdout, output, out),
+                     (process.stderr, errput, err)])
+            else:
+                t_out = Thread(target=self._print_process_output,
+                               args=(process, process.stdout, output, out))
+                t_err = Thread(target=self._print_process_output,
+                               args=(process, process.stderr, errput, err))
+                t_out.start()
+                t_err.start()
+                t_out.join()
+                t_err.join()
+        except UnicodeDecodeError as exc:
+            process.kill()
+            process.communicate()
+            return TaskError("CmdAction Error decoding output", exc)
 
         # make sure process really terminated
         process.wait()
+        return self.set_result(action, process.returncode,
+                               output.getvalue(), errput.getvalue())
+
+
+    def _pump_process_output(self, pipes):
+        """read output from all pipes until EOF on a single thread
+        @param pipes: list of tuple (pipe, capture, realtime)
+        """
+        read_size = self.buffering or 65536
+        with selectors.DefaultSelector() as selector:
+            for pipe, capture, realtime in pipes:
+                selector.register(pipe, selectors.EVENT_READ,
+                                  OutputDecoder(self, capture, realtime))
+            while selector.get_map():
+                for key, _ in selector.select():
+                    data = os.read(key.fd, read_size)
+                    key.data.feed(data)
+                    if not data:
+                        selector.unregister(key.fileobj)
+
+
+    def get_env(self):
+        """environ for the process, None to inherit from doit's process"""
+        # set environ to change output buffering
+        env = None
+        if self.buffering:
+            env = os.environ.copy()
+            env['PYTHONUNBUFFERED'] = '1'
+        return env
+
+
+    def set_result(self, action, returncode, out, err):
+        """save output of a terminated process and check its return code
+        @return failure: see execute
+        """
+        self.out = out
+        self.err = err
+        self.result = self.out + self.err
 
         # task error - based on:
         # http://www.gnu.org/software/bash/manual/bashref.html#Exit-Status
         # it doesnt make so much difference to return as Error or Failed anyway
-        if process.returncode > 125:
+        if returncode > 125:
             return TaskError("Command error: '%s' returned %s" %
-                             (action, process.returncode))
+                             (action, returncode))
 
         # task failure
-        if process.returncode != 0:
+        if returncode != 0:
             return TaskFailed("Command failed: '%s' returned %s" %
-                              (action, process.returncode))
+                              (action, returncode))
 
         # save stdout in values
         if self.save_out:
@@ -325,6 +565,8 @@ class PythonAction(BaseAction):
     @ivar args: (sequence)  Extra arguments to be passed to py_callable
     @ivar kwargs: (dict) Extra keyword arguments to be passed to py_callable
     @ivar task(Task): reference to task that contains this action
+    @ivar out_file: (str) path of file with whole stdout (capture 'file')
+    @ivar err_file: (str) path of file with whole stderr (capture 'file')
     """
     def __init__(self, py_callable, args=None, kwargs=None, task=None):
         #pylint: disable=W0231
@@ -371,16 +613,17 @@ class PythonAction(BaseAction):
         """Execute command action
 
         both stdout and stderr from the command are captured and saved
-        on self.out/err. Real time output is controlled by parameters
+        on self.out/err (according to `capture` policy).
+        Real time output is controlled by parameters
         @param out: None - no real time output
                     a file like object (has write method)
         @param err: idem
 
         @return failure: see CmdAction.execute
         """
+        output, errput = self._capture_streams()
         # set std stream
         old_stdout = sys.stdout
-        output = StringIO()
         out_writer = Writer()
         # capture output but preserve isatty() from original stream
         out_writer.add_writer(output, old_stdout.isatty())
@@ -389,7 +632,6 @@ class PythonAction(BaseAction):
         sys.stdout = out_writer
 
         old_stderr = sys.stderr
-        errput = StringIO()
         err_writer = Writer()
         err_writer.add_writer(errput, old_stderr.isatty())
         if err:
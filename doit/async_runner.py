@@ -0,0 +1,193 @@
+"""Parallel task runner using asyncio (requires python 3.5)
+
+All tasks are executed by a single thread running an event loop.
+`CmdAction` processes are created with asyncio subprocess API and its
+output is read by the event loop, so a large number of concurrent processes
+does not require a large number of threads.
+Other actions (i.e. `PythonAction`) are executed in a thread pool.
+"""
+
+import sys
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .exceptions import TaskError
+from .action import CmdAction, OutputDecoder
+from .runner import MRunner, JobHold
+
+
+async def _pump_output(action, stream, capture, realtime):
+    """read process output until EOF (see `OutputDecoder`)"""
+    decoder = OutputDecoder(action, capture, realtime)
+    while True:
+        data = await stream.read(action.buffering or 65536)
+        decoder.feed(data)
+        if not data:
+            return
+
+
+async def _kill(process):
+    """kill process if still running"""
+    if process.returncode is None:
+        process.kill()
+        await process.wait()
+
+
+async def execute_cmd_action(action, out=None, err=None):
+    """asyncio version of CmdAction.execute
+
+    @return failure: see CmdAction.execute
+    """
+    try:
+        cmd = action.expand_action()
+    except Exception as exc:
+        return TaskError("CmdAction Error creating command string", exc)
+
+    kwargs = dict(stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                  env=action.get_env(), **action.pkwargs)
+    if action.shell:
+        process = await asyncio.create_subprocess_shell(cmd, **kwargs)
+    elif isinstance(cmd, list):
+        process = await asyncio.create_subprocess_exec(*cmd, **kwargs)
+    else:
+        process = await asyncio.create_subprocess_exec(cmd, **kwargs)
+
+    output, errput = action._capture_streams()
+    pumps = asyncio.gather(
+        _pump_output(action, process.stdout, output, out),
+        _pump_output(action, process.stderr, errput, err))
+    try:
+        await pumps
+        await process.wait()
+    except UnicodeDecodeError as exc:
+        pumps.cancel()
+        await _kill(process)
+        return TaskError("CmdAction Error decoding output", exc)
+    except BaseException:
+        # runner cancelled the task
+        await _kill(process)
+        raise
+    return action.set_result(cmd, process.returncode,
+                             output.getvalue(), errput.getvalue())
+
+
+class AsyncRunner(MRunner):
+    """Parallel runner using asyncio
+
+    `num_process` is the max number of tasks executed concurrently.
+    Uses the same dispatching as MRunner (`get_next_job`), but there are
+    no sub-processes, tasks are executed and its result processed by the
+    event loop.
+    """
+
+    @staticmethod
+    def available():
+        return True
+
+    def __init__(self, *args, **kwargs):
+        MRunner.__init__(self, *args, **kwargs)
+        self.executor = None # ThreadPoolExecutor for non-cmd actions
+        self.stdout = None
+        self.stderr = None
+
+
+    def _dispatch(self, task):
+        """allocate resources, the "job" is the task itself"""
+        self._allocate(task)
+        return task
+
+
+    async def execute_action(self, action, out, err):
+        """execute a single action, blocking actions use the executor"""
+        # CmdAction sub-classes might overwrite execute().
+        # CmdAction with a list and shell=True is platform specific,
+        # let Popen take care of it.
+        if (type(action) is CmdAction and
+                not (action.shell and isinstance(action._action, list))):
+            return await execute_cmd_action(action, out, err)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, action.execute,
+                                          out, err)
+
+
+    async def execute_task_async(self, task):
+        """execute task's actions (see Task.execute_steps)"""
+        # register cleanup/teardown
+        if task.teardown:
+            self.teardown_list.append(task)
+        self.reporter.execute_task(task)
+
+        steps = task.execute_steps(self.stdout, self.stderr, self.verbosity,
+                                   self.capture)
+        try:
+            action, task_stdout, task_stderr = next(steps)
+            while True:
+                action_return = await self.execute_action(
+                    action, task_stdout, task_stderr)
+                action, task_stdout, task_stderr = steps.send(action_return)
+        except StopIteration as stop:
+            return stop.value
+
+
+    async def _run_tasks_async(self):
+        """dispatch tasks for execution and process its results"""
+        running = {} # asyncio future -> task
+        completed = None
+        try:
+            while True:
+                # tries to get as many tasks as free slots
+                while len(running) < self.num_process:
+                    job = self.get_next_job(completed)
+                    completed = None
+                    if job is None or isinstance(job, JobHold):
+                        break
+                    future = asyncio.ensure_future(
+                        self.execute_task_async(job))
+                    running[future] = job
+                # JobHold are not sent to sub-processes
+                self.free_proc = 0
+                if self.concurrency is not None:
+                    self.concurrency.adjust(len(running))
+                if not running:
+                    break
+
+                # process result of one task (completed one at a time)
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED)
+                future = done.pop()
+                task = running.pop(future)
+                node = self.task_dispatcher.nodes[task.name]
+                self.process_task_result(node, future.result())
+                self._release_resources(task)
+                completed = node
+        except BaseException:
+            for future in running:
+                future.cancel()
+            if running:
+                await asyncio.wait(running)
+            raise
+
+
+    def run_tasks(self, task_dispatcher):
+        """execute tasks from dispatcher using an asyncio event loop"""
+        self._run_tasks_init(task_dispatcher)
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+        self.executor = ThreadPoolExecutor(max_workers=self.num_process)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        main = loop.create_task(self._run_tasks_async())
+        try:
+            loop.run_until_complete(main)
+        except BaseException:
+            # KeyboardInterrupt/SystemExit stop the loop,
+            # cancel running tasks (kill its processes) before leaving.
+            if not main.done():
+                main.cancel()
+                loop.run_until_complete(asyncio.wait([main]))
+            raise
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+            self.executor.shutdown()
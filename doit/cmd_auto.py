@@ -38,6 +38,24 @@ opt_failure = {
     'default': '',
 }
 
+opt_warm = {
+    'name': 'warm',
+    'short': None,
+    'long': 'warm',
+    'type': bool,
+    'default': False,
+    'help': ("keep tasks' python modules loaded between executions. "
+             "Modules are reloaded only when the dodo file or a module "
+             "it imports is modified [default: %(default)s]"),
+}
+
+
+class _FileModified(Exception):
+    """raised by file watcher to stop watching loop"""
+    def __init__(self, path):
+        Exception.__init__(self, path)
+        self.path = path
+
 
 class Auto(DoitCmdBase):
     """the main process will never load tasks,
@@ -46,6 +64,9 @@ class Auto(DoitCmdBase):
     python caches imported modules,
     but using different process we can have dependencies on python
     modules making sure the newest module will be used.
+
+    On `warm` mode the forked process is re-used to execute tasks again
+    while no python module (loaded by the dodo file) is modified.
     """
 
     doc_purpose = "automatically execute tasks when a dependency changes"
@@ -53,7 +74,8 @@ class Auto(DoitCmdBase):
     doc_description = None
     execute_tasks = True
 
-    cmd_options = (opt_verbosity, opt_reporter, opt_success, opt_failure)
+    cmd_options = (opt_verbosity, opt_reporter, opt_success, opt_failure,
+                   opt_warm)
 
     @staticmethod
     def _find_file_deps(tasks, sel_tasks):
@@ -80,6 +102,47 @@ class Auto(DoitCmdBase):
         return False
 
 
+    @staticmethod
+    def _find_module_files(skip_modules):
+        """find source files of modules loaded by the project
+
+        Modules from python installation (stdlib, site-packages) are ignored.
+        @param skip_modules: (set - str) name of modules to be ignored
+        """
+        prefixes = tuple(set(os.path.join(os.path.abspath(p), '')
+                             for p in (sys.prefix, sys.exec_prefix,
+                                       getattr(sys, 'base_prefix', ''))
+                             if p))
+        files = set()
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, '__file__', None)
+            if name in skip_modules or not path:
+                continue
+            path = os.path.abspath(path)
+            if path.startswith(prefixes) or not os.path.exists(path):
+                continue
+            files.add(path)
+        return files
+
+
+    @staticmethod
+    def _wait_event(watch_files):
+        """wait until a file is modified
+        @return (str) modified file path
+        """
+        class DoitAutoRun(FileModifyWatcher):
+            def handle_event(self, event):
+                # print("FS EVENT -> {}".format(event))
+                raise _FileModified(getattr(event, 'pathname',
+                                            getattr(event, 'name', None)))
+        file_watcher = DoitAutoRun(watch_files)
+        # kick start watching process
+        try:
+            file_watcher.loop()
+        except _FileModified as modified:
+            return modified.path
+
+
     @staticmethod
     def _run_callback(result, success_callback, failure_callback):
         '''run callback if any after task execution'''
@@ -96,39 +159,48 @@ class Auto(DoitCmdBase):
 
         This method is executed in a forked process.
         The process is terminated after a single event.
+        On warm mode the process is terminated only when a python module
+        is modified, otherwise tasks are executed again.
         """
-        started = time.time()
+        warm = params.get('warm', False)
+        # modules loaded before the dodo file
+        initial_modules = set(sys.modules)
+        while True:
+            started = time.time()
 
-        # execute tasks using Run Command
-        arun = Run(task_loader=self.loader)
-        params.add_defaults(CmdParse(arun.get_options()).parse([])[0])
-        try:
-            result = arun.execute(params, args)
-        # ??? actually tested but coverage doesnt get it...
-        except InvalidCommand as err: # pragma: no cover
-            sys.stderr.write("ERROR: %s\n" % str(err))
-            sys.exit(3)
-
-        # user custom callbacks for result
-        self._run_callback(result,
-                           params.pop('success_callback', None),
-                           params.pop('failure_callback', None))
-
-        # get list of files to watch on file system
-        watch_files = self._find_file_deps(arun.control.tasks,
-                                           arun.control.selected_tasks)
-
-        # Check for timestamp changes since run started,
-        # if change, restart straight away
-        if not self._dep_changed(watch_files, started, arun.control.targets):
-            # set event handler. just terminate process.
-            class DoitAutoRun(FileModifyWatcher):
-                def handle_event(self, event):
-                    # print("FS EVENT -> {}".format(event))
-                    sys.exit(result)
-            file_watcher = DoitAutoRun(watch_files)
-            # kick start watching process
-            file_watcher.loop()
+            # execute tasks using Run Command
+            arun = Run(task_loader=self.loader)
+            params.add_defaults(CmdParse(arun.get_options()).parse([])[0])
+            try:
+                result = arun.execute(params, args)
+            # ??? actually tested but coverage doesnt get it...
+            except InvalidCommand as err: # pragma: no cover
+                sys.stderr.write("ERROR: %s\n" % str(err))
+                sys.exit(3)
+
+            # user custom callbacks for result
+            self._run_callback(result,
+                               params.get('success_callback', None),
+                               params.get('failure_callback', None))
+
+            # get list of files to watch on file system
+            watch_files = self._find_file_deps(arun.control.tasks,
+                                               arun.control.selected_tasks)
+            module_files = set()
+            if warm:
+                module_files = self._find_module_files(initial_modules)
+
+            # Check for timestamp changes since run started,
+            # if change, restart straight away
+            if self._dep_changed(watch_files, started, arun.control.targets):
+                modified = None
+            else:
+                modified = self._wait_event(watch_files | module_files)
+
+            # modified modules can be loaded only on a new process
+            if (not warm or modified in module_files or
+                    self._dep_changed(module_files, started, [])):
+                sys.exit(result)
 
 
     def execute(self, params, args):
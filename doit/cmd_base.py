@@ -5,8 +5,10 @@ from collections import deque
 from . import version
 from .cmdparse import CmdOption, CmdParse
 from .exceptions import InvalidCommand, InvalidDodoFile
-from .dependency import CHECKERS, DbmDB, JsonDB, SqliteDB, Dependency
+from .dependency import CHECKERS, DbmDB, JsonDB, SqliteDB, SqliteWalDB
+from .dependency import SqliteColumnarDB, ShardedDB, Dependency
 from .plugin import PluginDict
+from .task_cache import TaskGraphCache
 from . import loader
 
 
@@ -109,6 +111,18 @@ class Command(object):
         raise NotImplementedError()
 
 
+    def use_task_cache(self, params, cache_info):
+        """check if tasks loaded from task-graph cache can be used
+
+        Tasks from cache contain only metadata, no actions (see TaskGraphCache)
+        @param params: command options values
+        @param cache_info: (dict) cache information, `clean_actions` (bool)
+                           indicates some task defines clean actions
+        @return (bool)
+        """
+        return False
+
+
     def parse_execute(self, in_args):
         """helper. just parse parameters and execute command
 
@@ -160,6 +174,30 @@ opt_backend = {
     'help': ("Select dependency file backend. [default: %(default)s]")
 }
 
+opt_db_codec = {
+    'name': 'db_codec',
+    'short': '',
+    'long': 'db-codec',
+    'type': str,
+    'choices': (('json', 'values encoded as JSON text'),
+                ('binary', 'compact binary encoding')),
+    'default': 'json',
+    'help': ("Select how values are encoded in the dependency file. "
+             "Existing entries in any encoding are migrated when saved. "
+             "Not supported by backend `sqlite3-columnar`. "
+             "[default: %(default)s]")
+}
+
+opt_db_shards = {
+    'name': 'db_shards',
+    'short': '',
+    'long': 'db-shards',
+    'type': int,
+    'default': 0,
+    'help': ("split dependency file into N files (shards), "
+             "0 means a single file [default: %(default)s]")
+}
+
 opt_check_file_uptodate = {
     'name': 'check_file_uptodate',
     'short': '',
@@ -170,10 +208,37 @@ opt_check_file_uptodate = {
 Choose how to check if files have been modified.
 Available options [default: %(default)s]:
   'md5': use the md5sum
+  'blake2b': use blake2b hash (python 3.6+)
+  'sha256': use sha256 hash
+  'xxh64': use xxhash (requires package xxhash)
   'timestamp': use the timestamp
 """
 }
 
+# number of threads used to check/save file_dep state
+opt_hash_workers = {
+    'name': 'hash_workers',
+    'short': '',
+    'long': 'hash-workers',
+    'type': int,
+    'default': 0,
+    'help': ("number of threads used to stat and compute the checksum of "
+             "a task's file_dep, 0 means sequential [default: %(default)s]")
+}
+
+# cache file stat/checksum shared by all tasks
+opt_file_state_cache = {
+    'name': 'file_state_cache',
+    'short': '',
+    'long': 'file-state-cache',
+    'type': bool,
+    'default': False,
+    'help': ("stat/compute checksum of a file only once per run, "
+             "even if it is a file_dep of many tasks. "
+             "Files must not be modified unless they are a task target "
+             "[default: %(default)s]")
+}
+
 
 
 #### options related to dodo.py
@@ -209,6 +274,32 @@ opt_seek_file = {
              "[default: %(default)s]")
 }
 
+# execute task-creators in parallel
+opt_load_workers = {
+    'name': 'load_workers',
+    'short': '',
+    'long': 'load-workers',
+    'type': int,
+    'default': 0,
+    'help': ("number of threads used to execute task-creators concurrently, "
+             "task-creators must be thread-safe. "
+             "0 means sequential [default: %(default)s]")
+}
+
+# cache tasks metadata
+opt_task_cache = {
+    'name': 'task_cache',
+    'short': '',
+    'long': 'task-cache',
+    'type': str,
+    'default': None,
+    'help': ("cache tasks metadata in FILE. Commands that do not execute "
+             "tasks (i.e. list, info) load tasks from the cache while the "
+             "dodo file and the modules it imports are not modified. "
+             "Do not use if tasks depend on anything else (i.e. glob of "
+             "files, environment variables)")
+}
+
 
 class TaskLoader(object):
     """task-loader interface responsible of creating Task objects
@@ -236,13 +327,15 @@ class TaskLoader(object):
         raise NotImplementedError()
 
     @staticmethod
-    def _load_from(cmd, namespace, cmd_list):
+    def _load_from(cmd, namespace, cmd_list, load_workers=0):
         """load task from a module or dict with module members"""
         if inspect.ismodule(namespace):
-            members = dict(inspect.getmembers(namespace))
+            # getmembers() is slow and creators are sorted anyway
+            members = dict(vars(namespace))
         else:
             members = namespace
-        task_list = loader.load_tasks(members, cmd_list, cmd.execute_tasks)
+        task_list = loader.load_tasks(members, cmd_list, cmd.execute_tasks,
+                                      load_workers)
         doit_config = loader.load_doit_config(members)
         return task_list, doit_config
 
@@ -251,24 +344,63 @@ class ModuleTaskLoader(TaskLoader):
     """load tasks from a module/dictionary containing task generators
     Usage: `ModuleTaskLoader(my_module)` or `ModuleTaskLoader(globals())`
     """
-    cmd_options = ()
+    cmd_options = (opt_load_workers,)
 
     def __init__(self, mod_dict):
         super(ModuleTaskLoader, self).__init__()
         self.mod_dict = mod_dict
 
     def load_tasks(self, cmd, params, args):
-        return self._load_from(cmd, self.mod_dict, self.cmd_names)
+        return self._load_from(cmd, self.mod_dict, self.cmd_names,
+                               params.get('load_workers', 0))
 
 
 class DodoTaskLoader(TaskLoader):
     """default task-loader create tasks from a dodo.py file"""
-    cmd_options = (opt_dodo, opt_cwd, opt_seek_file)
+    cmd_options = (opt_dodo, opt_cwd, opt_seek_file, opt_load_workers,
+                   opt_task_cache)
 
     def load_tasks(self, cmd, params, args):
-        dodo_module = loader.get_module(params['dodoFile'], params['cwdPath'],
-                                        params['seek_file'])
-        return self._load_from(cmd, dodo_module, self.cmd_names)
+        dodo_path = loader.get_dodo_path(params['dodoFile'], params['cwdPath'],
+                                         params['seek_file'])
+        # task-graph cache, only used by commands that dont execute tasks
+        cache = None
+        if params.get('task_cache') and not cmd.execute_tasks:
+            cache = TaskGraphCache(params['task_cache'])
+            cache_params = self._task_cache_params(params)
+            cached = cache.load(dodo_path, cache_params)
+            if cached is not None:
+                cache = None # still valid, no need to save again
+                task_list, dodo_config, cache_info = cached
+                if cmd.use_task_cache(params, cache_info):
+                    return task_list, dodo_config
+
+        modules_before = set(sys.modules)
+        dodo_module = loader.import_dodo(dodo_path)
+        task_list, dodo_config = self._load_from(
+            cmd, dodo_module, self.cmd_names, params.get('load_workers', 0))
+        if cache is not None:
+            imported = TaskGraphCache.module_files(
+                set(sys.modules) - modules_before)
+            cache.save(dodo_path, [dodo_path] + imported,
+                       task_list, dodo_config, cache_params)
+        return task_list, dodo_config
+
+    @staticmethod
+    def _task_cache_params(params):
+        """values that might be used by task-creators and DOIT_CONFIG
+
+        loader options, directory doit was invoked from and command line
+        variables (`doit.get_var`)
+        """
+        from . import doit_cmd # avoid circular import
+        return {
+            'dodoFile': params['dodoFile'],
+            'cwdPath': params['cwdPath'],
+            'seek_file': params['seek_file'],
+            'initial_workdir': loader.initial_workdir,
+            'vars': sorted((doit_cmd._CMDLINE_VARS or {}).items()),
+        }
 
 
 
@@ -278,7 +410,13 @@ class DoitCmdBase(Command):
     cmd_options => list of option dictionary (see CmdOption)
     _execute => method, argument names must be option names
     """
-    base_options = (opt_depfile, opt_backend, opt_check_file_uptodate)
+    # `read_only_db` indicates this command never modifies the dependency DB.
+    # If supported by the backend the DB is opened in read-only mode.
+    read_only_db = False
+
+    base_options = (opt_depfile, opt_backend, opt_db_codec, opt_db_shards,
+                    opt_check_file_uptodate, opt_hash_workers,
+                    opt_file_state_cache)
 
     def __init__(self, task_loader=None, cmds=None, **kwargs):
         super(DoitCmdBase, self).__init__(**kwargs)
@@ -355,7 +493,9 @@ class DoitCmdBase(Command):
 
     def get_backends(self):
         """return PluginDict of DB backends, including core and plugins"""
-        backend_map = {'dbm': DbmDB, 'json': JsonDB, 'sqlite3': SqliteDB}
+        backend_map = {'dbm': DbmDB, 'json': JsonDB, 'sqlite3': SqliteDB,
+                       'sqlite3-wal': SqliteWalDB,
+                       'sqlite3-columnar': SqliteColumnarDB}
         # add plugins
         plugins = PluginDict()
         plugins.add_plugins(self.config, 'BACKEND')
@@ -387,8 +527,20 @@ class DoitCmdBase(Command):
         # create dep manager
         db_class = self._backends.get(params['backend'])
         checker_cls = self.get_checker_cls(params['check_file_uptodate'])
+        db_codec = params.get('db_codec', 'json')
+        if (db_codec != 'json' and
+                'codec' not in inspect.signature(db_class).parameters):
+            msg = "Backend '{}' does not support db-codec '{}'."
+            raise InvalidCommand(msg.format(params['backend'], db_codec))
+        db_shards = params.get('db_shards', 0)
+        if db_shards > 1:
+            db_class = ShardedDB.wrap(db_class, db_shards)
         # note the command have the responsability to call dep_manager.close()
-        self.dep_manager = Dependency(db_class, params['dep_file'], checker_cls)
+        self.dep_manager = Dependency(
+            db_class, params['dep_file'], checker_cls,
+            hash_workers=params.get('hash_workers', 0),
+            file_state_cache=params.get('file_state_cache', False),
+            codec=db_codec, read_only=self.read_only_db)
 
         # hack to pass parameter into _execute() calls that are not part
         # of command line options
@@ -48,6 +48,10 @@ class Clean(DoitCmdBase):
                 task.clean(self.outstream, dryrun)
 
 
+    def use_task_cache(self, params, cache_info):
+        # clean actions are not saved in the cache
+        return not cache_info['clean_actions']
+
     def _execute(self, dryrun, cleandep, cleanall, pos_args=None):
         """Clean tasks
         @param task_list (list - L{Task}): list of all tasks from dodo file
@@ -53,6 +53,9 @@ class TabCompletion(DoitCmdBase):
         if cmds:
             self.cmds = cmds.to_dict() # dict name - Command class
 
+    def use_task_cache(self, params, cache_info):
+        return True
+
     def execute(self, opt_values, pos_args):
         if opt_values['shell'] == 'bash':
             self._generate_bash(opt_values, pos_args)
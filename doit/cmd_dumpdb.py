@@ -1,10 +1,10 @@
 import pprint
-import json
 import dbm
 from dbm import whichdb
 
 
 from .exceptions import InvalidCommand
+from .dependency import decode_record, ShardedDB
 from .cmd_base import Command, opt_depfile
 
 
@@ -39,12 +39,24 @@ class DumpDB(Command):
 
     def execute(self, opt_values, pos_args):
         dep_file = opt_values['dep_file']
+        shards = ShardedDB.find_shards(dep_file)
+        if whichdb(dep_file) is None and shards:
+            # DB split in shards (option --db-shards)
+            for shard in shards:
+                print("shard '%s'" % shard)
+                self.dump(shard)
+        else:
+            self.dump(dep_file)
+
+    @staticmethod
+    def dump(dep_file):
+        """print content of a DBM file"""
         db_type = whichdb(dep_file)
         print("DBM type is '%s'" % db_type)
         if db_type in ('dbm', 'dbm.ndbm'): # pragma: no cover
             raise InvalidCommand('ndbm does not support iteration of elements')
         data = dbm.open(dep_file)
         for key, value_str in dbm_iter(data):
-            value_dict = json.loads(value_str.decode('utf-8'))
+            value_dict = decode_record(value_str)
             value_fmt = pprint.pformat(value_dict, indent=4, width=100)
             print("{key} -> {value}".format(key=key, value=value_fmt))
@@ -19,6 +19,9 @@ class Forget(DoitCmdBase):
 
     cmd_options = (opt_forget_taskdep, )
 
+    def use_task_cache(self, params, cache_info):
+        return True
+
     def _execute(self, forget_sub):
         """remove saved data successful runs from DB
         """
@@ -42,8 +45,8 @@ class Forget(DoitCmdBase):
                     to_forget.append(task)
                     to_forget.extend(subtasks_iter(tasks, task))
 
+            # forget it - remove from dependency file
+            self.dep_manager.remove_many([task.name for task in to_forget])
             for task in to_forget:
-                # forget it - remove from dependency file
-                self.dep_manager.remove(task.name)
                 self.outstream.write("forgetting %s\n" % task.name)
         self.dep_manager.close()
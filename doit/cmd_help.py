@@ -89,6 +89,17 @@ title:
 watch:
  - type: list. items:
    * (string) path to be watched when using the `auto` command
+
+resources:
+ - type: dictionary
+   * key: (string) resource name (i.e. 'cpu', 'mem_gb')
+   * value: (number) amount of the resource used by the task,
+     parallel execution only start the task if it fits the free
+     capacity of the pool limits set by the option `--resources`
+
+capture:
+ - type: string. output retained in memory by actions:
+   'all', 'tail[:KB]', 'file[:KB]' or 'none'
 """
 
 
@@ -8,6 +8,9 @@ class Ignore(DoitCmdBase):
 
     cmd_options = ()
 
+    def use_task_cache(self, params, cache_info):
+        return True
+
     def _execute(self, pos_args):
         """mark tasks to be ignored
         @param ignore_tasks: (list - str) tasks to be ignored.
@@ -4,6 +4,7 @@ import pprint
 
 from .cmd_base import DoitCmdBase
 from .exceptions import InvalidCommand
+from .cmd_stats import timing_stats, format_time
 
 
 
@@ -24,9 +25,14 @@ class Info(DoitCmdBase):
     doc_purpose = "show info about a task"
     doc_usage = "TASK"
     doc_description = None
+    read_only_db = True
 
     cmd_options = (opt_show_execute_status, )
 
+    def use_task_cache(self, params, cache_info):
+        # status requires `uptodate` and actions
+        return not params['show_execute_status']
+
     def _execute(self, pos_args, show_execute_status=False):
         if len(pos_args) != 1:
             msg = ('doit info failed, must select *one* task.'
@@ -54,9 +60,20 @@ class Info(DoitCmdBase):
                 self.outstream.write('\n{0}:'.format(attr))
                 printer.pprint(getattr(task, attr))
 
+        # print execution time of previous runs
+        stats = timing_stats(self.dep_manager.get_timing(task_name))
+        if stats:
+            self.outstream.write(
+                '\ntiming:last {last:.3f}s at {started}, {runs} runs: '
+                'mean {mean:.3f}s, min {min:.3f}s, max {max:.3f}s\n'.format(
+                    started=format_time(stats.pop('started')), **stats))
+
         # print reason task is not up-to-date
-        if show_execute_status:
+        if not show_execute_status:
+            self.dep_manager.close()
+        else:
             status = self.dep_manager.get_status(task, tasks, get_log=True)
+            self.dep_manager.close()
             if status.status == 'up-to-date':
                 self.outstream.write('\nTask is up-to-date.\n')
                 return 0
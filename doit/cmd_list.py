@@ -60,6 +60,7 @@ class List(DoitCmdBase):
     doc_purpose = "list tasks from dodo file"
     doc_usage = "[TASK ...]"
     doc_description = None
+    read_only_db = True
 
     cmd_options = (opt_listall, opt_list_quiet, opt_list_status,
                    opt_list_private, opt_list_dependencies, opt_template)
@@ -113,6 +114,10 @@ class List(DoitCmdBase):
         return print_list
 
 
+    def use_task_cache(self, params, cache_info):
+        # status requires `uptodate` and actions
+        return not params['status']
+
     def _execute(self, subtasks=False, quiet=True, status=False,
                  private=False, list_deps=False, template=None, pos_args=None):
         """List task generators, in the order they were defined.
@@ -147,4 +152,6 @@ class List(DoitCmdBase):
         # print list of tasks
         for task in sorted(print_list):
             self._print_task(template, task, status, list_deps, tasks)
+        if status:
+            self.dep_manager.close()
         return 0
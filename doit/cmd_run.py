@@ -2,11 +2,12 @@ import sys
 import codecs
 
 from .exceptions import InvalidCommand
+from .action import parse_capture
 from .plugin import PluginDict
 from .task import Task
-from .control import TaskControl
-from .runner import Runner, MRunner, MThreadRunner
-from .cmd_base import DoitCmdBase
+from .control import TaskControl, critical_path_priority
+from .runner import Runner, MRunner, MThreadRunner, AutoConcurrency
+from .cmd_base import DoitCmdBase, tasks_and_deps_iter
 from . import reporter
 
 
@@ -69,13 +70,20 @@ opt_single = {
 }
 
 
+def num_process_type(value):
+    """num_process option value: an integer or 'auto'"""
+    if value == 'auto':
+        return value
+    return int(value)
+
 opt_num_process = {
     'name': 'num_process',
     'short': 'n',
     'long': 'process',
-    'type': int,
+    'type': num_process_type,
     'default': 0,
-    'help': "number of subprocesses [default: %(default)s]"
+    'help': """number of subprocesses [default: %(default)s]
+'auto': adjusted during execution based on number of CPUs and system load"""
 }
 
 
@@ -98,11 +106,88 @@ opt_parallel_type = {
     'help': """Tasks can be executed in parallel in different ways:
 'process': uses python multiprocessing module
 'thread': uses threads
+'async': uses asyncio, cmd-actions processes are handled by a single thread
 [default: %(default)s]
 """
 }
 
 
+opt_scheduler = {
+    'name': 'scheduler',
+    'short': '',
+    'long': 'scheduler',
+    'type': str,
+    'choices': (('fifo', 'tasks are processed in the order they are found'),
+                ('critical-path', 'tasks with the longest chain of '
+                 'dependent tasks first, estimated from previous durations')),
+    'default': 'fifo',
+    'help': """Order in which ready tasks are dispatched for execution.
+'fifo': in the order tasks are found
+'critical-path': longest estimated remaining critical-path first
+(uses tasks' duration from previous executions) [default: %(default)s]
+"""
+}
+
+
+opt_resources = {
+    'name': 'resources',
+    'short': '',
+    'long': 'resources',
+    'type': str,
+    'default': None,
+    'help': """Capacity of resources for parallel execution.
+Tasks are only started if its `resources` fit the free capacity.
+i.e. `--resources cpu:8,mem_gb:16`. On DOIT_CONFIG it can be a dict."""
+}
+
+
+opt_capture = {
+    'name': 'capture',
+    'short': '',
+    'long': 'capture',
+    'type': str,
+    'default': None,
+    'help': """Output capture policy of tasks that do not define `capture`.
+One of: `all` keep whole output in memory (default), `tail[:KB]` keep only
+the last KB of output, `file[:KB]` write whole output to a temporary file
+and keep last KB in memory, `none` discard output."""
+}
+
+
+def parse_resources(value):
+    """parse resources capacity from command line or config
+
+    @param value: (str) comma separated list of <name>:<number>
+                  (<name>=<number> is also accepted),
+                  (dict) name -> number, or None
+    @return (dict) resource name -> number
+    """
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        items = value.items()
+    else:
+        items = []
+        for item in value.split(','):
+            # command line arguments with '=' are taken as variables,
+            # so ':' is used on command line
+            name, sep, amount = item.partition(':')
+            if not sep:
+                name, sep, amount = item.partition('=')
+            if not sep:
+                msg = "Invalid resources '{}', expected <name>:<number>"
+                raise InvalidCommand(msg.format(item))
+            items.append((name.strip(), amount))
+    resources = {}
+    for name, amount in items:
+        try:
+            resources[name] = float(amount)
+        except (TypeError, ValueError):
+            msg = "Invalid resources '{}' capacity: {!r}"
+            raise InvalidCommand(msg.format(name, amount))
+    return resources
+
+
 # pdb post-mortem
 opt_pdb = {
     'name':'pdb',
@@ -136,7 +221,8 @@ class Run(DoitCmdBase):
     cmd_options = (opt_always, opt_continue, opt_verbosity,
                    opt_reporter, opt_outfile, opt_num_process,
                    opt_parallel_type, opt_pdb, opt_single,
-                   opt_auto_delayed_regex)
+                   opt_auto_delayed_regex, opt_scheduler, opt_resources,
+                   opt_capture)
 
 
     def __init__(self, **kwargs):
@@ -174,7 +260,8 @@ class Run(DoitCmdBase):
     def _execute(self, outfile,
                  verbosity=None, always=False, continue_=False,
                  reporter='console', num_process=0, par_type='process',
-                 single=False, auto_delayed_regex=False):
+                 single=False, auto_delayed_regex=False, scheduler='fifo',
+                 resources=None, capture=None):
         """
         @param reporter:
                (str) one of provided reporters or ...
@@ -231,6 +318,11 @@ class Run(DoitCmdBase):
             run_args = [self.dep_manager, reporter_obj,
                         continue_, always, verbosity]
 
+            concurrency = None
+            if num_process == 'auto':
+                concurrency = AutoConcurrency()
+                num_process = concurrency.max_process
+
             if num_process == 0:
                 RunnerClass = Runner
             else:
@@ -243,13 +335,38 @@ class Run(DoitCmdBase):
                             "running in parallel using threads.")
                 elif par_type == 'thread':
                     RunnerClass = MThreadRunner
+                elif par_type == 'async':
+                    # imported here because module requires python 3.5
+                    from .async_runner import AsyncRunner
+                    RunnerClass = AsyncRunner
                 else:
                     msg = "Invalid parallel type %s"
                     raise InvalidCommand(msg % par_type)
                 run_args.append(num_process)
-
-            runner = RunnerClass(*run_args)
-            return runner.run_all(self.control.task_dispatcher())
+                run_args.append(parse_resources(resources))
+                run_args.append(concurrency)
+
+            # load DB data of all tasks that might be executed at once
+            to_run = {task.name: task for task in tasks_and_deps_iter(
+                self.control.tasks, self.control.selected_tasks)}
+            self.dep_manager.prefetch(to_run)
+
+            priority = None
+            if scheduler == 'critical-path':
+                durations = {name: self.dep_manager.get_duration(name)
+                             for name in to_run}
+                priority = critical_path_priority(to_run, durations)
+            elif scheduler != 'fifo':
+                msg = "Invalid scheduler %s"
+                raise InvalidCommand(msg % scheduler)
+
+            try:
+                parse_capture(capture)
+            except ValueError as exc:
+                raise InvalidCommand(str(exc))
+
+            runner = RunnerClass(*run_args, capture=capture)
+            return runner.run_all(self.control.task_dispatcher(priority))
         finally:
             if isinstance(outfile, str):
                 outstream.close()
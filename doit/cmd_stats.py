@@ -0,0 +1,119 @@
+"""command doit stats - display execution time statistics of tasks"""
+
+import time
+
+from .cmd_base import DoitCmdBase, check_tasks_exist, subtasks_iter
+
+
+opt_stats_sort = {
+    'name': 'sort',
+    'short': 's',
+    'long': 'sort',
+    'type': str,
+    'choices': (('name', 'sort by task name'),
+                ('last', 'longest last execution first'),
+                ('mean', 'longest mean execution time first'),
+                ('max', 'longest execution first'),
+                ('change', 'biggest ratio between last and mean first')),
+    'default': 'name',
+    'help': "Sort tasks by. [default: %(default)s]"
+}
+
+opt_stats_history = {
+    'name': 'history',
+    'short': '',
+    'long': 'history',
+    'type': bool,
+    'default': False,
+    'help': "print start time and duration of every saved execution"
+}
+
+
+def timing_stats(history):
+    """compute statistics from a task timing history
+
+    @param history: (list - tuple) start/end time of executions, oldest first
+    @return (dict) runs, last, mean, min, max (durations in seconds)
+                   and started (time last execution started),
+                   None if there is no history
+    """
+    if not history:
+        return None
+    durations = [end - start for start, end in history]
+    mean = sum(durations) / len(durations)
+    return {
+        'runs': len(durations),
+        'last': durations[-1],
+        'mean': mean,
+        'min': min(durations),
+        'max': max(durations),
+        'change': durations[-1] / mean if mean else 1.0,
+        'started': history[-1][0],
+    }
+
+
+def format_time(timestamp):
+    """format a timestamp (from time.time()) as local date-time"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+class Stats(DoitCmdBase):
+    """command doit stats"""
+
+    doc_purpose = "show execution time statistics of tasks"
+    doc_usage = "[TASK ...]"
+    doc_description = """
+The duration of the last executions of every task (only successful runs)
+are saved in the dependency file.
+Lists number of saved executions, duration of last execution, mean, min and
+max duration of tasks that were executed at least once.
+"""
+    read_only_db = True
+
+    cmd_options = (opt_stats_sort, opt_stats_history)
+
+    ROW = ('{runs:>5} {last:>10.3f} {mean:>10.3f} {min:>10.3f} {max:>10.3f}'
+           '  {name}\n')
+    HEADER = '{:>5} {:>10} {:>10} {:>10} {:>10}  {}\n'.format(
+        'runs', 'last', 'mean', 'min', 'max', 'task')
+
+
+    def use_task_cache(self, params, cache_info):
+        return True
+
+    def _execute(self, sort='name', history=False, pos_args=None):
+        filter_tasks = pos_args
+        tasks = dict([(t.name, t) for t in self.task_list])
+
+        if filter_tasks:
+            check_tasks_exist(tasks, filter_tasks)
+            selected = []
+            for name in filter_tasks:
+                selected.append(tasks[name])
+                selected.extend(subtasks_iter(tasks, tasks[name]))
+        else:
+            selected = self.task_list
+
+        self.dep_manager.prefetch([t.name for t in selected])
+        rows = []
+        for task in selected:
+            timing = self.dep_manager.get_timing(task.name)
+            stats = timing_stats(timing)
+            if stats is not None:
+                stats['name'] = task.name
+                rows.append((stats, timing))
+        self.dep_manager.close()
+
+        if sort == 'name':
+            rows.sort(key=lambda row: row[0]['name'])
+        else:
+            rows.sort(key=lambda row: row[0][sort], reverse=True)
+
+        self.outstream.write(self.HEADER)
+        for stats, timing in rows:
+            self.outstream.write(self.ROW.format(**stats))
+            if history:
+                for start, end in reversed(timing):
+                    self.outstream.write('      {} {:>10.3f}\n'.format(
+                        format_time(start), end - start))
+        return 0
@@ -1,7 +1,11 @@
 """Control tasks execution order"""
+import os
 import fnmatch
+import heapq
+import bisect
 from collections import deque
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
+from itertools import chain, count
 import re
 
 from .exceptions import InvalidTask, InvalidCommand, InvalidDodoFile
@@ -53,6 +57,11 @@ class TaskControl(object):
         # list of tasks selected to be executed
         self.selected_tasks = None
 
+        # indexes built on demand (see _get_wild_tasks, _get_delayed_tasks)
+        self._wild_cache = {} # pattern -> list of task names
+        self._name_index = None # sorted list of (normcase(name), position)
+        self._delayed_tasks = None # list of Task with a loader
+
         # sanity check and create tasks dict
         for task in task_list:
             # task must be a Task
@@ -124,18 +133,51 @@ class TaskControl(object):
         @param task: (Task) task with newly added file_dep
         @param dep_list: (list - str): list of file_dep for task
         """
+        task_dep = set(task.task_dep)
         for dep in deps_list:
-            if (dep in targets and targets[dep] not in task.task_dep):
-                task.task_dep.append(targets[dep])
+            dep_task = targets.get(dep)
+            if dep_task is not None and dep_task not in task_dep:
+                task.task_dep.append(dep_task)
+                task_dep.add(dep_task)
 
 
     def _get_wild_tasks(self, pattern):
-        """get list of tasks that match pattern"""
-        wild_list = []
-        for t_name in self._def_order:
-            if fnmatch.fnmatch(t_name, pattern):
-                wild_list.append(t_name)
-        return wild_list
+        """get list of tasks that match pattern (in definition order)
+
+        Same matching as `fnmatch.fnmatch`. Only task names starting with
+        the literal prefix of the pattern (until first wildcard) are checked,
+        they are found by bisecting a sorted index of names.
+        Result for each pattern is cached.
+        """
+        if pattern not in self._wild_cache:
+            if self._name_index is None:
+                self._name_index = sorted(
+                    (os.path.normcase(name), pos)
+                    for pos, name in enumerate(self._def_order))
+            norm_pattern = os.path.normcase(pattern)
+            prefix = re.split(r'[*?[]', norm_pattern, 1)[0]
+            match = re.compile(fnmatch.translate(norm_pattern)).match
+            found = []
+            start = bisect.bisect_left(self._name_index, (prefix, -1))
+            for norm_name, pos in self._name_index[start:]:
+                if not norm_name.startswith(prefix):
+                    break
+                if match(norm_name):
+                    found.append(pos)
+            found.sort()
+            self._wild_cache[pattern] = [self._def_order[pos]
+                                         for pos in found]
+        return self._wild_cache[pattern][:]
+
+
+    def _get_delayed_tasks(self):
+        """list of tasks with a DelayedLoader (excluding regex targets)"""
+        if self._delayed_tasks is None:
+            self._delayed_tasks = [
+                task for task in self.tasks.values()
+                if task.loader and
+                not task.name.startswith('_regex_target')]
+        return self._delayed_tasks
 
 
     def _process_filter(self, task_selection):
@@ -205,17 +247,15 @@ class TaskControl(object):
                 if not loader:
                     raise InvalidCommand(not_found=filter_)
                 loader.basename = basename
+                delayed_tasks = self._get_delayed_tasks()
                 self.tasks[filter_] = Task(filter_, None, loader=loader)
+                delayed_tasks.append(self.tasks[filter_])
                 selected_task.append(filter_)
                 continue
 
             # check if target matches any regex
             delayed_matched = []  # list of Task
-            for task in list(self.tasks.values()):
-                if not task.loader:
-                    continue
-                if task.name.startswith('_regex_target'):
-                    continue
+            for task in self._get_delayed_tasks():
                 if task.loader.target_regex:
                     if re.match(task.loader.target_regex, filter_):
                         delayed_matched.append(task)
@@ -255,13 +295,16 @@ class TaskControl(object):
             self.selected_tasks = self._def_order
 
 
-    def task_dispatcher(self):
+    def task_dispatcher(self, priority=None):
         """return a TaskDispatcher generator
+
+        @param priority: (dict) see TaskDispatcher
         """
         assert self.selected_tasks is not None, \
             "must call 'process' before this"
 
-        return TaskDispatcher(self.tasks, self.targets, self.selected_tasks)
+        return TaskDispatcher(self.tasks, self.targets, self.selected_tasks,
+                              priority)
 
 
 
@@ -277,20 +320,25 @@ class ExecNode(object):
            - ignore: task wont be executed (user forced deselect)
            - up-to-date: task wont be executed (no need)
            - done: task finished its execution
+    @ivar parent (ExecNode): node that created this node (None for
+           selected tasks)
     """
+    __slots__ = ('task', 'parent', 'task_dep', 'calc_dep',
+                 'wait_select', 'wait_run', 'wait_run_calc', 'waiting_me',
+                 'run_status', 'bad_deps', 'ignored_deps', 'generator')
+
     def __init__(self, task, parent):
         self.task = task
         # list of dependencies not processed by _add_task yet
         self.task_dep = task.task_dep[:]
         self.calc_dep = task.calc_dep.copy()
 
-        # ancestors are used to detect cyclic references.
+        # chain of parents (ancestors) is used to detect cyclic references.
+        # it is shared by all nodes created from the same parent instead
+        # of each node keeping a copy of its ancestors.
         # it does not contain a list of tasks that depends on this node
         # for that check the attribute waiting_me
-        self.ancestors = []
-        if parent:
-            self.ancestors.extend(parent.ancestors)
-        self.ancestors.append(task.name)
+        self.parent = parent
 
         # Wait for a task to be selected to its execution
         # checking if it is up-to-date
@@ -317,6 +365,26 @@ class ExecNode(object):
         self.calc_dep = task.calc_dep.copy()
         self.generator = generator
 
+    @property
+    def ancestors(self):
+        """list of task names from first ancestor to this node"""
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.task.name)
+            node = node.parent
+        names.reverse()
+        return names
+
+    def has_ancestor(self, task_name):
+        """check if task_name is this node or one of its ancestors"""
+        node = self
+        while node is not None:
+            if node.task.name == task_name:
+                return True
+            node = node.parent
+        return False
+
     def parent_status(self, parent_node):
         if parent_node.run_status == 'failure':
             self.bad_deps.append(parent_node)
@@ -345,20 +413,120 @@ def no_none(decorated):
 
 
 
+def critical_path_priority(tasks, durations, default_duration=None):
+    """compute priority of tasks based on the critical path
+
+    The priority of a task is the estimated time from its start until
+    the end of the execution of all tasks that (direct or indirectly)
+    depend on it, i.e. its own duration plus the longest path of durations
+    of its dependent tasks.
+
+    @param tasks: (dict) task_name -> Task
+    @param durations: (dict) task_name -> (float) estimated duration
+    @param default_duration: (float) duration of tasks not in durations,
+                             if None uses the average of `durations`
+    @return dict: task_name -> (float) priority
+    """
+    if default_duration is None:
+        known = [d for d in durations.values() if d is not None]
+        default_duration = (sum(known) / len(known)) if known else 1.0
+
+    # tasks that must wait for a task to be completed
+    dependents = defaultdict(set)
+    # tasks that a task must wait for
+    dependencies = {}
+    for task in tasks.values():
+        deps = chain(task.task_dep, task.setup_tasks, task.calc_dep)
+        dependencies[task.name] = set(d for d in deps if d in tasks)
+        for dep in dependencies[task.name]:
+            dependents[dep].add(task.name)
+
+    def compute(name):
+        duration = durations.get(name)
+        if duration is None:
+            duration = default_duration
+        # max(default=) is python 3.4+
+        longest = max([priority.get(d, 0) for d in dependents[name]] or [0])
+        priority[name] = duration + longest
+
+    # reverse topological order (Kahn's algorithm), a task is processed
+    # only after all its dependents
+    priority = {}
+    pending = dict((name, len(dependents[name])) for name in tasks)
+    ready = deque(name for name in tasks if pending[name] == 0)
+    while ready:
+        name = ready.popleft()
+        compute(name)
+        for dep in dependencies[name]:
+            pending[dep] -= 1
+            if pending[dep] == 0:
+                ready.append(dep)
+
+    # cyclic dependencies are ignored here, they are reported by
+    # TaskDispatcher. tasks in (or depending on) a cycle use
+    # priority of dependents already computed.
+    for name in tasks:
+        if name not in priority:
+            compute(name)
+    return priority
+
+
+class PriorityQueue(object):
+    """queue of ExecNode ordered by priority of its task (highest first)
+    nodes with same priority are retrieved in FIFO order.
+
+    Same interface used from `deque` by TaskDispatcher.
+    """
+    def __init__(self, priority):
+        """@param priority: (dict) task_name -> (float) priority"""
+        self.priority = priority
+        self._heap = []
+        self._count = count()
+
+    def append(self, node):
+        """add ExecNode to queue"""
+        key = -self.priority.get(node.task.name, 0)
+        heapq.heappush(self._heap, (key, next(self._count), node))
+
+    def popleft(self):
+        """remove and return ExecNode with highest priority"""
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+
 class TaskDispatcher(object):
     """Dispatch another task to be selected/executed, mostly handle with MP
 
     Note that a dispatched task might not be ready to be executed.
+    If tasks `priority` is given, tasks ready to be processed are
+    dispatched with the highest priority first, otherwise in FIFO order.
     """
-    def __init__(self, tasks, targets, selected_tasks):
+    def __init__(self, tasks, targets, selected_tasks, priority=None):
+        """
+        @param priority: (dict) task_name -> (float) priority
+        """
         self.tasks = tasks
         self.targets = targets
+        self.priority = priority
 
         self.nodes = {} # key task-name, value: ExecNode
+        # tasks created by a DelayedLoader at execution time
+        self.created_by = {} # key task-name, value: loader basename
+        self.delayed_tasks = {} # key loader basename, value: list of Task
         # queues
         self.waiting = set() # of ExecNode
-        self.ready = deque() # of ExecNode
+        if priority is None:
+            self.ready = deque() # of ExecNode
+        else:
+            self.ready = PriorityQueue(priority)
 
+        if priority is not None:
+            # start by selected tasks with highest priority
+            selected_tasks = sorted(
+                selected_tasks, key=lambda n: -priority.get(n, 0))
         self.generator = self._dispatcher_generator(selected_tasks)
 
 
@@ -374,7 +542,7 @@ class TaskDispatcher(object):
             return node
 
         # detect cyclic/recursive dependencies
-        if parent and task_name in parent.ancestors:
+        if parent and parent.has_ancestor(task_name):
             msg = "Cyclic/recursive dependencies for task %s: [%s]"
             cycle = " -> ".join(parent.ancestors + [task_name])
             raise InvalidDodoFile(msg % (task_name, cycle))
@@ -470,6 +638,8 @@ class TaskDispatcher(object):
                     if not nt.loader:
                         nt.loader = DelayedLoaded
                     self.tasks[nt.name] = nt
+                    self.created_by[nt.name] = to_load
+                self.delayed_tasks[to_load] = new_tasks
             # check itself for implicit dep (used by regex_target)
             TaskControl.add_implicit_task_dep(
                 self.targets, this_task, this_task.file_dep)
@@ -1,10 +1,17 @@
 """Manage (save/check) task dependency-on-files data."""
 
 import os
+import re
+import time
 import hashlib
+import mmap
+import struct
+import binascii
+import zlib
 import subprocess
 import inspect
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dbm import dumb
 import dbm as ddbm
 
@@ -17,6 +24,7 @@ import dbm as ddbm
 #       >>> anydbm._defaultmod
 
 import json
+from urllib.request import pathname2url
 
 
 class DatabaseException(Exception):
@@ -30,29 +38,333 @@ def get_md5(input_data):
     return hashlib.md5(byte_data).hexdigest()
 
 
+# content hash algorithms available to checkers: name -> hash constructor
+HASH_ALGORITHMS = {
+    'md5': hashlib.md5,
+    'sha256': hashlib.sha256,
+}
+if hasattr(hashlib, 'blake2b'): # python 3.6+
+    HASH_ALGORITHMS['blake2b'] = hashlib.blake2b
+try:
+    import xxhash
+except ImportError: # pragma: no cover
+    pass
+else: # pragma: no cover
+    HASH_ALGORITHMS['xxh64'] = xxhash.xxh64
+
+# files with this size (bytes) or bigger are read using mmap
+MMAP_MIN_SIZE = 16 * 1024 * 1024
+
+
+def get_file_hash(path, algorithm='md5'):
+    """Calculate the hash from file content.
+
+    Big files are memory-mapped and passed to the hash function
+    without being copied into python objects.
+
+    @param path: (string) file path
+    @param algorithm: (string) name of algorithm from HASH_ALGORITHMS
+    @return: (string) hex digest
+    """
+    hasher = HASH_ALGORITHMS[algorithm]()
+    with open(path, 'rb') as file_data:
+        if os.fstat(file_data.fileno()).st_size >= MMAP_MIN_SIZE:
+            with mmap.mmap(file_data.fileno(), 0,
+                           access=mmap.ACCESS_READ) as data:
+                hasher.update(data)
+        else:
+            block_size = 128 * hasher.block_size
+            while True:
+                data = file_data.read(block_size)
+                if not data:
+                    break
+                hasher.update(data)
+    return hasher.hexdigest()
+
+
 def get_file_md5(path):
     """Calculate the md5 sum from file content.
 
     @param path: (string) file path
     @return: (string) md5
     """
-    with open(path, 'rb') as file_data:
-        md5 = hashlib.md5()
-        block_size = 128 * md5.block_size
-        while True:
-            data = file_data.read(block_size)
-            if not data:
-                break
-            md5.update(data)
-    return md5.hexdigest()
+    return get_file_hash(path, 'md5')
+
+
+def _chunks(items, size):
+    """split list `items` in lists with at most `size` elements"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+############# binary record codec
+# A task record (dict of dependency -> value) is encoded as:
+#   header: RECORD_MAGIC + version byte
+#   number of entries (varint), and for each entry:
+#     key (string), value type (byte), value
+# strings (keys and items of string lists) are encoded as a varint:
+#   - N > 0: same as the N-th string already written in the task record
+#   - 0: new string, followed by the number of characters shared with the
+#     previous new string (varint) and the remaining characters
+#     (varint length + utf-8)
+#   Paths of `file_dep` are stored once, as keys and on `deps:` list.
+# value types:
+#   - float: double (8 bytes)
+#   - file state (mtime, size, hex-digest): double, varint, varint length +
+#     raw digest bytes
+#   - list of strings: number of items (varint), strings
+#   - json: anything else, varint length + utf-8 json
+# Records not starting with RECORD_MAGIC are JSON (as in older versions).
+
+DB_CODECS = ('json', 'binary')
+RECORD_MAGIC = b'\xd0'
+RECORD_VERSION = 2
+_RECORD_HEADER = RECORD_MAGIC + bytes([RECORD_VERSION])
+_VALUE_JSON = 0
+_VALUE_FLOAT = 1
+_VALUE_FILE_STATE = 2
+_VALUE_STR_LIST = 3
+_DOUBLE = struct.Struct('<d')
+
+
+def _encode_varint(number, out):
+    """append unsigned int `number` to bytearray `out`"""
+    while number > 0x7f:
+        out.append((number & 0x7f) | 0x80)
+        number >>= 7
+    out.append(number)
+
+def _decode_varint(data, pos):
+    """@return tuple (number, position after number)"""
+    number = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        number |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return number, pos
+        shift += 7
+
+def _encode_str(text, out):
+    raw = text.encode('utf-8')
+    _encode_varint(len(raw), out)
+    out += raw
+
+def _decode_str(data, pos):
+    size, pos = _decode_varint(data, pos)
+    end = pos + size
+    return data[pos:end].decode('utf-8'), end
+
+def _encode_shared_str(text, numbers, strings, out):
+    """encode a string of a task record (see codec description)
+
+    @param numbers: (dict) str -> number, of strings already written
+    @param strings: (list - str) new strings already written
+    """
+    number = numbers.get(text)
+    if number is not None:
+        _encode_varint(number, out)
+        return
+    out.append(0)
+    shared = (len(os.path.commonprefix([strings[-1], text]))
+              if strings else 0)
+    _encode_varint(shared, out)
+    _encode_str(text[shared:], out)
+    strings.append(text)
+    numbers[text] = len(strings)
+
+def _decode_shared_str(data, pos, strings):
+    """@param strings: (list - str) strings already read"""
+    number, pos = _decode_varint(data, pos)
+    if number:
+        return strings[number - 1], pos
+    shared, pos = _decode_varint(data, pos)
+    suffix, pos = _decode_str(data, pos)
+    text = (strings[-1][:shared] if strings else '') + suffix
+    strings.append(text)
+    return text, pos
+
+
+def _raw_digest(value):
+    """@return (bytes) raw digest if value is a file state, else None"""
+    if not isinstance(value, (list, tuple)) or len(value) != 3:
+        return None
+    mtime, size, digest = value
+    if (type(mtime) is not float or type(size) is not int or size < 0 or
+            not isinstance(digest, str)):
+        return None
+    try:
+        raw = binascii.unhexlify(digest)
+    except (ValueError, binascii.Error):
+        return None
+    # only lower-case digests can be restored
+    if binascii.hexlify(raw).decode('ascii') != digest:
+        return None
+    return raw
+
+def _is_str_list(value):
+    return (isinstance(value, (list, tuple)) and
+            all(isinstance(item, str) for item in value))
+
+def _encode_task(values, out):
+    numbers = {}
+    strings = []
+    _encode_varint(len(values), out)
+    for key, value in values.items():
+        # non-string keys are converted like by json
+        _encode_shared_str(key if isinstance(key, str) else json.dumps(key),
+                           numbers, strings, out)
+        raw_digest = _raw_digest(value)
+        if type(value) is float:
+            out.append(_VALUE_FLOAT)
+            out += _DOUBLE.pack(value)
+        elif raw_digest is not None:
+            out.append(_VALUE_FILE_STATE)
+            out += _DOUBLE.pack(value[0])
+            _encode_varint(value[1], out)
+            _encode_varint(len(raw_digest), out)
+            out += raw_digest
+        elif _is_str_list(value):
+            out.append(_VALUE_STR_LIST)
+            _encode_varint(len(value), out)
+            for item in value:
+                _encode_shared_str(item, numbers, strings, out)
+        else:
+            out.append(_VALUE_JSON)
+            _encode_str(json.dumps(value), out)
+
+def _decode_task(data, pos):
+    """@return tuple (dict, position after task)"""
+    values = {}
+    strings = []
+    num_values, pos = _decode_varint(data, pos)
+    for _ in range(num_values):
+        key, pos = _decode_shared_str(data, pos, strings)
+        value_type = data[pos]
+        pos += 1
+        if value_type == _VALUE_FLOAT:
+            values[key] = _DOUBLE.unpack_from(data, pos)[0]
+            pos += _DOUBLE.size
+        elif value_type == _VALUE_FILE_STATE:
+            mtime = _DOUBLE.unpack_from(data, pos)[0]
+            size, pos = _decode_varint(data, pos + _DOUBLE.size)
+            digest_size, pos = _decode_varint(data, pos)
+            end = pos + digest_size
+            digest = binascii.hexlify(data[pos:end]).decode('ascii')
+            values[key] = [mtime, size, digest]
+            pos = end
+        elif value_type == _VALUE_STR_LIST:
+            num_items, pos = _decode_varint(data, pos)
+            items = []
+            for _ in range(num_items):
+                item, pos = _decode_shared_str(data, pos, strings)
+                items.append(item)
+            values[key] = items
+        else:
+            text, pos = _decode_str(data, pos)
+            values[key] = json.loads(text)
+    return values, pos
+
+def _check_header(data):
+    version = data[len(RECORD_MAGIC)]
+    # version 1 (development versions) did not share strings
+    if version != RECORD_VERSION:
+        msg = "Unsupported dependency DB record version {} (expected {})."
+        raise DatabaseException(msg.format(version, RECORD_VERSION))
+    return len(_RECORD_HEADER)
+
+
+def encode_record(values):
+    """encode a task's values (dict) using the binary codec"""
+    out = bytearray(_RECORD_HEADER)
+    _encode_task(values, out)
+    return bytes(out)
+
+def decode_record(data):
+    """decode a task's values, auto-detecting binary or json codec
+
+    @param data: (bytes)
+    """
+    if data[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+        return json.loads(data.decode('utf-8'))
+    return _decode_task(data, _check_header(data))[0]
+
+def iter_encode_db(db):
+    """encode values of all tasks (dict task_id -> values) in binary
+
+    Each task is encoded as: task_id, size of encoded values, values.
+    @return iterator of bytes chunks, one per task
+    """
+    out = bytearray(_RECORD_HEADER)
+    _encode_varint(len(db), out)
+    yield bytes(out)
+    for task_id, values in db.items():
+        out = bytearray()
+        _encode_str(task_id, out)
+        task_data = bytearray()
+        _encode_task(values, task_data)
+        _encode_varint(len(task_data), out)
+        out += task_data
+        yield bytes(out)
+
+def encode_db(db):
+    """encode values of all tasks (dict task_id -> values) in binary"""
+    return b''.join(iter_encode_db(db))
+
+def index_db(data):
+    """get position of each task values from data encoded by `encode_db`
+    without decoding the values
+
+    @return dict: task_id -> position to be used by `decode_db_task`
+    """
+    pos = _check_header(data)
+    num_tasks, pos = _decode_varint(data, pos)
+    index = {}
+    for _ in range(num_tasks):
+        task_id, pos = _decode_str(data, pos)
+        size, pos = _decode_varint(data, pos)
+        index[task_id] = pos
+        pos += size
+    return index
+
+def decode_db_task(data, pos):
+    """decode values of a single task at position `pos` (from `index_db`)"""
+    return _decode_task(data, pos)[0]
+
+def decode_db(data):
+    """decode values of all tasks encoded by `encode_db`"""
+    return {task_id: decode_db_task(data, pos)
+            for task_id, pos in index_db(data).items()}
+
 
 
 class JsonDB(object):
-    """Backend using a single text file with JSON content"""
+    """Backend using a single text file with JSON content
+
+    With the `binary` codec the whole file is encoded with `encode_db`.
+    Files are loaded with any codec.
 
-    def __init__(self, name):
+    On read-only mode a file with binary content is memory-mapped and
+    values of a task are decoded only when accessed.
+
+    On `dump` the file is re-written only if any task was modified.
+    Values are encoded one task at a time into a temporary file that is
+    renamed to replace the DB file, so an interrupted `dump` does not
+    corrupt the DB.
+
+    @ivar _index: (dict) task_id -> position in _mmap of tasks
+                  not decoded yet
+    @ivar dirty: (set) id of modified/removed tasks
+    """
+
+    def __init__(self, name, codec='json', read_only=False):
         """Open/create a DB file"""
         self.name = name
+        self.codec = codec
+        self.read_only = read_only
+        self._mmap = None
+        self._index = {}
+        self.dirty = set()
         if not os.path.exists(self.name):
             self._db = {}
         else:
@@ -60,10 +372,20 @@ class JsonDB(object):
 
     def _load(self):
         """load db content from file"""
-        db_file = open(self.name, 'r')
+        db_file = open(self.name, 'rb')
         try:
+            if (self.read_only and
+                    db_file.read(len(RECORD_MAGIC)) == RECORD_MAGIC):
+                self._mmap = mmap.mmap(db_file.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+                self._index = index_db(self._mmap)
+                return {}
+            db_file.seek(0)
+            data = db_file.read()
+            if data[:len(RECORD_MAGIC)] == RECORD_MAGIC:
+                return decode_db(data)
             try:
-                return json.load(db_file)
+                return json.loads(data.decode('utf-8'))
             except ValueError as error:
                 # file contains corrupted json data
                 msg = (error.args[0] +
@@ -76,19 +398,56 @@ class JsonDB(object):
         finally:
             db_file.close()
 
+    def _decode(self, task_id):
+        """decode values of task from _mmap (read-only mode)"""
+        if task_id in self._index:
+            pos = self._index.pop(task_id)
+            self._db[task_id] = decode_db_task(self._mmap, pos)
+
+    def _iter_encode_json(self):
+        """same output as json.dump(self._db) but one task at a time"""
+        yield '{'
+        separator = ''
+        for task_id, values in self._db.items():
+            yield '{}{}: {}'.format(separator, json.dumps(task_id),
+                                    json.dumps(values))
+            separator = ', '
+        yield '}'
+
     def dump(self):
         """save DB content in file"""
+        if self.read_only:
+            if self._mmap is not None:
+                self._mmap.close()
+            return
+        if not self.dirty and os.path.exists(self.name):
+            return
+        if self.codec == 'binary':
+            mode, chunks = 'wb', iter_encode_db(self._db)
+        else:
+            mode, chunks = 'w', self._iter_encode_json()
+        tmp_name = '{}.{}.tmp'.format(self.name, os.getpid())
         try:
-            db_file = open(self.name, 'w')
-            json.dump(self._db, db_file)
-        finally:
-            db_file.close()
+            with open(tmp_name, mode) as db_file:
+                for chunk in chunks:
+                    db_file.write(chunk)
+                db_file.flush()
+                os.fsync(db_file.fileno())
+            os.replace(tmp_name, self.name)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            raise
+        self.dirty = set()
 
     def set(self, task_id, dependency, value):
         """Store value in the DB."""
+        if self._index:
+            self._decode(task_id)
         if task_id not in self._db:
             self._db[task_id] = {}
         self._db[task_id][dependency] = value
+        self.dirty.add(task_id)
 
 
     def get(self, task_id, dependency):
@@ -96,23 +455,35 @@ class JsonDB(object):
 
         @return: (string) or (None) if entry not found
         """
+        if self._index:
+            self._decode(task_id)
         if task_id in self._db:
             return self._db[task_id].get(dependency, None)
 
 
     def in_(self, task_id):
         """@return bool if task_id is in DB"""
-        return task_id in self._db
+        return task_id in self._db or task_id in self._index
+
+
+    def prefetch(self, task_ids):
+        """nothing to do, whole DB is loaded on initialization"""
+        pass
 
 
     def remove(self, task_id):
         """remove saved dependecies from DB for taskId"""
+        self._index.pop(task_id, None)
         if task_id in self._db:
             del self._db[task_id]
+            self.dirty.add(task_id)
 
     def remove_all(self):
         """remove saved dependecies from DB for all tasks"""
+        self.dirty.update(self._db)
+        self.dirty.update(self._index)
         self._db = {}
+        self._index = {}
 
 
 
@@ -125,18 +496,31 @@ class DbmDB(object):
     to the 'dirty' set. Only on 'dump' all dirty items values are encoded
     in json into _dbm and the DBM file is saved.
 
+    On read-only mode the DBM file is opened with flag 'r'.
+    Modifications are kept only in memory.
+
     @ivar name: (str) file name/path
-    @ivar _dbm: (dbm) items with json encoded values
+    @ivar codec: (str) codec used to encode values, `json` or `binary`
+    @ivar read_only: (bool) DBM file is never modified
+    @ivar _dbm: (dbm) items with encoded values
     @ivar _db: (dict) items with python-dict as value
     @ivar dirty: (set) id of modified tasks
     """
     DBM_CONTENT_ERROR_MSG = 'db type could not be determined'
 
-    def __init__(self, name):
+    def __init__(self, name, codec='json', read_only=False):
         """Open/create a DB file"""
         self.name = name
+        self.codec = codec
+        self.read_only = read_only
         try:
-            self._dbm = ddbm.open(self.name, 'c')
+            if not read_only:
+                self._dbm = ddbm.open(self.name, 'c')
+            elif ddbm.whichdb(self.name) is None:
+                # file does not exist
+                self._dbm = {}
+            else:
+                self._dbm = ddbm.open(self.name, 'r')
         except ddbm.error as exception:
             message = str(exception)
             if message == self.DBM_CONTENT_ERROR_MSG:
@@ -158,8 +542,13 @@ class DbmDB(object):
 
     def dump(self):
         """save/close DBM file"""
+        if self.read_only:
+            if hasattr(self._dbm, 'close'):
+                self._dbm.close()
+            return
+        encode = encode_record if self.codec == 'binary' else json.dumps
         for task_id in self.dirty:
-            self._dbm[task_id] = json.dumps(self._db[task_id])
+            self._dbm[task_id] = encode(self._db[task_id])
         self._dbm.close()
 
 
@@ -194,7 +583,7 @@ class DbmDB(object):
                 task_data = self._dbm[task_id]
             except KeyError:
                 return
-            self._db[task_id] = json.loads(task_data.decode('utf-8'))
+            self._db[task_id] = decode_record(task_data)
             return self._db[task_id].get(dependency, None)
 
 
@@ -203,8 +592,29 @@ class DbmDB(object):
         return self._in_dbm(task_id) or task_id in self.dirty
 
 
+    def prefetch(self, task_ids):
+        """load and decode values of all given tasks into _db
+
+        Tasks not in the DB are cached as empty, so they are not looked-up
+        again on `get`.
+        """
+        for task_id in task_ids:
+            if task_id in self._db:
+                continue
+            try:
+                task_data = self._dbm[task_id]
+            except KeyError:
+                self._db[task_id] = {}
+            else:
+                self._db[task_id] = decode_record(task_data)
+
+
     def remove(self, task_id):
         """remove saved dependecies from DB for taskId"""
+        if self.read_only:
+            # do not look-up on _dbm again
+            self._db[task_id] = {}
+            return
         if task_id in self._db:
             del self._db[task_id]
         if self._in_dbm(task_id):
@@ -216,6 +626,10 @@ class DbmDB(object):
     def remove_all(self):
         """remove saved dependecies from DB for all tasks"""
         self._db = {}
+        if self.read_only:
+            self.dump()
+            self._dbm = {}
+            return
         # dumb dbm always opens file in update mode
         if isinstance(self._dbm, dumb._Database): # pragma: no cover
             self._dbm._index = {}
@@ -228,17 +642,35 @@ class DbmDB(object):
 
 
 
+def _sqlite3_read_only_uri(name):
+    """@return URI to open sqlite3 DB file `name` in read-only mode
+
+    Uses an in-memory DB if the file does not exist.
+    """
+    if not os.path.exists(name):
+        return 'file::memory:'
+    return 'file:{}?mode=ro'.format(pathname2url(os.path.abspath(name)))
+
+
 class SqliteDB(object):
-    """ sqlite3 json backend """
+    """ sqlite3 json backend
+
+    With the `binary` codec values are stored as BLOB encoded
+    with `encode_record`.
+
+    On read-only mode modifications are kept only in memory.
+    """
 
-    def __init__(self, name):
+    def __init__(self, name, codec='json', read_only=False):
         self.name = name
-        self._conn = self._sqlite3(self.name)
+        self.codec = codec
+        self.read_only = read_only
+        self._conn = self._sqlite3(self.name, read_only)
         self._cache = {}
         self._dirty = set()
 
     @staticmethod
-    def _sqlite3(name):
+    def _sqlite3(name, read_only=False):
         """Open/create a sqlite3 DB file"""
 
         # Import sqlite here so it's only imported when required
@@ -250,15 +682,15 @@ class SqliteDB(object):
                 data[col[0]] = row[idx]
             return data
         def converter(data):
-            return json.loads(data.decode('utf-8'))
+            return decode_record(data)
 
         sqlite3.register_adapter(list, json.dumps)
         sqlite3.register_adapter(dict, json.dumps)
         sqlite3.register_converter("json", converter)
         conn = sqlite3.connect(
-            name,
+            _sqlite3_read_only_uri(name) if read_only else name,
             detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES,
-            isolation_level='DEFERRED')
+            isolation_level='DEFERRED', uri=read_only)
         conn.row_factory = dict_factory
         sqlscript = """
             create table if not exists doit (
@@ -303,24 +735,57 @@ class SqliteDB(object):
 
 
     def in_(self, task_id):
-        if task_id in self._cache:
+        # empty values are cached for tasks not in the DB
+        if self._cache.get(task_id):
             return True
         if self._conn.execute('select task_id from doit where task_id=?',
                               (task_id,)).fetchone():
             return True
         return False
 
+    # max number of parameters on a single sqlite query
+    MAX_QUERY_PARAMS = 900
+
+    def prefetch(self, task_ids):
+        """load values of all given tasks using bulk queries
+
+        Tasks not in the DB are cached as empty, so they are not looked-up
+        again on `get`.
+        """
+        to_load = [t for t in task_ids if t not in self._cache]
+        for chunk in _chunks(to_load, self.MAX_QUERY_PARAMS):
+            sql = 'select task_id, task_data from doit where task_id in ({})'
+            rows = self._conn.execute(
+                sql.format(','.join('?' * len(chunk))), chunk)
+            for row in rows:
+                self._cache[row['task_id']] = row['task_data']
+            for task_id in chunk:
+                if task_id not in self._cache:
+                    self._cache[task_id] = {}
+
+    def _flush(self):
+        """write all dirty tasks in a single transaction"""
+        if self.read_only:
+            return
+        encode = encode_record if self.codec == 'binary' else json.dumps
+        self._conn.executemany(
+            'insert or replace into doit values (?,?)',
+            [(task_id, encode(self._cache[task_id]))
+             for task_id in self._dirty])
+        self._conn.commit()
+        self._dirty = set()
+
     def dump(self):
         """save/close sqlite3 DB file"""
-        for task_id in self._dirty:
-            self._conn.execute('insert or replace into doit values (?,?)',
-                               (task_id, json.dumps(self._cache[task_id])))
-        self._conn.commit()
+        self._flush()
         self._conn.close()
-        self._dirty = set()
 
     def remove(self, task_id):
         """remove saved dependecies from DB for taskId"""
+        if self.read_only:
+            # do not look-up on DB again
+            self._cache[task_id] = {}
+            return
         if task_id in self._cache:
             del self._cache[task_id]
         if task_id in self._dirty:
@@ -329,13 +794,446 @@ class SqliteDB(object):
 
     def remove_all(self):
         """remove saved dependecies from DB for all task"""
-        self._conn.execute('delete from doit')
+        if self.read_only:
+            self._conn.close()
+            self._conn = self._sqlite3(':memory:')
+        else:
+            self._conn.execute('delete from doit')
         self._cache = {}
         self._dirty = set()
 
 
+class SqliteWalDB(SqliteDB):
+    """sqlite3 json backend using WAL journal and incremental commits
+
+    Modified tasks are written in batches (every `flush_count` tasks or
+    `flush_interval` seconds) instead of only when the process terminates,
+    so the state of successful tasks is not lost if the process is
+    interrupted.
+
+    @cvar flush_count: (int) max number of dirty tasks before a flush
+    @cvar flush_interval: (float) max seconds between flushes
+    """
+    flush_count = 100
+    flush_interval = 10.0
+
+    def __init__(self, name, codec='json', read_only=False):
+        super(SqliteWalDB, self).__init__(name, codec, read_only)
+        if not read_only:
+            self._conn.execute('pragma journal_mode=WAL')
+            # on WAL mode it is safe against corruption, no need for fsync
+            # on every commit
+            self._conn.execute('pragma synchronous=NORMAL')
+        self._last_flush = time.monotonic()
+
+    def set(self, task_id, dependency, value):
+        """Store value in the DB.
+
+        Flush is done before a new task is modified, this way only
+        tasks that had all its values set are written.
+        """
+        if task_id not in self._dirty and self._dirty:
+            if (len(self._dirty) >= self.flush_count or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+        super(SqliteWalDB, self).set(task_id, dependency, value)
+
+    def _flush(self):
+        super(SqliteWalDB, self)._flush()
+        self._last_flush = time.monotonic()
+
+
+class SqliteColumnarDB(object):
+    """sqlite3 backend using a normalized schema
+
+    Instead of a single JSON document per task, task values and the state
+    of each file_dep are saved in separate tables/rows:
+      - task_value: task_id, key, value (JSON).
+                    Used for keys ending with ':' (i.e. 'result:', 'deps:')
+      - file_dep: task_id, path, mtime, size, digest.
+                  States that are not a 3-tuple (timestamp, size, hash)
+                  are saved as JSON in the column `state`.
+
+    Values and file states of a task are loaded independently
+    (one query each), only modified entries are written on `dump`.
+
+    On read-only mode modifications are kept only in memory.
+
+    @ivar _values: (dict) task_id -> dict of loaded task values
+    @ivar _files: (dict) task_id -> dict of loaded file_dep states
+    @ivar _dirty: (set) of (task_id, key) modified entries
+    """
+
+    SCHEMA = """
+        create table if not exists task_value (
+            task_id text not null,
+            key text not null,
+            value text,
+            primary key (task_id, key)
+        );
+        create table if not exists file_dep (
+            task_id text not null,
+            path text not null,
+            mtime real,
+            size integer,
+            digest text,
+            state text,
+            primary key (task_id, path)
+        );
+        create index if not exists file_dep_path on file_dep (path);
+    """
+
+    def __init__(self, name, read_only=False):
+        self.name = name
+        self.read_only = read_only
+        self._conn = self._sqlite3(self.name, read_only)
+        self._values = {}
+        self._files = {}
+        self._dirty = set()
+
+    @classmethod
+    def _sqlite3(cls, name, read_only=False):
+        """Open/create a sqlite3 DB file"""
+        # Import sqlite here so it's only imported when required
+        import sqlite3
+        conn = sqlite3.connect(
+            _sqlite3_read_only_uri(name) if read_only else name,
+            isolation_level='DEFERRED', uri=read_only)
+        try:
+            conn.executescript(cls.SCHEMA)
+        except sqlite3.DatabaseError as exception:
+            new_message = (
+                'Dependencies file in %(filename)s seems to use '
+                'an bad format or is corrupted.\n'
+                'To fix the issue you can just remove the database file(s) '
+                'and a new one will be generated.'
+                'Original error: %(msg)s'
+                % {'filename': repr(name), 'msg': str(exception)})
+            raise DatabaseException(new_message)
+        return conn
+
+    @staticmethod
+    def _is_value(key):
+        """task values keys end with ':', other keys are file paths"""
+        return isinstance(key, str) and key.endswith(':')
+
+    def _load_values_rows(self, rows):
+        """add rows (task_id, key, value) to loaded values"""
+        for task_id, key, value in rows:
+            self._values[task_id][key] = json.loads(value)
+
+    def _load_files_rows(self, rows):
+        """add rows (task_id, path, mtime, size, digest, state)
+        to loaded file states"""
+        for task_id, path, mtime, size, digest, state in rows:
+            if state is None:
+                self._files[task_id][path] = [mtime, size, digest]
+            else:
+                self._files[task_id][path] = json.loads(state)
+
+    def _load_values(self, task_id):
+        self._values[task_id] = {}
+        self._load_values_rows(self._conn.execute(
+            'select task_id, key, value from task_value where task_id=?',
+            (task_id,)))
+        return self._values[task_id]
+
+    def _load_files(self, task_id):
+        self._files[task_id] = {}
+        self._load_files_rows(self._conn.execute(
+            'select task_id, path, mtime, size, digest, state from file_dep '
+            'where task_id=?', (task_id,)))
+        return self._files[task_id]
+
+    def _task_dict(self, task_id, key):
+        """get loaded dict (values or files) of task that contains `key`"""
+        if self._is_value(key):
+            data = self._values.get(task_id)
+            return data if data is not None else self._load_values(task_id)
+        data = self._files.get(task_id)
+        return data if data is not None else self._load_files(task_id)
+
+    def get(self, task_id, dependency):
+        """Get value stored in the DB.
+
+        @return: (string) or (None) if entry not found
+        """
+        return self._task_dict(task_id, dependency).get(dependency, None)
+
+    def set(self, task_id, dependency, value):
+        """Store value in the DB."""
+        self._task_dict(task_id, dependency)[dependency] = value
+        self._dirty.add((task_id, dependency))
+
+    def in_(self, task_id):
+        if self._values.get(task_id) or self._files.get(task_id):
+            return True
+        for table in ('task_value', 'file_dep'):
+            sql = 'select 1 from {} where task_id=? limit 1'.format(table)
+            if self._conn.execute(sql, (task_id,)).fetchone():
+                return True
+        return False
+
+    # max number of parameters on a single sqlite query
+    MAX_QUERY_PARAMS = 900
+
+    def prefetch(self, task_ids):
+        """load values and file states of all given tasks using bulk queries
+        """
+        queries = (
+            (self._values, self._load_values_rows,
+             'select task_id, key, value from task_value '
+             'where task_id in ({})'),
+            (self._files, self._load_files_rows,
+             'select task_id, path, mtime, size, digest, state from file_dep '
+             'where task_id in ({})'),
+        )
+        for cache, load_rows, sql in queries:
+            to_load = [t for t in task_ids if t not in cache]
+            for chunk in _chunks(to_load, self.MAX_QUERY_PARAMS):
+                for task_id in chunk:
+                    cache[task_id] = {}
+                rows = self._conn.execute(
+                    sql.format(','.join('?' * len(chunk))), chunk)
+                load_rows(rows)
+
+    def _flush(self):
+        """write all modified entries"""
+        if self.read_only:
+            return
+        values = []
+        files = []
+        for task_id, key in self._dirty:
+            if self._is_value(key):
+                value = self._values[task_id][key]
+                values.append((task_id, key, json.dumps(value)))
+                continue
+            state = self._files[task_id][key]
+            if isinstance(state, (list, tuple)) and len(state) == 3:
+                files.append((task_id, key, state[0], state[1], state[2],
+                              None))
+            else:
+                files.append((task_id, key, None, None, None,
+                              json.dumps(state)))
+        self._conn.executemany(
+            'insert or replace into task_value values (?,?,?)', values)
+        self._conn.executemany(
+            'insert or replace into file_dep values (?,?,?,?,?,?)', files)
+        self._conn.commit()
+        self._dirty = set()
+
+    def dump(self):
+        """save/close sqlite3 DB file"""
+        self._flush()
+        self._conn.close()
+
+    def remove(self, task_id):
+        """remove saved dependecies from DB for taskId"""
+        self.remove_many([task_id])
+
+    def remove_many(self, task_ids):
+        """remove saved dependecies from DB for all given tasks"""
+        task_ids = set(task_ids)
+        for task_id in task_ids:
+            self._values.pop(task_id, None)
+            self._files.pop(task_id, None)
+        self._dirty = set(d for d in self._dirty if d[0] not in task_ids)
+        if self.read_only:
+            # do not look-up on DB again
+            for task_id in task_ids:
+                self._values[task_id] = {}
+                self._files[task_id] = {}
+            return
+        for chunk in _chunks(list(task_ids), self.MAX_QUERY_PARAMS):
+            where = 'where task_id in ({})'.format(','.join('?' * len(chunk)))
+            self._conn.execute('delete from task_value ' + where, chunk)
+            self._conn.execute('delete from file_dep ' + where, chunk)
+
+    def remove_all(self):
+        """remove saved dependecies from DB for all task"""
+        if self.read_only:
+            self._conn.close()
+            self._conn = self._sqlite3(':memory:')
+        else:
+            self._conn.execute('delete from task_value')
+            self._conn.execute('delete from file_dep')
+        self._values = {}
+        self._files = {}
+        self._dirty = set()
+
+
+class ShardedDB(object):
+    """Wrapper that splits tasks of a DB into `num_shards` files
+
+    Tasks are assigned to a shard by a hash of its name.
+    Each shard is a DB (of class `shard_class`) saved in a file named
+    <name>.shard-<index>-of-<num_shards>.
+
+    Shards are only opened when a task on it is accessed, and only opened
+    shards are dumped. As backends only write modified tasks on `dump`,
+    runs that touch few tasks only load/write a few small files.
+
+    Use `ShardedDB.wrap()` to create a backend class.
+
+    @cvar shard_class: backend class used for each shard
+    @cvar num_shards: (int) number of shards
+    @ivar _shards: (dict) shard index -> opened backend
+    """
+    shard_class = None
+    num_shards = None
+
+    def __init__(self, name, **backend_kwargs):
+        self.name = name
+        self._backend_kwargs = backend_kwargs
+        self._shards = {}
+
+    @classmethod
+    def wrap(cls, db_class, num_shards):
+        """create a backend class that splits a `db_class` DB in shards"""
+        attrs = {'shard_class': db_class, 'num_shards': num_shards}
+        return type('Sharded' + db_class.__name__, (cls,), attrs)
+
+    def shard_name(self, index):
+        """@return (str) file name of shard"""
+        return '{}.shard-{}-of-{}'.format(self.name, index, self.num_shards)
+
+    def shard_names(self):
+        """@return (list - str) file name of all shards
+        (`name` is just a base name, there is no file with this name)
+        """
+        return [self.shard_name(index) for index in range(self.num_shards)]
+
+    @staticmethod
+    def find_shards(name):
+        """find existing shard files of a DB (any number of shards)
+
+        Note DBM backends might add an extension to file names.
+        @param name: (str) base name of DB
+        @return (list - str) shard names ordered by number of shards, index
+        """
+        # glob.escape() is python 3.4+, so compare names from listdir
+        folder, base = os.path.split(name)
+        try:
+            entries = os.listdir(folder or os.curdir)
+        except OSError:
+            return []
+        found = set()
+        for entry in entries:
+            if not entry.startswith(base):
+                continue
+            match = re.match(r'(\.shard-(\d+)-of-(\d+))', entry[len(base):])
+            if match:
+                found.add((int(match.group(3)), int(match.group(2)),
+                           name + match.group(1)))
+        return [shard for _, _, shard in sorted(found)]
+
+    def _index(self, task_id):
+        # must be stable across processes, so `hash()` can not be used
+        return zlib.crc32(task_id.encode('utf-8')) % self.num_shards
+
+    def _get_shard(self, index):
+        shard = self._shards.get(index)
+        if shard is None:
+            shard = self.shard_class(self.shard_name(index),
+                                     **self._backend_kwargs)
+            self._shards[index] = shard
+        return shard
+
+    def _shard(self, task_id):
+        """@return backend of shard containing task_id"""
+        return self._get_shard(self._index(task_id))
+
+    def _group(self, task_ids):
+        """@return dict shard index -> list of task_id"""
+        groups = defaultdict(list)
+        for task_id in task_ids:
+            groups[self._index(task_id)].append(task_id)
+        return groups
+
+    def dump(self):
+        """dump all opened shards"""
+        for shard in self._shards.values():
+            shard.dump()
+
+    def set(self, task_id, dependency, value):
+        self._shard(task_id).set(task_id, dependency, value)
+
+    def get(self, task_id, dependency):
+        return self._shard(task_id).get(task_id, dependency)
+
+    def in_(self, task_id):
+        return self._shard(task_id).in_(task_id)
+
+    def prefetch(self, task_ids):
+        for index, ids in self._group(task_ids).items():
+            prefetch = getattr(self._get_shard(index), 'prefetch', None)
+            if prefetch is not None:
+                prefetch(ids)
+
+    def remove(self, task_id):
+        self._shard(task_id).remove(task_id)
+
+    def remove_many(self, task_ids):
+        for index, ids in self._group(task_ids).items():
+            shard = self._get_shard(index)
+            if hasattr(shard, 'remove_many'):
+                shard.remove_many(ids)
+            else:
+                for task_id in ids:
+                    shard.remove(task_id)
+
+    def remove_all(self):
+        for index in range(self.num_shards):
+            self._get_shard(index).remove_all()
+
+
+class FileStateCache(object):
+    """Cache of file stat and content hash shared by all tasks in a single run.
+
+    Many tasks might have the same file_dep, the cache makes sure each
+    file is stat'ed and hashed only once in a run.
+    Entries must be invalidated when a file is modified (i.e. the file
+    is a target of a task that was executed).
+
+    @ivar _stat: (dict) path -> os.stat_result
+    @ivar _hash: (dict) path -> (algorithm, hex digest)
+    """
+    def __init__(self):
+        self._stat = {}
+        self._hash = {}
+
+    def stat(self, path):
+        """@return os.stat() for path. raise OSError if file doesnt exist"""
+        try:
+            return self._stat[path]
+        except KeyError:
+            # missing files are not cached, they might be created later
+            file_stat = self._stat[path] = os.stat(path)
+            return file_stat
+
+    def file_hash(self, path, algorithm='md5'):
+        """@return (str) hex digest of file content"""
+        cached = self._hash.get(path)
+        if cached is not None and cached[0] == algorithm:
+            return cached[1]
+        digest = get_file_hash(path, algorithm)
+        self._hash[path] = (algorithm, digest)
+        return digest
+
+    def invalidate(self, paths):
+        """remove cached values for all given paths"""
+        for path in paths:
+            self._stat.pop(path, None)
+            self._hash.pop(path, None)
+
+
 class FileChangedChecker(object):
-    """Base checker for dependencies, must be inherited."""
+    """Base checker for dependencies, must be inherited.
+
+    @cvar file_cache: (FileStateCache) if set, checkers should use it to get
+                      file stat/content-hash instead of accessing the file
+    """
+    file_cache = None
 
     def check_modified(self, file_path, file_stat, state):
         """Check if file in file_path is modified from previous "state".
@@ -373,6 +1271,12 @@ class MD5Checker(FileChangedChecker):
     Finally the md5 is used for a different timestamp with the same size.
     """
 
+    def file_hash(self, path):
+        """@return (str) hash of file content"""
+        if self.file_cache is not None:
+            return self.file_cache.file_hash(path, 'md5')
+        return get_file_md5(path)
+
     def check_modified(self, file_path, file_stat, state):
         """Check if file in file_path is modified from previous "state".
         """
@@ -387,18 +1291,52 @@ class MD5Checker(FileChangedChecker):
             return True
 
         # 3 - check md5
-        return file_md5 != get_file_md5(file_path)
+        return file_md5 != self.file_hash(file_path)
 
 
     def get_state(self, dep, current_state):
-        timestamp = os.path.getmtime(dep)
+        cache = self.file_cache
+        if cache is None:
+            timestamp = os.path.getmtime(dep)
+        else:
+            timestamp = cache.stat(dep).st_mtime
         # time optimization. if dep is already saved with current
         # timestamp skip calculating md5
         if current_state and current_state[0] == timestamp:
             return
-        size = os.path.getsize(dep)
-        md5 = get_file_md5(dep)
-        return timestamp, size, md5
+        if cache is None:
+            size = os.path.getsize(dep)
+        else:
+            size = cache.stat(dep).st_size
+        return timestamp, size, self.file_hash(dep)
+
+
+class ContentChecker(MD5Checker):
+    """Same as MD5Checker but content hash is computed with `algorithm`.
+
+    The algorithm is part of the checker name saved on DB, so changing
+    the algorithm has the same effect as changing the checker.
+
+    @cvar algorithm: (str) name of algorithm from HASH_ALGORITHMS,
+          `blake2b` if available (python 3.6+) otherwise `sha256`
+    """
+    algorithm = 'blake2b' if 'blake2b' in HASH_ALGORITHMS else 'sha256'
+
+    def file_hash(self, path):
+        """@return (str) hash of file content"""
+        if self.file_cache is not None:
+            return self.file_cache.file_hash(path, self.algorithm)
+        return get_file_hash(path, self.algorithm)
+
+
+class SHA256Checker(ContentChecker):
+    """ContentChecker using sha256"""
+    algorithm = 'sha256'
+
+
+class XXHashChecker(ContentChecker):
+    """ContentChecker using xxh64 (requires package `xxhash`)"""
+    algorithm = 'xxh64'
 
 
 class TimestampChecker(FileChangedChecker):
@@ -409,12 +1347,28 @@ class TimestampChecker(FileChangedChecker):
 
     def get_state(self, dep, current_state):
         """@returns float: mtime for file `dep`"""
+        if self.file_cache is not None:
+            return self.file_cache.stat(dep).st_mtime
         return os.path.getmtime(dep)
 
 
 # name of checkers class available
 CHECKERS = {'md5': MD5Checker,
+            'sha256': SHA256Checker,
             'timestamp': TimestampChecker}
+if 'blake2b' in HASH_ALGORITHMS:
+    CHECKERS['blake2b'] = ContentChecker
+if 'xxh64' in HASH_ALGORITHMS: # pragma: no cover
+    CHECKERS['xxh64'] = XXHashChecker
+
+
+def get_checker_name(checker):
+    """name used to identify a checker (and its hash algorithm) on the DB"""
+    name = checker.__class__.__name__
+    algorithm = getattr(checker, 'algorithm', None)
+    if algorithm:
+        return '{}:{}'.format(name, algorithm)
+    return name
 
 
 class DependencyStatus(object):
@@ -464,27 +1418,115 @@ class Dependency(object):
     Apart from dependencies other values are also saved on the task dictionary
      * 'result:', 'task:<task-name>', 'ignore:'
      * user(task) defined values are defined in '_values_:' sub-dict
+     * 'timing:' a list with the [start, end] time of the last
+       TIMING_HISTORY_SIZE successful executions
 
     @ivar name: (string) filepath of the DB file
     @ivar _closed: (bool) DB was flushed to file
+    @ivar hash_workers: (int) number of threads used to stat/hash file_dep,
+                        0 or 1 means files are processed sequentially
+    @ivar file_cache: (FileStateCache) cache of file states for this run,
+                      None if cache is not used
+    @ivar codec: (str) codec used by backend to encode values,
+                 one of DB_CODECS
+    @ivar read_only: (bool) DB file is never modified,
+                     modifications are kept only in memory
+    @ivar backend_read_only: (bool) backend was opened in read-only mode,
+                     backends that do not support it are never dumped
+                     when `read_only` is set
     """
-    def __init__(self, db_class, backend_name, checker_cls=MD5Checker):
+    # max number of executions saved on timing history of each task
+    TIMING_HISTORY_SIZE = 10
+
+    def __init__(self, db_class, backend_name, checker_cls=MD5Checker,
+                 hash_workers=0, file_state_cache=False, codec='json',
+                 read_only=False):
         self._closed = False
         self.checker = checker_cls()
+        self.file_cache = None
+        if file_state_cache:
+            self.file_cache = FileStateCache()
+            self.checker.file_cache = self.file_cache
+        self.hash_workers = hash_workers
+        self._hash_pool = None # ThreadPoolExecutor created on demand
         self.db_class = db_class
-        self.backend = db_class(backend_name)
+        self.codec = codec
+        self.read_only = read_only
+        # backends from plugins might not support codecs or read-only mode
+        backend_kwargs = {}
+        if codec != 'json':
+            backend_kwargs['codec'] = codec
+        self.backend_read_only = (read_only and
+                                  self._accepts(db_class, 'read_only'))
+        if self.backend_read_only:
+            backend_kwargs['read_only'] = True
+        self.backend = db_class(backend_name, **backend_kwargs)
         self._set = self.backend.set
         self._get = self.backend.get
         self.remove = self.backend.remove
         self.remove_all = self.backend.remove_all
+        self.remove_many = getattr(self.backend, 'remove_many',
+                                   self._remove_many)
         self._in = self.backend.in_
         self.name = self.backend.name
 
+    @staticmethod
+    def _accepts(db_class, param):
+        """check if backend class accepts a parameter (plugins might not)"""
+        # sharded DB pass its parameters to backend of each shard
+        db_class = getattr(db_class, 'shard_class', None) or db_class
+        return param in inspect.signature(db_class).parameters
+
     def close(self):
         """Write DB in file"""
         if not self._closed:
-            self.backend.dump()
+            # on read-only backends dump() just release resources
+            if self.backend_read_only or not self.read_only:
+                self.backend.dump()
             self._closed = True
+        if self._hash_pool is not None:
+            self._hash_pool.shutdown()
+            self._hash_pool = None
+
+
+    def _map_files(self, func, deps):
+        """apply `func` to each dep, results are produced in `deps` order
+
+        If `hash_workers` is set files are processed concurrently by a pool
+        of threads, otherwise `func` is lazily applied one dep at a time.
+        Note that `func` must not access the DB backend (not thread-safe).
+        @return iterator of func results
+        """
+        if self.hash_workers > 1 and len(deps) > 1:
+            if self._hash_pool is None:
+                self._hash_pool = ThreadPoolExecutor(self.hash_workers)
+            return self._hash_pool.map(func, deps)
+        return (func(dep) for dep in deps)
+
+
+    def prefetch(self, task_ids):
+        """load data of all given tasks in bulk (if supported by backend)
+
+        Should be called before tasks are processed to avoid one DB
+        look-up per task.
+        """
+        prefetch = getattr(self.backend, 'prefetch', None)
+        if prefetch is not None:
+            prefetch(list(task_ids))
+
+
+    def _remove_many(self, task_ids):
+        """remove saved dependencies of all given tasks.
+        Used for backends that do not implement `remove_many`.
+        """
+        for task_id in task_ids:
+            self.remove(task_id)
+
+
+    def invalidate_files(self, paths):
+        """discard cached state of files that might have been modified"""
+        if self.file_cache is not None:
+            self.file_cache.invalidate(paths)
 
 
     ####### task specific
@@ -497,6 +1539,15 @@ class Dependency(object):
         # save task values
         self._set(task.name, "_values_:", task.values)
 
+        # save time of actions execution (used for scheduling and stats),
+        # tasks without actions (i.e. groups) take no time
+        if task.execution_time and task.actions:
+            started, finished = task.execution_time
+            history = list(self._get(task.name, "timing:") or [])
+            history.append([started, finished])
+            self._set(task.name, "timing:",
+                      history[-self.TIMING_HISTORY_SIZE:])
+
         # save task result md5
         if result_hash is not None:
             self._set(task.name, "result:", result_hash)
@@ -507,9 +1558,13 @@ class Dependency(object):
                 self._set(task.name, "result:", get_md5(task.result))
 
         # file-dep
-        self._set(task.name, 'checker:', self.checker.__class__.__name__)
-        for dep in task.file_dep:
-            state = self.checker.get_state(dep, self._get(task.name, dep))
+        self._set(task.name, 'checker:', get_checker_name(self.checker))
+        deps = list(task.file_dep)
+        previous = {dep: self._get(task.name, dep) for dep in deps}
+        get_state = self.checker.get_state
+        states = self._map_files(lambda dep: get_state(dep, previous[dep]),
+                                 deps)
+        for dep, state in zip(deps, states):
             if state is not None:
                 self._set(task.name, dep, state)
 
@@ -543,6 +1598,23 @@ class Dependency(object):
         """
         return self._get(task_name, 'result:')
 
+    def get_duration(self, task_name):
+        """get duration (seconds) of last successful execution of a task
+        @return float or None
+        """
+        history = self.get_timing(task_name)
+        if not history:
+            return None
+        started, finished = history[-1]
+        return finished - started
+
+    def get_timing(self, task_name):
+        """get start/end time of last successful executions of a task
+        @return list of (start, end) tuples, oldest first
+        """
+        history = self._get(task_name, 'timing:') or []
+        return [tuple(entry) for entry in history]
+
     def remove_success(self, task):
         """remove saved info from task"""
         self.remove(task.name)
@@ -633,7 +1705,7 @@ class Dependency(object):
 
         # check for modified file_dep checker
         previous = self._get(task.name, 'checker:')
-        checker_name = self.checker.__class__.__name__
+        checker_name = get_checker_name(self.checker)
         if previous and previous != checker_name:
             task.dep_changed = list(task.file_dep)
             # remove all saved values otherwise they might be re-used by
@@ -655,19 +1727,27 @@ class Dependency(object):
 
         # list of file_dep that changed
         check_modified = self.checker.check_modified
-        changed = []
-        for dep in task.file_dep:
-            state = self._get(task.name, dep)
+        stat = self.file_cache.stat if self.file_cache else os.stat
+        deps = list(task.file_dep)
+        states = {dep: self._get(task.name, dep) for dep in deps}
+        def dep_modified(dep):
+            """@return (bool) modified or None if file doesnt exist"""
             try:
-                file_stat = os.stat(dep)
+                file_stat = stat(dep)
             except OSError:
+                return None
+            state = states[dep]
+            return state is None or check_modified(dep, file_stat, state)
+
+        changed = []
+        for dep, modified in zip(deps, self._map_files(dep_modified, deps)):
+            if modified is None:
                 error_msg = "Dependent file '{}' does not exist.".format(dep)
                 result.error_reason = error_msg.format(dep)
                 if result.add_reason('missing_file_dep', dep, 'error'):
                     return result
-            else:
-                if state is None or check_modified(dep, file_stat, state):
-                    changed.append(dep)
+            elif modified:
+                changed.append(dep)
         task.dep_changed = changed
 
         if len(changed) > 0:
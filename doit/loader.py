@@ -5,6 +5,8 @@ import sys
 import inspect
 import importlib
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import partial
 
 from .exceptions import InvalidTask, InvalidCommand, InvalidDodoFile
 from .task import DelayedLoader, Task, dict_to_task
@@ -42,6 +44,18 @@ def get_module(dodo_file, cwd=None, seek_parent=False):
     @param seek_parent(bool): search for dodo_file in parent paths if not found
     @return (module) dodo module
     """
+    return import_dodo(get_dodo_path(dodo_file, cwd, seek_parent))
+
+
+def get_dodo_path(dodo_file, cwd=None, seek_parent=False):
+    """
+    Find "dodo" file and set environment (sys.path and cwd) to load it.
+
+    @param dodo_file(str): path to file containing the tasks
+    @param cwd(str): path to be used cwd, if None use path from dodo_file
+    @param seek_parent(bool): search for dodo_file in parent paths if not found
+    @return (str) absolute path of dodo file
+    """
     global initial_workdir
     initial_workdir = os.getcwd()
     def exist_or_raise(path):
@@ -90,8 +104,15 @@ def get_module(dodo_file, cwd=None, seek_parent=False):
 
     # file specified on dodo file are relative to cwd
     os.chdir(full_cwd)
+    return dodo_path
 
+
+def import_dodo(dodo_path):
+    """import dodo file (see `get_dodo_path`)
+    @return (module) dodo module
+    """
     # get module containing the tasks
+    file_name = os.path.basename(dodo_path)
     return importlib.import_module(os.path.splitext(file_name)[0])
 
 
@@ -111,13 +132,17 @@ def create_after(executed=None, target_regex=None, creates=None):
 
 
 
-def load_tasks(namespace, command_names=(), allow_delayed=False):
+def load_tasks(namespace, command_names=(), allow_delayed=False,
+               load_workers=0):
     """Find task-creators and create tasks
 
     @param namespace: (dict) containing the task creators, it might
                         contain other stuff
     @param command_names: (list - str) blacklist for task names
     @param load_all: (bool) if True ignore doit_crate_after['executed']
+    @param load_workers: (int) number of threads used to execute
+                         (non-delayed) task-creators concurrently,
+                         0 or 1 means sequential execution
 
     `load_all == False` is used by the runner to delay the creation of
     tasks until a dependent task is executed. This is only used by the `run`
@@ -127,32 +152,57 @@ def load_tasks(namespace, command_names=(), allow_delayed=False):
     @return task_list (list) of Tasks in the order they were defined on the file
     """
     funcs = _get_task_creators(namespace, command_names)
-    # sort by the order functions were defined (line number)
+    # sort by the order functions were defined (line number),
+    # ties are sorted by name
     # TODO: this ordering doesnt make sense when generators come
     # from different modules
     funcs.sort(key=lambda obj: obj[2])
 
+    executor = None
+    if load_workers > 1:
+        executor = ThreadPoolExecutor(max_workers=load_workers)
 
-    task_list = []
-    def _process_gen():
-        task_list.extend(generate_tasks(name, ref(), ref.__doc__))
-    def _add_delayed(tname):
-        task_list.append(Task(tname, None, loader=delayed,
-                              doc=delayed.creator.__doc__))
+    def _process_gen(name, ref):
+        return generate_tasks(name, ref(), ref.__doc__)
+    def _delayed_task(tname, delayed):
+        return Task(tname, None, loader=delayed, doc=delayed.creator.__doc__)
 
+    # for each creator: list of tasks, a Future or a callable that
+    # returns list of tasks.
+    # Results are collected in order, so task_list order and first
+    # exception raised do not depend on execution order.
+    created = []
     for name, ref, _ in funcs:
         delayed = getattr(ref, 'doit_create_after', None)
 
         if not delayed:  # not a delayed task, just run creator
-            _process_gen()
+            if executor:
+                created.append(executor.submit(_process_gen, name, ref))
+            else:
+                created.append(partial(_process_gen, name, ref))
         elif delayed.creates:  # delayed with explicit task basename
-            for tname in delayed.creates:
-                _add_delayed(tname)
+            created.append([_delayed_task(tname, delayed)
+                            for tname in delayed.creates])
         elif allow_delayed:  # delayed no explicit name, cmd run
-            _add_delayed(name)
+            created.append([_delayed_task(name, delayed)])
         else:  # delayed no explicit name, cmd list (run creator)
-            _process_gen()
+            created.append(partial(_process_gen, name, ref))
 
+    task_list = []
+    try:
+        for tasks in created:
+            if isinstance(tasks, Future):
+                tasks = tasks.result()
+            elif callable(tasks):
+                tasks = tasks()
+            task_list.extend(tasks)
+    finally:
+        if executor:
+            # do not start creators after an exception
+            for tasks in created:
+                if isinstance(tasks, Future):
+                    tasks.cancel()
+            executor.shutdown()
     return task_list
 
 
@@ -163,7 +213,7 @@ def _get_task_creators(namespace, command_names):
        - name starts with the string TASK_STRING
        - has the attribute `create_doit_tasks`
 
-    @return (list - func) task-creators
+    @return (list - tuple) task name, task-creator, sort key
     """
     funcs = []
     prefix_len = len(TASK_STRING)
@@ -197,13 +247,35 @@ def _get_task_creators(namespace, command_names):
                    " Please choose another name.")
             raise InvalidDodoFile(msg % task_name)
         # get line number where function is defined
-        line = inspect.getsourcelines(ref)[1]
+        line = _get_line_number(ref)
         # add to list task generator functions
-        funcs.append((task_name, ref, line))
+        funcs.append((task_name, ref, (line, task_name)))
 
     return funcs
 
 
+def _get_line_number(ref):
+    """@return (int) line number where function/method is defined"""
+    # functions and methods have a code object, reading the source file
+    # is much slower
+    code = getattr(_unwrap(ref), '__code__', None)
+    if code is not None:
+        return code.co_firstlineno
+    return inspect.getsourcelines(ref)[1]
+
+
+def _unwrap(func):
+    """follow the chain of __wrapped__ attributes (functools.wraps)
+
+    same as inspect.unwrap() (python 3.4+)
+    """
+    seen = set()
+    while hasattr(func, '__wrapped__') and id(func) not in seen:
+        seen.add(id(func))
+        func = func.__wrapped__
+    return func
+
+
 def load_doit_config(dodo_module):
     """
     @param dodo_module (dict) dict with module members
@@ -89,6 +89,9 @@ class ConsoleReporter(object):
             if self.show_err:
                 err = "".join([a.err for a in task.actions if a.err])
                 self.write("%s\n" % err)
+            # output retained in memory might be partial (task capture)
+            for path in task.capture_files:
+                self.write("full output saved in: %s\n" % path)
 
         if self.runtime_errors:
             self.write("#"*40 + "\n")
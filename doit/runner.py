@@ -1,14 +1,20 @@
 """Task runner"""
 
+import os
 import sys
+import copy
+import time
+import tempfile
+from collections import defaultdict
 from multiprocessing import Process, Queue as MQueue
+import multiprocessing
 from threading import Thread
 import pickle
 import queue
 
 import cloudpickle
 
-from .exceptions import InvalidTask, CatchedException
+from .exceptions import InvalidTask, CatchedException, TaskError
 from .exceptions import TaskFailed, SetupError, DependencyError, UnmetDependency
 from .task import DelayedLoaded
 
@@ -31,19 +37,22 @@ class Runner(object):
 
     """
     def __init__(self, dep_manager, reporter, continue_=False,
-                 always_execute=False, verbosity=0):
+                 always_execute=False, verbosity=0, capture=None):
         """
         @param dep_manager: DependencyBase
         @param reporter: reporter object to be used
         @param continue_: (bool) execute all tasks even after a task failure
         @param always_execute: (bool) execute even if up-to-date or ignored
         @param verbosity: (int) 0,1,2 see Task.execute
+        @param capture: (str) output capture policy for tasks that do not
+                        define one, see `action.parse_capture`
         """
         self.dep_manager = dep_manager
         self.reporter = reporter
         self.continue_ = continue_
         self.always_execute = always_execute
         self.verbosity = verbosity
+        self.capture = capture
 
         self.teardown_list = [] # list of tasks to be teardown
         self.final_result = SUCCESS # until something fails
@@ -171,12 +180,15 @@ class Runner(object):
 
         # finally execute it!
         self.reporter.execute_task(task)
-        return task.execute(sys.stdout, sys.stderr, self.verbosity)
+        return task.execute(sys.stdout, sys.stderr, self.verbosity,
+                            self.capture)
 
 
     def process_task_result(self, node, catched_excp):
         """handles result"""
         task = node.task
+        # targets might have been modified, even if task failed
+        self.dep_manager.invalidate_files(task.targets)
         # save execution successful
         if catched_excp is None:
             node.run_status = "successful"
@@ -218,7 +230,7 @@ class Runner(object):
         for task in reversed(self.teardown_list):
             self.reporter.teardown_task(task)
             catched = task.execute_teardown(sys.stdout, sys.stderr,
-                                            self.verbosity)
+                                            self.verbosity, self.capture)
             if catched:
                 msg = "ERROR: task '%s' teardown action" % task.name
                 error = SetupError(msg, catched)
@@ -258,22 +270,42 @@ class JobHold(object):
     """Indicates there is no task ready to be executed"""
     type = object()
 
-class JobTask(object):
-    """Contains a Task object"""
-    type = object()
-    def __init__(self, task):
-        self.name = task.name
-        try:
-            self.task_pickle = cloudpickle.dumps(task)
-        except pickle.PicklingError as excp:
-            msg = """Error on Task: `{}`.
+def cloudpickle_tasks(obj, name):
+    """cloudpickle Task object(s) created at execution time
+
+    @param obj: Task or list of Task
+    @param name: (str) task or loader name used on error message
+    @raise InvalidTask: if a task can not be pickled
+    """
+    try:
+        return cloudpickle.dumps(obj)
+    # some objects (i.e. locks) raise TypeError
+    except (pickle.PicklingError, TypeError) as excp:
+        msg = """Error on Task: `{}`.
 Task created at execution time that has an attribute than can not be pickled,
 so not feasible to be used with multi-processing. To fix this issue make sure
 the task is pickable or just do not use multi-processing execution.
 
 Original exception {}: {}
 """
-            raise InvalidTask(msg.format(self.name, excp.__class__, excp))
+        raise InvalidTask(msg.format(name, excp.__class__, excp))
+
+
+class JobTask(object):
+    """Contains a Task object"""
+    type = object()
+    def __init__(self, task):
+        self.name = task.name
+        self.task_pickle = cloudpickle_tasks(task, self.name)
+
+class JobTaskFailed(object):
+    """Task that could not be sent to sub-process, only its failure is sent
+    (so it is reported by sub-process like any other task failure)
+    """
+    type = object()
+    def __init__(self, name, failure):
+        self.name = name
+        self.failure = failure
 
 class JobTaskPickle(object):
     """dict of Task object excluding attributes that might be unpicklable"""
@@ -284,6 +316,75 @@ class JobTaskPickle(object):
     def name(self):
         return self.task_dict['name']
 
+class JobTaskLoaded(JobTaskPickle):
+    """JobTaskPickle for a task created by a DelayedLoader
+
+    All (picklable) tasks created by the loader are cloudpickled only once
+    in a temporary file, sub-process loads the file when receiving its first
+    task created by the loader.
+    """
+    type = object()
+    def __init__(self, task, tasks_file):
+        JobTaskPickle.__init__(self, task)
+        self.tasks_file = tasks_file
+
+
+# sub-process result data
+class SpooledOutput(object):
+    """action output saved in a temporary file.
+
+    Used to send large outputs from sub-process to master process without
+    going through the result Queue.
+
+    @cvar MIN_SIZE: (int) outputs with at least this length are spooled
+    """
+    MIN_SIZE = 64 * 1024
+
+    def __init__(self, text):
+        fd, self.path = tempfile.mkstemp(prefix='doit-out-')
+        with open(fd, 'w', encoding='utf-8', errors='surrogatepass') as spool:
+            spool.write(text)
+
+    def read(self):
+        """read output and remove temporary file"""
+        try:
+            with open(self.path, encoding='utf-8',
+                      errors='surrogatepass') as spool:
+                return spool.read()
+        finally:
+            os.remove(self.path)
+
+    @classmethod
+    def spool(cls, text):
+        """@return text or SpooledOutput if text is too large"""
+        if text is not None and len(text) >= cls.MIN_SIZE:
+            return cls(text)
+        return text
+
+    @staticmethod
+    def unspool(output):
+        """@return text from value returned by `spool()`"""
+        if isinstance(output, SpooledOutput):
+            return output.read()
+        return output
+
+
+def task_state_delta(before, after):
+    """@return dict with items from `after` that are not equal in `before`
+
+    @param before: (dict) snapshot (shallow copy) of task state
+    @param after: (dict) task state
+    """
+    delta = {}
+    for key, value in after.items():
+        try:
+            changed = key not in before or bool(before[key] != value)
+        except Exception: # values can not be compared
+            changed = True
+        if changed:
+            delta[key] = value
+    return delta
+
 
 class MReporter(object):
     """send reported messages to master process
@@ -310,6 +411,83 @@ class MReporter(object):
         pass
 
 
+def _cpu_count():
+    """@return (int) number of CPUs (os.cpu_count() is python 3.4+)"""
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError: # pragma: no cover
+        return 1
+
+
+class AutoConcurrency(object):
+    """Number of tasks executed in parallel adjusted to system load (-n auto)
+
+    The limit starts with the number of idle CPUs (number of CPUs minus the
+    1-minute load average). Every `interval` seconds the limit is:
+      - decreased by one if the load average is higher than the number
+        of CPUs (on linux it includes processes blocked on I/O),
+        or available memory is lower than `min_memory`;
+      - increased by one if all slots are being used.
+
+    @ivar cpu_count: (int) number of CPUs
+    @ivar max_process: (int) max value for the limit
+    @ivar interval: (float) min time in seconds between adjustments
+    @ivar min_memory: (float) fraction of total memory
+    @ivar current: (int) current limit
+    """
+    def __init__(self, cpu_count=None, max_process=None, interval=2.0,
+                 min_memory=0.1):
+        self.cpu_count = cpu_count or _cpu_count()
+        self.max_process = max_process or 2 * self.cpu_count
+        self.interval = interval
+        self.min_memory = min_memory
+        load = self.get_load()
+        idle = self.cpu_count if load is None else int(self.cpu_count - load)
+        self.current = max(1, min(self.max_process, idle))
+        self._last_check = time.time()
+
+    @staticmethod
+    def get_load():
+        """1-minute load average, None if not available on platform"""
+        try:
+            return os.getloadavg()[0]
+        except (AttributeError, OSError): # pragma: no cover
+            return None
+
+    @staticmethod
+    def get_memory_available(meminfo='/proc/meminfo'):
+        """fraction of memory available, None if not available on platform"""
+        try:
+            info = {}
+            with open(meminfo) as fp:
+                for line in fp:
+                    key, value = line.split(':', 1)
+                    info[key] = int(value.split()[0])
+            return info['MemAvailable'] / info['MemTotal']
+        except (OSError, KeyError, ValueError, ZeroDivisionError):
+            return None
+
+    def adjust(self, running):
+        """update max number of tasks to be executed in parallel
+
+        @param running: (int) number of tasks being executed
+        @return (int) current limit
+        """
+        now = time.time()
+        if now - self._last_check < self.interval:
+            return self.current
+        self._last_check = now
+        load = self.get_load()
+        memory = self.get_memory_available()
+        if ((load is not None and load > self.cpu_count) or
+                (memory is not None and memory < self.min_memory)):
+            self.current = max(1, self.current - 1)
+        elif running >= self.current:
+            self.current = min(self.max_process, self.current + 1)
+        return self.current
+
+
+
 class MRunner(Runner):
     """MultiProcessing Runner """
     Queue = staticmethod(MQueue)
@@ -331,15 +509,38 @@ class MRunner(Runner):
 
     def __init__(self, dep_manager, reporter,
                  continue_=False, always_execute=False,
-                 verbosity=0, num_process=1):
+                 verbosity=0, num_process=1, resources=None,
+                 concurrency=None, capture=None):
+        """
+        @param resources: (dict) capacity of each resource (name -> number),
+               tasks are dispatched only if its `resources` fit the
+               free capacity. Resources not in the pool are unlimited.
+        @param concurrency: (AutoConcurrency) limit number of tasks executed
+               in parallel, `num_process` is the max number of processes.
+               None if all processes should be used.
+        """
         Runner.__init__(self, dep_manager, reporter, continue_=continue_,
-                        always_execute=always_execute, verbosity=verbosity)
+                        always_execute=always_execute, verbosity=verbosity,
+                        capture=capture)
         self.num_process = num_process
+        self.resources = resources or {}
+        self.concurrency = concurrency
 
         self.free_proc = 0   # number of free process
         self.task_dispatcher = None # TaskDispatcher retrieve tasks
         self.tasks = None    # dict of task instances by name
         self.result_q = None
+        # resources used by tasks being executed
+        self.resources_used = defaultdict(int)
+        self.resources_tasks = 0 # number of running tasks using resources
+        self.running_tasks = 0
+        # nodes ready for execution waiting for free resources
+        self.resource_wait = []
+        # cloudpickle of tasks created by DelayedLoader
+        # loader basename -> (path of pickled tasks, set of task names)
+        self.tasks_files = {}
+        self.pickle_time = 0.0 # time spent on cloudpickle
+        self.pickle_count = 0 # number of cloudpickle calls
 
 
     def __getstate__(self):
@@ -350,6 +551,7 @@ class MRunner(Runner):
         pickle_dict['reporter'] = None
         pickle_dict['task_dispatcher'] = None
         pickle_dict['dep_manager'] = None
+        pickle_dict['resource_wait'] = []
         return pickle_dict
 
     def get_next_job(self, completed):
@@ -363,26 +565,157 @@ class MRunner(Runner):
             return None # gentle stop
         node = completed
         while True:
+            # tasks waiting for resources have precedence over new tasks,
+            # but the completed node must be sent to controller first
+            if node is None:
+                job = self._dispatch_resource_wait()
+                if job:
+                    return job
+
             # get next task from controller
             try:
                 node = self.task_dispatcher.generator.send(node)
                 if node == "hold on":
+                    job = self._dispatch_resource_wait()
+                    if job:
+                        return job
                     self.free_proc += 1
                     return JobHold()
             # no more tasks from controller...
             except StopIteration:
+                job = self._dispatch_resource_wait()
+                if job:
+                    return job
+                if self.resource_wait:
+                    # process will be needed when resources are released
+                    self.free_proc += 1
+                    return JobHold()
                 # ... terminate one sub process if no other task waiting
                 return None
 
             # send a task to be executed
             if self.select_task(node, self.tasks):
-                # If sub-process already contains the Task object send
-                # only safe pickle data, otherwise send whole object.
-                task = node.task
-                if task.loader is DelayedLoaded and self.Child == Process:
-                    return JobTask(task)
-                else:
-                    return JobTaskPickle(task)
+                if not self._fit_resources(node.task):
+                    self.resource_wait.append(node)
+                    node = None
+                    continue
+                return self._dispatch(node.task)
+
+
+    def _dispatch_resource_wait(self):
+        """dispatch first task waiting for resources that fits free capacity
+        @returns: JobXXX or None
+        """
+        for node in self.resource_wait:
+            if self._fit_resources(node.task):
+                self.resource_wait.remove(node)
+                return self._dispatch(node.task)
+        return None
+
+
+    def _fit_resources(self, task):
+        """check if task resources fit in the free capacity of the pool"""
+        if (self.concurrency is not None and
+                self.running_tasks >= self.concurrency.current):
+            return False
+        # if no resource is in use, execute task even if it needs more
+        # than pool capacity. otherwise it would never be executed.
+        if not self.resources_tasks:
+            return True
+        for name, amount in task.resources.items():
+            limit = self.resources.get(name)
+            if limit is not None and self.resources_used[name] + amount > limit:
+                return False
+        return True
+
+
+    def _release_resources(self, task):
+        """task finished execution, its resources are free"""
+        self.running_tasks -= 1
+        if task.resources:
+            self.resources_tasks -= 1
+        for name, amount in task.resources.items():
+            self.resources_used[name] -= amount
+
+
+    def _allocate(self, task):
+        """task will be executed, allocate its resources"""
+        self.running_tasks += 1
+        if task.resources:
+            self.resources_tasks += 1
+        for name, amount in task.resources.items():
+            self.resources_used[name] += amount
+
+
+    def _dispatch(self, task):
+        """allocate resources and create job for a task"""
+        self._allocate(task)
+        # If sub-process already contains the Task object send
+        # only safe pickle data, otherwise send whole object.
+        if task.loader is DelayedLoaded and self.Child == Process:
+            loader = self.task_dispatcher.created_by.get(task.name)
+            if loader is not None:
+                path, pickled = self._get_tasks_file(loader)
+                if task.name in pickled:
+                    return JobTaskLoaded(task, path)
+            # task could not be pickled together with its siblings
+            start = time.time()
+            try:
+                job = JobTask(task)
+            except InvalidTask as exception:
+                # fails only this task, siblings are still executed
+                job = JobTaskFailed(task.name, TaskError(str(exception)))
+            self._add_pickle_time(start)
+            return job
+        else:
+            return JobTaskPickle(task)
+
+
+    def _get_tasks_file(self, loader):
+        """pickle tasks created by `loader` into a temporary file
+
+        A task that can not be pickled is left out of the file (it is sent
+        as a `JobTask`, or fails as `JobTaskFailed`), so it does not prevent
+        its siblings from being executed.
+        @return (tuple) path of file, set of names of pickled tasks
+        """
+        if loader not in self.tasks_files:
+            tasks = self.task_dispatcher.delayed_tasks[loader]
+            start = time.time()
+            try:
+                data = cloudpickle.dumps(tasks)
+            except Exception:
+                # pickle each task to find out which ones can be pickled
+                picklable = []
+                for task in tasks:
+                    try:
+                        cloudpickle.dumps(task)
+                    except Exception:
+                        continue
+                    picklable.append(task)
+                tasks = picklable
+                data = cloudpickle.dumps(tasks)
+            self._add_pickle_time(start)
+            fd, path = tempfile.mkstemp(prefix='doit-tasks-')
+            with open(fd, 'wb') as fp:
+                fp.write(data)
+            self.tasks_files[loader] = (path, set(t.name for t in tasks))
+        return self.tasks_files[loader]
+
+
+    def _add_pickle_time(self, start):
+        self.pickle_time += time.time() - start
+        self.pickle_count += 1
+
+
+    def _remove_tasks_files(self):
+        """remove temporary files created by `_get_tasks_file`"""
+        for path, _ in self.tasks_files.values():
+            try:
+                os.remove(path)
+            except OSError: # pragma: no cover
+                pass
+        self.tasks_files = {}
 
 
     def _run_tasks_init(self, task_dispatcher):
@@ -411,30 +744,56 @@ class MRunner(Runner):
         # ### END DEBUG
 
         proc_list = []
-        for _ in range(self.num_process):
+        num_process = self.num_process
+        if self.concurrency is not None:
+            num_process = min(num_process, self.concurrency.current)
+        for _ in range(num_process):
             next_job = self.get_next_job(None)
             if next_job is None:
                 break # do not start more processes than tasks
             job_q.put(next_job)
-            process = self.Child(
-                target=self.execute_task_subprocess,
-                args=(job_q, result_q, self.reporter.__class__))
-            process.start()
-            proc_list.append(process)
+            proc_list.append(self._start_process(job_q, result_q))
         return proc_list
 
+    def _adjust_processes(self, proc_list, job_q, result_q):
+        """adjust concurrency limit, start more processes if increased
+        @return (int) number of started processes
+        """
+        limit = min(self.num_process,
+                    self.concurrency.adjust(self.running_tasks))
+        started = 0
+        while len(proc_list) < limit:
+            next_job = self.get_next_job(None)
+            if next_job is None:
+                break
+            job_q.put(next_job)
+            proc_list.append(self._start_process(job_q, result_q))
+            started += 1
+        return started
+
+    def _start_process(self, job_q, result_q):
+        """create and start a single sub-process"""
+        process = self.Child(
+            target=self.execute_task_subprocess,
+            args=(job_q, result_q, self.reporter.__class__))
+        process.start()
+        return process
+
     def _process_result(self, node, task, result):
         """process result received from sub-process"""
         if 'failure' in result:
             catched_excp = result['failure']
+            # files with output of failed action (capture 'file')
+            task.capture_files = result.get('capture_files', [])
         else:
             # success set values taken from subprocess result
             catched_excp = None
+            # result['task'] contains only modified attributes
             task.update_from_pickle(result['task'])
             for action, output in zip(task.actions, result['out']):
-                action.out = output
+                action.out = SpooledOutput.unspool(output)
             for action, output in zip(task.actions, result['err']):
-                action.err = output
+                action.err = SpooledOutput.unspool(output)
         self.process_task_result(node, catched_excp)
 
 
@@ -463,6 +822,7 @@ class MRunner(Runner):
                     getattr(self.reporter, result['reporter'])(task)
                     continue
                 self._process_result(node, task, result)
+                self._release_resources(task)
 
                 # update num free process
                 free_proc = self.free_proc + 1
@@ -475,16 +835,26 @@ class MRunner(Runner):
                     if next_job is None:
                         proc_count -= 1
                     job_q.put(next_job)
+                if self.concurrency is not None:
+                    proc_count += self._adjust_processes(
+                        proc_list, job_q, result_q)
                 # check for cyclic dependencies
                 assert len(proc_list) > self.free_proc
         except (SystemExit, KeyboardInterrupt, Exception):
             if self.Child == Process:
                 for proc in proc_list:
                     proc.terminate()
+            self._remove_tasks_files()
             raise
         # we are done, join all process
         for proc in proc_list:
             proc.join()
+        self._remove_tasks_files()
+        if self.verbosity == 2 and self.pickle_count:
+            sys.stderr.write(
+                "cloudpickle of tasks created at execution time: "
+                "{} calls, {:.3f}s\n".format(self.pickle_count,
+                                            self.pickle_time))
 
         # get teardown results
         while not result_q.empty(): # safe because subprocess joined
@@ -499,11 +869,13 @@ class MRunner(Runner):
         @param job_q: task queue,
             * None elements indicate process can terminate
             * JobHold indicate process should wait for next task
-            * JobTask / JobTaskPickle task to be executed
+            * JobTask / JobTaskPickle / JobTaskLoaded task to be executed
+            * JobTaskFailed task failure to be sent back to master
         """
         self.result_q = result_q
         if self.Child == Process:
             self.reporter = MReporter(self, reporter_class)
+        loaded_files = set() # JobTaskLoaded.tasks_file already loaded
         try:
             while True:
                 job = job_q.get()
@@ -516,7 +888,17 @@ class MRunner(Runner):
                 # that might contain unpickleble data were removed.
                 # so we need to get task from this process and update it
                 # to get dynamic task attributes.
-                if job.type is JobTaskPickle.type:
+                if job.type is JobTaskLoaded.type:
+                    # get tasks created by DelayedLoader on master process
+                    if job.tasks_file not in loaded_files:
+                        with open(job.tasks_file, 'rb') as fp:
+                            for loaded in pickle.load(fp):
+                                self.tasks[loaded.name] = loaded
+                        loaded_files.add(job.tasks_file)
+                    task = self.tasks[job.name]
+                    task.update_from_pickle(job.task_dict)
+
+                elif job.type is JobTaskPickle.type:
                     task = self.tasks[job.name]
                     if self.Child == Process: # pragma: no cover ...
                         # ... actually covered but subprocess doesnt get it.
@@ -525,6 +907,10 @@ class MRunner(Runner):
                 elif job.type is JobTask.type:
                     task = pickle.loads(job.task_pickle)
 
+                elif job.type is JobTaskFailed.type:
+                    result_q.put({'name': job.name, 'failure': job.failure})
+                    continue
+
                 # do nothing. this is used to start the subprocess even
                 # if no task is available when process is created.
                 else:
@@ -532,14 +918,29 @@ class MRunner(Runner):
                     continue # pragma: no cover
 
                 result = {'name': task.name}
+                if self.Child == Process:
+                    # master process already contains the task state
+                    # before execution, send back only what was modified
+                    before = {key: copy.copy(value) for key, value
+                              in task.pickle_safe_dict().items()}
                 t_result = self.execute_task(task)
 
                 if t_result is None:
-                    result['task'] = task.pickle_safe_dict()
-                    result['out'] = [a.out for a in task.actions]
-                    result['err'] = [a.err for a in task.actions]
+                    if self.Child == Process:
+                        result['task'] = task_state_delta(
+                            before, task.pickle_safe_dict())
+                        result['out'] = [SpooledOutput.spool(a.out)
+                                         for a in task.actions]
+                        result['err'] = [SpooledOutput.spool(a.err)
+                                         for a in task.actions]
+                    else:
+                        # threads share the same task object with master
+                        result['task'] = {}
+                        result['out'] = [a.out for a in task.actions]
+                        result['err'] = [a.err for a in task.actions]
                 else:
                     result['failure'] = t_result
+                    result['capture_files'] = task.capture_files
                 result_q.put(result)
         except (SystemExit, KeyboardInterrupt, Exception) as exception:
             # error, blow-up everything. send exception info to master process
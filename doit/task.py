@@ -4,6 +4,7 @@
 import types
 import os
 import sys
+import time
 import inspect
 from collections import OrderedDict
 from functools import partial
@@ -11,7 +12,7 @@ from pathlib import PurePath
 
 from .cmdparse import CmdOption, TaskParse
 from .exceptions import CatchedException, InvalidTask
-from .action import create_action, PythonAction
+from .action import create_action, PythonAction, parse_capture
 from .dependency import UptodateCalculator
 
 
@@ -77,6 +78,8 @@ class Task(object):
     @ivar has_subtask: (bool) indicate this task has subtasks
     @ivar result: (str) last action "result". used to check task-result-dep
     @ivar values: (dict) values saved by task that might be used by other tasks
+    @ivar execution_time: (tuple - float) start and end time of last
+                          execution of task's actions
     @ivar getargs: (dict) values from other tasks
     @ivar doc: (string) task documentation
 
@@ -87,6 +90,13 @@ class Task(object):
     @ivar pos_arg_val: (list - str) list of positional parameters values
     @ivar custom_title: function reference that takes a task object as
                         parameter and returns a string.
+    @ivar resources: (dict) amount of each resource (name -> number)
+                     required to execute the task in parallel execution
+    @ivar capture: (str) output capture policy of actions,
+                   see `action.parse_capture`
+    @ivar capture_files: (list - str) path of files with whole output of
+                   failed action (capture 'file'), files of successful
+                   actions are removed
     """
 
     DEFAULT_VERBOSITY = 1
@@ -110,6 +120,8 @@ class Task(object):
                   'getargs': ((dict,), ()),
                   'title': ((types.FunctionType,), (None,)),
                   'watch': ((list, tuple), ()),
+                  'resources': ((dict,), (None,)),
+                  'capture': (string_types, (None,)),
     }
 
 
@@ -119,7 +131,7 @@ class Task(object):
                  is_subtask=False, has_subtask=False,
                  doc=None, params=(), pos_arg=None,
                  verbosity=None, title=None, getargs=None,
-                 watch=(), loader=None):
+                 watch=(), loader=None, resources=None, capture=None):
         """sanity checks and initialization
 
         @param params: (list of dict for parameters) see cmdparse.CmdOption
@@ -145,6 +157,9 @@ class Task(object):
         self.check_attr(name, 'getargs', getargs, self.valid_attr['getargs'])
         self.check_attr(name, 'title', title, self.valid_attr['title'])
         self.check_attr(name, 'watch', watch, self.valid_attr['watch'])
+        self.check_attr(name, 'resources', resources,
+                        self.valid_attr['resources'])
+        self.check_attr(name, 'capture', capture, self.valid_attr['capture'])
 
         if '=' in name:
             msg = "Task '{}': name must not use the char '=' (equal sign)."
@@ -184,8 +199,12 @@ class Task(object):
         self.has_subtask = has_subtask
         self.result = None
         self.values = {}
+        self.execution_time = None
+        self.capture_files = []
         self.verbosity = verbosity
         self.custom_title = title
+        self.resources = self._init_resources(resources)
+        self.capture = self._init_capture(capture)
 
         # clean
         if clean is True:
@@ -351,6 +370,28 @@ class Task(object):
         # store just first non-empty line as documentation string
         return first_line(doc)
 
+    def _init_resources(self, resources):
+        """check resources values are non-negative numbers"""
+        if not resources:
+            return {}
+        for res_name, amount in resources.items():
+            if (isinstance(amount, bool) or
+                    not isinstance(amount, (int, float)) or amount < 0):
+                msg = ("Task '{}' attribute 'resources' must map a resource "
+                       "name to a non-negative number, got {}: {!r}")
+                raise InvalidTask(msg.format(self.name, res_name, amount))
+        return dict(resources)
+
+    def _init_capture(self, capture):
+        """check capture is a valid policy"""
+        if capture is not None:
+            try:
+                parse_capture(capture)
+            except ValueError as exc:
+                raise InvalidTask("Task '{}': {}".format(self.name, exc))
+        return capture
+
+
     @staticmethod
     def check_attr(task, attr, value, valid):
         """check input task attribute is correct type/value
@@ -402,29 +443,77 @@ class Task(object):
         return out_err[use_verbosity]
 
 
-    def execute(self, out=None, err=None, verbosity=None):
-        """Executes the task.
-        @return failure: see CmdAction.execute
+    def _set_capture(self, actions, capture):
+        """set output capture policy of actions
+        @param capture: (str) global policy, used if task does not define one
         """
-        self.init_options()
-        task_stdout, task_stderr = self._get_out_err(out, err, verbosity)
-        for action in self.actions:
-            action_return = action.execute(task_stdout, task_stderr)
-            if isinstance(action_return, CatchedException):
-                return action_return
-            self.result = action.result
-            self.values.update(action.values)
+        use_capture = self.capture or capture
+        for action in actions:
+            action.capture = use_capture
 
 
-    def execute_teardown(self, out=None, err=None, verbosity=None):
+    def _keep_capture_files(self, action):
+        """save path of files with output of a failed action"""
+        self.capture_files = [path for path in
+                              (action.out_file, action.err_file) if path]
+
+
+    def execute_steps(self, out=None, err=None, verbosity=None,
+                      capture=None):
+        """generator that controls execution of task's actions
+
+        Used by runners that execute the actions itself (i.e. asyncio).
+        Yields a tuple (action, out, err) for each action to be executed,
+        the caller must `send()` the value returned by action execution.
+        On completion the generator returns (StopIteration.value) the
+        failure or None, see `execute`.
+        """
+        self.init_options()
+        task_stdout, task_stderr = self._get_out_err(out, err, verbosity)
+        self._set_capture(self.actions, capture)
+        self.capture_files = []
+        started = time.time()
+        try:
+            for action in self.actions:
+                action_return = yield (action, task_stdout, task_stderr)
+                if isinstance(action_return, CatchedException):
+                    self._keep_capture_files(action)
+                    return action_return
+                action.remove_capture_files()
+                self.result = action.result
+                self.values.update(action.values)
+        finally:
+            self.execution_time = (started, time.time())
+
+
+    def execute(self, out=None, err=None, verbosity=None, capture=None):
+        """Executes the task.
+        @param capture: (str) default output capture policy
+        @return failure: see CmdAction.execute
+        """
+        steps = self.execute_steps(out, err, verbosity, capture)
+        try:
+            action, task_stdout, task_stderr = next(steps)
+            while True:
+                action_return = action.execute(task_stdout, task_stderr)
+                action, task_stdout, task_stderr = steps.send(action_return)
+        except StopIteration as stop:
+            return stop.value
+
+
+    def execute_teardown(self, out=None, err=None, verbosity=None,
+                         capture=None):
         """Executes task's teardown
         @return failure: see CmdAction.execute
         """
         task_stdout, task_stderr = self._get_out_err(out, err, verbosity)
+        self._set_capture(self.teardown, capture)
         for action in self.teardown:
             action_return = action.execute(task_stdout, task_stderr)
             if isinstance(action_return, CatchedException):
+                self._keep_capture_files(action)
                 return action_return
+            action.remove_capture_files()
 
 
     def clean(self, outstream, dryrun):
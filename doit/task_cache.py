@@ -0,0 +1,137 @@
+"""Cache of tasks metadata loaded from a dodo file (task-graph cache)
+
+Loading a dodo file requires importing it and executing all task-creators.
+Commands that do not execute tasks (i.e. `list`) only need task's metadata
+(names, dependencies, targets, doc...), these can be loaded from the cache
+while the dodo file and the modules it imports are not modified.
+"""
+
+import os
+import sys
+import pickle
+
+from .version import VERSION
+from .dependency import get_file_md5
+from .task import Task
+
+
+class TaskGraphCache(object):
+    """save/load tasks metadata (pickle safe attributes) to a file
+
+    The cache is valid only if the dodo file and every module imported while
+    loading its tasks were not modified, and tasks were loaded with the same
+    parameters (loader options, command line variables). Files are compared by its timestamp
+    and size, if the timestamp changed its checksum (MD5) is compared.
+
+    Tasks loaded from cache have no actions, clean actions, uptodate
+    or teardown.
+
+    @cvar FORMAT: (int) version of cache file format
+    @ivar path: (str) path of cache file
+    """
+    FORMAT = 1
+
+    def __init__(self, path):
+        self.path = path
+
+    @staticmethod
+    def _key(dodo_path, params):
+        """cache is valid only for same dodo file, cwd, parameters and
+        doit version
+        """
+        return (TaskGraphCache.FORMAT, VERSION, sys.version,
+                dodo_path, os.getcwd(), sorted((params or {}).items()))
+
+    @staticmethod
+    def module_files(modules):
+        """@return (list - str) path of files that contain given modules
+        @param modules: (list - str) module names (from sys.modules)
+        """
+        files = []
+        for name in modules:
+            path = getattr(sys.modules.get(name), '__file__', None)
+            if path and os.path.isfile(path):
+                files.append(os.path.abspath(path))
+        return files
+
+
+    def load(self, dodo_path, params=None):
+        """load tasks from cache
+
+        @param dodo_path: (str) absolute path of dodo file
+        @param params: (dict) values that affect the creation of tasks,
+                       must be the same used to save the cache
+        @return (tuple) list of Task, dict DOIT_CONFIG, dict cache info
+                or None if cache is not available or not valid
+        """
+        try:
+            with open(self.path, 'rb') as fp:
+                data = pickle.load(fp)
+        except Exception: # no cache or incompatible content
+            return None
+        if data.get('key') != self._key(dodo_path, params):
+            return None
+
+        # check imported modules were not modified
+        for path, mtime, size, md5 in data['files']:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            if stat.st_mtime == mtime and stat.st_size == size:
+                continue
+            if stat.st_size != size or get_file_md5(path) != md5:
+                return None
+
+        task_list = []
+        for task_dict in data['tasks']:
+            task = Task(task_dict['name'], None)
+            task.update_from_pickle(task_dict)
+            task_list.append(task)
+        return task_list, data['config'], data['info']
+
+
+    def save(self, dodo_path, files, task_list, doit_config, params=None):
+        """save tasks metadata
+
+        @param dodo_path: (str) absolute path of dodo file
+        @param files: (list - str) path of files used to create tasks
+        @param task_list: (list - Task)
+        @param doit_config: (dict) DOIT_CONFIG
+        @param params: (dict) values that affect the creation of tasks
+        @return (bool) False if tasks can not be saved in the cache
+        """
+        # tasks created by DelayedLoader need the task-creator
+        if any(task.loader for task in task_list):
+            return False
+        file_states = []
+        for path in sorted(set(files)):
+            stat = os.stat(path)
+            file_states.append(
+                (path, stat.st_mtime, stat.st_size, get_file_md5(path)))
+        data = {
+            'key': self._key(dodo_path, params),
+            'files': file_states,
+            'tasks': [task.pickle_safe_dict() for task in task_list],
+            'config': doit_config,
+            'info': {
+                # clean actions are not saved
+                'clean_actions': any(t.clean_actions for t in task_list),
+            },
+        }
+        try:
+            content = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        except Exception: # attributes that can not be pickled
+            return False
+
+        # write to temporary file and rename, so cache is never partially
+        # written
+        tmp_name = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(tmp_name, 'wb') as fp:
+                fp.write(content)
+            os.replace(tmp_name, self.path)
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+        return True
@@ -337,6 +337,7 @@ class TestCmd_print_process_output_line(object):
         my_action = action.CmdAction("", buffering=1)
         proc_mock = Mock()
         proc_mock.configure_mock(returncode=0)
+        proc_mock.communicate.return_value = (b'', b'')
         popen_mock = Mock(return_value=proc_mock)
         from doit.action import subprocess
         monkeypatch.setattr(subprocess, 'Popen', popen_mock)
@@ -347,6 +348,64 @@ class TestCmd_print_process_output_line(object):
 
 
 
+class TestCmdOutputPump(object):
+    NOT_UTF8 = ('python -c "import sys; sys.stdout.buffer.write(b\'\\xa9\')"')
+
+    def test_decoder_line_buffered(self):
+        my_action = action.CmdAction("")
+        capture, realtime = StringIO(), StringIO()
+        decoder = action.OutputDecoder(my_action, capture, realtime)
+        decoder.feed('abc\nde'.encode('utf-8'))
+        assert 'abc\nde' == capture.getvalue()
+        assert 'abc\n' == realtime.getvalue()
+        # multi-byte char split between reads
+        data = 'f\u00e7\n'.encode('utf-8')
+        decoder.feed(data[:2])
+        decoder.feed(data[2:])
+        assert 'abc\ndef\u00e7\n' == realtime.getvalue()
+        decoder.feed(b'g')
+        decoder.feed(b'')
+        assert 'abc\ndef\u00e7\ng' == realtime.getvalue()
+        assert 'abc\ndef\u00e7\ng' == capture.getvalue()
+
+    def test_decoder_buffering(self):
+        my_action = action.CmdAction("", buffering=1)
+        capture, realtime = StringIO(), StringIO()
+        decoder = action.OutputDecoder(my_action, capture, realtime)
+        decoder.feed(b'ab')
+        assert 'ab' == realtime.getvalue()
+
+    def test_threads(self, tmpfile, monkeypatch):
+        monkeypatch.setattr(action.CmdAction, 'USE_SELECTOR', False)
+        my_action = action.CmdAction("%s hi_stdout hi2" % PROGRAM)
+        my_action.execute(out=tmpfile)
+        tmpfile.seek(0)
+        assert "hi_stdout" == tmpfile.read()
+        assert "hi_stdout" == my_action.out
+        assert "hi2" == my_action.err
+
+    def test_communicate(self, monkeypatch):
+        # no realtime output doesnt read pipes
+        monkeypatch.setattr(action.CmdAction, 'USE_SELECTOR', False)
+        my_action = action.CmdAction("%s hi_stdout hi2" % PROGRAM)
+        my_action._print_process_output = Mock()
+        my_action.execute()
+        assert not my_action._print_process_output.called
+        assert "hi_stdout" == my_action.out
+        assert "hi2" == my_action.err
+
+    def test_decode_error_communicate(self):
+        my_action = action.CmdAction(self.NOT_UTF8, decode_error='strict')
+        got = my_action.execute()
+        assert isinstance(got, TaskError)
+        assert 'decoding' in got.message
+
+    def test_decode_error_selector(self, tmpfile):
+        my_action = action.CmdAction(self.NOT_UTF8, decode_error='strict')
+        got = my_action.execute(out=tmpfile)
+        assert isinstance(got, TaskError)
+
+
 class TestCmdSaveOuput(object):
     def test_success(self):
         TEST_PATH = os.path.dirname(__file__)
@@ -357,6 +416,79 @@ class TestCmdSaveOuput(object):
 
 
 
+class TestParseCapture(object):
+    def test_valid(self):
+        assert ('all', None) == action.parse_capture(None)
+        assert ('all', None) == action.parse_capture('all')
+        assert ('none', 0) == action.parse_capture('none')
+        assert ('tail', 2048) == action.parse_capture('tail:2')
+        assert ('tail', 64 * 1024) == action.parse_capture('tail')
+        assert ('file', 0) == action.parse_capture('file:0')
+
+    @pytest.mark.parametrize('policy', ['xxx', 'tail:x', 'tail:-1', 'all:3'])
+    def test_invalid(self, policy):
+        pytest.raises(ValueError, action.parse_capture, policy)
+
+
+class TestCaptureStream(object):
+    def test_tail(self):
+        stream = action.TailCapture(5)
+        for text in ('abc', 'def', 'gh', 'i'):
+            stream.write(text)
+        assert 'efghi' == stream.getvalue()
+        assert 4 == stream.discarded
+        stream.write('jk')
+        assert 'ghijk' == stream.getvalue()
+
+    def test_tail_zero(self):
+        stream = action.capture_stream('none')
+        stream.write('abc')
+        assert '' == stream.getvalue()
+
+    def test_file(self):
+        stream = action.capture_stream('file:0')
+        stream.write('abc')
+        stream.write('def')
+        assert '' == stream.getvalue()
+        with open(stream.path) as fp:
+            assert 'abcdef' == fp.read()
+        os.remove(stream.path)
+
+    def test_file_no_output(self):
+        stream = action.capture_stream('file')
+        stream.write('')
+        assert '' == stream.getvalue()
+        assert None == stream.path
+
+    def test_all(self):
+        stream = action.capture_stream(None)
+        stream.write('abc')
+        assert 'abc' == stream.getvalue()
+
+
+class TestCmdCapture(object):
+    def test_tail(self):
+        my_action = action.CmdAction(PROGRAM + " x1 x2", save_out='out')
+        my_action.capture = 'tail:0'
+        my_action.execute()
+        assert '' == my_action.out
+        assert '' == my_action.err
+        assert {'out': ''} == my_action.values
+
+    def test_file(self):
+        my_action = action.CmdAction(PROGRAM + " x1 x2")
+        my_action.capture = 'file'
+        my_action.execute()
+        assert 'x1' == my_action.out
+        with open(my_action.out_file) as fp:
+            assert 'x1' == fp.read()
+        with open(my_action.err_file) as fp:
+            assert 'x2' == fp.read()
+        my_action.remove_capture_files()
+        assert None == my_action.out_file
+        assert None == my_action.err_file
+
+
 class TestWriter(object):
     def test_write(self):
         w1 = StringIO()
@@ -601,6 +733,15 @@ class TestPythonVerbosity(object):
         assert "this is stdout S\n" == got, got
 
 
+    def test_capture_none(self, capsys):
+        my_action = action.PythonAction(self.write_stdout)
+        my_action.capture = 'none'
+        my_action.execute(out=sys.stdout)
+        assert '' == my_action.out
+        # realtime output is not affected
+        assert "this is stdout S\n" == capsys.readouterr()[0]
+
+
 class TestPythonActionPrepareKwargsMeta(object):
 
     @pytest.fixture
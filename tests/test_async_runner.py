@@ -0,0 +1,120 @@
+import sys
+import asyncio
+from io import StringIO
+
+import pytest
+
+if sys.version_info < (3, 5):
+    pytest.skip("asyncio runner requires python 3.5", allow_module_level=True)
+
+from doit.exceptions import TaskError, TaskFailed
+from doit.action import CmdAction
+from doit.task import Task
+from doit.control import TaskDispatcher
+from doit import runner
+from doit.async_runner import AsyncRunner, execute_cmd_action
+from .test_runner import FakeReporter
+
+
+@pytest.fixture
+def reporter(request):
+    return FakeReporter()
+
+
+def run_coroutine(coro):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class TestExecuteCmdAction(object):
+    def test_success(self):
+        my_action = CmdAction("echo hello; echo err >&2", save_out='x')
+        got = run_coroutine(execute_cmd_action(my_action))
+        assert None == got
+        assert "hello\n" == my_action.out
+        assert "err\n" == my_action.err
+        assert "hello\nerr\n" == my_action.result
+        assert {'x': 'hello\n'} == my_action.values
+
+    def test_no_shell(self):
+        my_action = CmdAction(['echo', 'hello'], shell=False)
+        assert None == run_coroutine(execute_cmd_action(my_action))
+        assert "hello\n" == my_action.out
+
+    def test_failure(self):
+        my_action = CmdAction("exit 1")
+        got = run_coroutine(execute_cmd_action(my_action))
+        assert isinstance(got, TaskFailed)
+
+    def test_error(self):
+        my_action = CmdAction("exit 127")
+        got = run_coroutine(execute_cmd_action(my_action))
+        assert isinstance(got, TaskError)
+
+    def test_error_expand(self):
+        my_action = CmdAction("echo %(xxx)s", task=Task('t1', None))
+        got = run_coroutine(execute_cmd_action(my_action))
+        assert isinstance(got, TaskError)
+
+    def test_realtime(self):
+        out = StringIO()
+        my_action = CmdAction("echo line1; printf 'no-eol'")
+        run_coroutine(execute_cmd_action(my_action, out=out))
+        assert "line1\nno-eol" == out.getvalue()
+        assert "line1\nno-eol" == my_action.out
+
+    def test_realtime_buffering(self):
+        out = StringIO()
+        my_action = CmdAction("printf 'abcdef'", buffering=2)
+        run_coroutine(execute_cmd_action(my_action, out=out))
+        assert "abcdef" == out.getvalue()
+
+    def test_decode_multibyte(self):
+        # multi-byte char split between reads
+        my_action = CmdAction("printf '\\303\\251\\303\\251'", buffering=1)
+        run_coroutine(execute_cmd_action(my_action))
+        assert "éé" == my_action.out
+
+    def test_decode_error(self):
+        my_action = CmdAction("printf '\\251'",
+                              decode_error='strict')
+        got = run_coroutine(execute_cmd_action(my_action))
+        assert isinstance(got, TaskError)
+        assert "decoding output" in got.get_msg()
+
+
+class TestAsyncRunner(object):
+    def test_concurrent(self, reporter, dep_manager, tmpdir):
+        # t1 only succeeds if t2 is executed while t1 is running
+        flag = tmpdir.join('flag')
+        t1 = Task('t1', ["for i in $(seq 500); do [ -f {} ] && exit 0; "
+                         "sleep 0.01; done; exit 1".format(flag)])
+        t2 = Task('t2', ["touch {}".format(flag)])
+        my_runner = AsyncRunner(dep_manager, reporter, num_process=2)
+        my_runner.run_tasks(TaskDispatcher({'t1':t1, 't2':t2}, [],
+                                           ['t1', 't2']))
+        assert runner.SUCCESS == my_runner.finish()
+        assert ('success', t1) in reporter.log
+        assert ('success', t2) in reporter.log
+
+    def test_python_action_executor(self, reporter, dep_manager):
+        t1 = Task('t1', [lambda: {'x': 1}, "echo hi"])
+        my_runner = AsyncRunner(dep_manager, reporter, num_process=2)
+        my_runner.run_tasks(TaskDispatcher({'t1':t1}, [], ['t1']))
+        assert runner.SUCCESS == my_runner.finish()
+        assert {'x': 1} == t1.values
+        assert "hi\n" == t1.result
+        assert t1.execution_time is not None
+
+    def test_failure_stops(self, reporter, dep_manager):
+        t1 = Task('t1', ["exit 1"])
+        t2 = Task('t2', ["echo t2"], task_dep=['t1'])
+        my_runner = AsyncRunner(dep_manager, reporter, num_process=2)
+        my_runner.run_tasks(TaskDispatcher({'t1':t1, 't2':t2}, [], ['t2']))
+        assert runner.FAILURE == my_runner.finish()
+        assert ('execute', t2) not in reporter.log
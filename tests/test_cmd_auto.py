@@ -1,4 +1,7 @@
+import os
+import sys
 import time
+import types
 from multiprocessing import Process
 
 import pytest
@@ -131,6 +134,50 @@ class TestAuto(object):
         assert 0 == run_wait_proc.exitcode
 
 
+    def test_run_warm(self, dependency1, depfile_name, monkeypatch):
+        executed = []
+        t1 = Task("t1", [lambda: executed.append('t1')],
+                  file_dep=[dependency1])
+        cmd = CmdFactory(cmd_auto.Auto,
+                         task_loader=FakeLoader([t1], depfile_name))
+        module_file = os.path.abspath(__file__)
+        monkeypatch.setattr(cmd_auto.Auto, '_find_module_files',
+                            staticmethod(lambda skip: set([module_file])))
+        events = [os.path.abspath(dependency1), module_file]
+        def fake_wait(watch_files):
+            assert module_file in watch_files
+            modified = events.pop(0)
+            # make sure mtime is different from previous execution
+            time.sleep(0.01)
+            with open(dependency1, 'a') as fp:
+                fp.write('x')
+            return modified
+        monkeypatch.setattr(cmd_auto.Auto, '_wait_event',
+                            staticmethod(fake_wait))
+
+        params = DefaultUpdate(warm=True)
+        with pytest.raises(SystemExit) as exit_info:
+            cmd.run_watch(params, [])
+        assert 0 == exit_info.value.code
+        # modified file_dep executed again on same process,
+        # modified module terminates process
+        assert ['t1', 't1'] == executed
+        assert [] == events
+
+
+    def test_find_module_files(self, monkeypatch):
+        module = types.ModuleType('my_dodo_module')
+        module.__file__ = __file__
+        monkeypatch.setitem(sys.modules, 'my_dodo_module', module)
+        files = cmd_auto.Auto._find_module_files(set(['tests.test_cmd_auto']))
+        assert os.path.abspath(__file__) in files
+        # stdlib not included
+        assert os.path.abspath(os.__file__) not in files
+        files = cmd_auto.Auto._find_module_files(
+            set(['tests.test_cmd_auto', 'my_dodo_module']))
+        assert os.path.abspath(__file__) not in files
+
+
     def test_execute(self, monkeypatch):
         # use dumb operation instead of executing RUN command and waiting event
         def fake_run(self, params, args): # pragma: no cover
@@ -1,14 +1,18 @@
 import os
+import sys
 
 import pytest
+from mock import Mock
 
 from doit import version
 from doit.cmdparse import CmdParseError, CmdParse
 from doit.exceptions import InvalidCommand, InvalidDodoFile
-from doit.dependency import FileChangedChecker
+from doit.dependency import FileChangedChecker, JsonDB, ShardedDB
 from doit.task import Task
 from doit.cmd_base import version_tuple, Command, DoitCmdBase
 from doit.cmd_base import ModuleTaskLoader, DodoTaskLoader
+from doit import cmd_base
+from doit import doit_cmd
 from doit.cmd_base import check_tasks_exist, tasks_and_deps_iter, subtasks_iter
 
 
@@ -142,6 +146,114 @@ class TestDodoTaskLoader(object):
         assert ['xxx1', 'yyy2'] == [t.name for t in task_list]
         assert {'verbose': 2} == config
 
+    def test_task_cache(self, restore_cwd, tmpdir, monkeypatch):
+        os.chdir(os.path.dirname(__file__))
+        class CacheCmd(Command):
+            def use_task_cache(self, params, cache_info):
+                return True
+        params = {'dodoFile': 'loader_sample.py',
+                  'cwdPath': None,
+                  'seek_file': False,
+                  'task_cache': str(tmpdir.join('tasks.cache')),
+                  }
+        loader = DodoTaskLoader()
+        # first time import dodo and save cache
+        loader.load_tasks(CacheCmd(), params, [])
+        assert tmpdir.join('tasks.cache').exists()
+
+        # commands that do not accept cached tasks import dodo
+        import_dodo = Mock(side_effect=cmd_base.loader.import_dodo)
+        monkeypatch.setattr(cmd_base.loader, 'import_dodo', import_dodo)
+        loader.load_tasks(Command(), params, [])
+        assert 1 == import_dodo.call_count
+
+        # use cache
+        task_list, config = loader.load_tasks(CacheCmd(), params, [])
+        assert 1 == import_dodo.call_count
+        assert ['xxx1', 'yyy2'] == [t.name for t in task_list]
+        assert 'task doc' == task_list[0].doc
+        assert [] == task_list[0].actions
+        assert {'verbose': 2} == config
+
+    DODO_CACHE_SAMPLE = """
+import doit
+DOIT_CONFIG = {'verbosity': int(doit.get_var('verbosity', '0'))}
+def task_xxx():
+    return {'actions': None, 'doc': doit.get_var('doc', '')}
+def task_yyy():
+    return {'actions': None, 'doc': doit.get_initial_workdir()}
+"""
+
+    def _cache_loader(self, tmpdir, monkeypatch):
+        """@return function to load tasks from cache (or dodo file)"""
+        class CacheCmd(Command):
+            def use_task_cache(self, params, cache_info):
+                return True
+        tmpdir.join('dodo_cache_sample.py').write(self.DODO_CACHE_SAMPLE)
+        import_dodo = Mock(side_effect=cmd_base.loader.import_dodo)
+        monkeypatch.setattr(cmd_base.loader, 'import_dodo', import_dodo)
+        def load(**kwargs):
+            params = {'dodoFile': 'dodo_cache_sample.py',
+                      'cwdPath': None,
+                      'seek_file': False,
+                      'task_cache': str(tmpdir.join('tasks.cache')),
+                      }
+            params.update(kwargs)
+            # every doit process imports the dodo file again
+            monkeypatch.delitem(sys.modules, 'dodo_cache_sample', False)
+            loader = DodoTaskLoader()
+            task_list, config = loader.load_tasks(CacheCmd(), params, [])
+            return import_dodo.call_count, task_list, config
+        return load
+
+    def test_task_cache_vars(self, restore_cwd, tmpdir, monkeypatch):
+        monkeypatch.setattr(doit_cmd, '_CMDLINE_VARS', {'doc': 'foo'})
+        os.chdir(str(tmpdir))
+        load = self._cache_loader(tmpdir, monkeypatch)
+        assert 1 == load()[0]
+        count, task_list, _ = load()
+        assert 1 == count
+        assert 'foo' == task_list[0].doc
+
+        # different value of command line variable
+        doit_cmd.set_var('doc', 'bar')
+        count, task_list, _ = load()
+        assert 2 == count
+        assert 'bar' == task_list[0].doc
+
+    def test_task_cache_doit_config(self, restore_cwd, tmpdir, monkeypatch):
+        monkeypatch.setattr(doit_cmd, '_CMDLINE_VARS', {})
+        os.chdir(str(tmpdir))
+        load = self._cache_loader(tmpdir, monkeypatch)
+        assert {'verbosity': 0} == load()[2]
+        assert (1, {'verbosity': 0}) == load()[::2]
+
+        # DOIT_CONFIG uses command line variable
+        doit_cmd.set_var('verbosity', '2')
+        assert (2, {'verbosity': 2}) == load()[::2]
+
+    def test_task_cache_loader_params(self, restore_cwd, tmpdir, monkeypatch):
+        monkeypatch.setattr(doit_cmd, '_CMDLINE_VARS', {})
+        sub = tmpdir.mkdir('sub')
+        os.chdir(str(tmpdir))
+        load = self._cache_loader(tmpdir, monkeypatch)
+        assert 1 == load()[0]
+        assert 1 == load()[0]
+
+        # --seek-file from a sub-folder, same dodo file and cwd
+        os.chdir(str(sub))
+        count, task_list, _ = load(seek_file=True)
+        assert 2 == count
+        assert str(sub) == task_list[1].doc
+        os.chdir(str(sub))
+        assert 2 == load(seek_file=True)[0]
+
+        # -k from dodo folder
+        os.chdir(str(tmpdir))
+        count, task_list, _ = load(seek_file=True)
+        assert 3 == count
+        assert str(tmpdir) == task_list[1].doc
+
 
 
 class TestDoitCmdBase(object):
@@ -229,6 +341,55 @@ class TestDoitCmdBase(object):
         assert isinstance(mycmd.dep_manager.checker, MyChecker)
 
 
+    def testHashWorkers(self, depfile_name):
+        mycmd = self.MyCmd(task_loader=ModuleTaskLoader({}))
+        params, args = CmdParse(mycmd.get_options()).parse(
+            ['--hash-workers', '4'])
+        params['dep_file'] = depfile_name
+        mycmd.execute(params, args)
+        assert 4 == mycmd.dep_manager.hash_workers
+
+
+    def testDbCodec(self, depfile_name):
+        mycmd = self.MyCmd(task_loader=ModuleTaskLoader({}))
+        params, args = CmdParse(mycmd.get_options()).parse(
+            ['--db-codec', 'binary'])
+        params['dep_file'] = depfile_name
+        mycmd.execute(params, args)
+        assert 'binary' == mycmd.dep_manager.backend.codec
+
+
+    def testDbCodecNotSupported(self, depfile_name):
+        mycmd = self.MyCmd(task_loader=ModuleTaskLoader({}))
+        params, args = CmdParse(mycmd.get_options()).parse(
+            ['--db-codec', 'binary', '--backend', 'sqlite3-columnar'])
+        params['dep_file'] = depfile_name
+        pytest.raises(InvalidCommand, mycmd.execute, params, args)
+
+
+    def testDbShards(self, depfile_name):
+        mycmd = self.MyCmd(task_loader=ModuleTaskLoader({}))
+        params, args = CmdParse(mycmd.get_options()).parse(
+            ['--db-shards', '4', '--backend', 'json'])
+        params['dep_file'] = depfile_name
+        mycmd.execute(params, args)
+        backend = mycmd.dep_manager.backend
+        assert isinstance(backend, ShardedDB)
+        assert JsonDB is backend.shard_class
+        assert 4 == backend.num_shards
+
+
+    def testReadOnlyDb(self, depfile_name):
+        class ReadOnlyCmd(self.MyCmd):
+            read_only_db = True
+        mycmd = ReadOnlyCmd(task_loader=ModuleTaskLoader({}))
+        params, args = CmdParse(mycmd.get_options()).parse([])
+        params['dep_file'] = depfile_name
+        mycmd.execute(params, args)
+        assert mycmd.dep_manager.read_only
+        assert mycmd.dep_manager.backend.read_only
+
+
     def testPluginBackend(self, depfile_name):
         mycmd = self.MyCmd(task_loader=ModuleTaskLoader({}),
                            config={'BACKEND': {'j2': 'doit.dependency:JsonDB'}})
@@ -22,6 +22,11 @@ class TestCmdClean(object):
             Task("t4", None, task_dep=['t1'], clean=[(myclean,('t4',))] ),
             ]
 
+    def test_use_task_cache(self):
+        cmd_clean = CmdFactory(Clean)
+        assert cmd_clean.use_task_cache({}, {'clean_actions': False})
+        assert not cmd_clean.use_task_cache({}, {'clean_actions': True})
+
     def test_clean_all(self, tasks):
         output = StringIO()
         cmd_clean = CmdFactory(Clean, outstream=output, task_list=tasks)
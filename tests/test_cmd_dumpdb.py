@@ -1,5 +1,8 @@
+from dbm import whichdb
+
 import pytest
 
+from doit.dependency import DbmDB, Dependency, ShardedDB
 from doit.cmd_dumpdb import DumpDB
 
 class TestCmdDumpDB(object):
@@ -16,3 +19,33 @@ class TestCmdDumpDB(object):
         assert 'tid' in out
         assert 'my_dep' in out
         assert 'xxx' in out
+
+    def testBinaryCodec(self, capsys, depfile):
+        if depfile.whichdb in ('dbm', 'dbm.ndbm'): # pragma: no cover
+            pytest.skip('%s not supported for this operation' % depfile.whichdb)
+        depfile.backend.codec = 'binary'
+        depfile._set('tid', 'my_dep', [1.5, 10, 'abcd'])
+        depfile.close()
+        cmd_dump = DumpDB()
+        cmd_dump.execute({'dep_file': depfile.name}, [])
+        out, err = capsys.readouterr()
+        assert 'tid' in out
+        assert "'my_dep': [1.5, 10, 'abcd']" in out
+
+    def testSharded(self, capsys, depfile_name):
+        dep = Dependency(ShardedDB.wrap(DbmDB, 2), depfile_name)
+        for num in range(6):
+            dep._set('tid%s' % num, 'my_dep', 'xxx')
+        dep.close()
+        db_type = whichdb(dep.backend.shard_name(0))
+        if db_type in ('dbm', 'dbm.ndbm'): # pragma: no cover
+            pytest.skip('%s not supported for this operation' % db_type)
+        assert [] == [name for name in ShardedDB.find_shards(depfile_name)
+                      if name not in dep.backend.shard_names()]
+        cmd_dump = DumpDB()
+        cmd_dump.execute({'dep_file': depfile_name}, [])
+        out, err = capsys.readouterr()
+        for name in dep.backend.shard_names():
+            assert "shard '%s'" % name in out
+        for num in range(6):
+            assert 'tid%s' % num in out
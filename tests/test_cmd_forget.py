@@ -3,7 +3,7 @@ from io import StringIO
 import pytest
 
 from doit.exceptions import InvalidCommand
-from doit.dependency import DbmDB, Dependency
+from doit.dependency import DbmDB, Dependency, ShardedDB
 from doit.cmd_forget import Forget
 from .conftest import tasks_sample, CmdFactory
 
@@ -39,6 +39,21 @@ class TestCmdForget(object):
         for task in tasks:
             assert None == dep._get(task.name, "dep")
 
+    def testForgetSharded(self, tasks, depfile_name):
+        sharded = ShardedDB.wrap(DbmDB, 3)
+        dep = Dependency(sharded, depfile_name)
+        for task in tasks:
+            dep._set(task.name, "dep", "1")
+        dep.close()
+        output = StringIO()
+        cmd_forget = CmdFactory(Forget, outstream=output,
+                                dep_manager=Dependency(sharded, depfile_name),
+                                task_list=tasks, sel_tasks=["t2"])
+        cmd_forget._execute(False)
+        dep = Dependency(sharded, depfile_name)
+        assert None == dep._get("t2", "dep")
+        assert "1" == dep._get("t1", "dep")
+
     def testForgetOne(self, tasks, depfile_name):
         self._add_task_deps(tasks, depfile_name)
         output = StringIO()
@@ -5,6 +5,7 @@ import pytest
 from doit.exceptions import InvalidCommand
 from doit.task import Task
 from doit.cmd_info import Info
+from doit.cmd_stats import format_time
 from .conftest import CmdFactory
 
 class TestCmdInfo(object):
@@ -12,11 +13,26 @@ class TestCmdInfo(object):
     def test_info(self, depfile):
         output = StringIO()
         task = Task("t1", [], file_dep=['tests/data/dependency1'])
-        cmd = CmdFactory(Info, outstream=output,
+        cmd = CmdFactory(Info, outstream=output, dep_manager=depfile,
                          dep_file=depfile.name, task_list=[task])
         cmd._execute(['t1'])
         assert """name:'t1'""" in output.getvalue()
         assert """'tests/data/dependency1'""" in output.getvalue()
+        assert "timing:" not in output.getvalue()
+
+    def test_info_timing(self, depfile):
+        output = StringIO()
+        task = Task("t1", ['echo'])
+        for started in (10.0, 20.0):
+            task.execution_time = (started, started + 2)
+            depfile.save_success(task)
+        cmd = CmdFactory(Info, outstream=output, dep_manager=depfile,
+                         dep_file=depfile.name, task_list=[task])
+        cmd._execute(['t1'])
+        assert ("timing:last 2.000s at {},".format(format_time(20.0))
+                in output.getvalue())
+        assert ("2 runs: mean 2.000s, min 2.000s, max 2.000s"
+                in output.getvalue())
 
     def test_invalid_command_args(self, depfile):
         output = StringIO()
@@ -11,6 +11,11 @@ from tests.conftest import tasks_sample, tasks_bad_sample, CmdFactory
 
 class TestCmdList(object):
 
+    def test_use_task_cache(self):
+        cmd_list = CmdFactory(List)
+        assert cmd_list.use_task_cache({'status': False}, {})
+        assert not cmd_list.use_task_cache({'status': True}, {})
+
     def testQuiet(self):
         output = StringIO()
         tasks = tasks_sample()
@@ -1,4 +1,5 @@
 import os
+import sys
 from io import StringIO
 
 import pytest
@@ -7,7 +8,7 @@ from mock import Mock
 from doit.exceptions import InvalidCommand
 from doit.task import Task
 from doit import reporter, runner
-from doit.cmd_run import Run
+from doit.cmd_run import Run, parse_resources, num_process_type
 from tests.conftest import tasks_sample, CmdFactory
 
 class TestCmdRun(object):
@@ -40,6 +41,27 @@ class TestCmdRun(object):
         got = output.getvalue().split("\n")[:-1]
         assert [".  t1", ".  t2", ".  g1.a", ".  g1.b", ".  t3"] == got
 
+    @pytest.mark.skipif(sys.version_info < (3, 5), reason='requires python 3.5')
+    def testProcessRunAsync(self, dependency1, depfile_name):
+        output = StringIO()
+        cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
+                             task_list=tasks_sample())
+        result = cmd_run._execute(output, num_process=1, par_type='async')
+        assert 0 == result
+        got = output.getvalue().split("\n")[:-1]
+        assert [".  t1", ".  t2", ".  g1.a", ".  g1.b", ".  t3"] == got
+
+    def testProcessRunAuto(self, dependency1, depfile_name):
+        output = StringIO()
+        cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
+                             task_list=tasks_sample())
+        result = cmd_run._execute(output, num_process='auto',
+                                  par_type='thread')
+        assert 0 == result
+        got = output.getvalue().split("\n")[:-1]
+        assert (sorted([".  t1", ".  t2", ".  g1.a", ".  g1.b", ".  t3"]) ==
+                sorted(got))
+
     def testInvalidParType(self, dependency1, depfile_name):
         output = StringIO()
         cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
@@ -93,6 +115,59 @@ class TestCmdRun(object):
         # t3 is a depenendency of g1.b but not included
         assert [".  g1.a", ".  g1.b"] == got
 
+    def testPrefetchSelected(self, depfile_name, monkeypatch):
+        output = StringIO()
+        cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
+                             task_list=tasks_sample(), sel_tasks=["t3"])
+        prefetch = Mock()
+        monkeypatch.setattr(cmd_run.dep_manager, 'prefetch', prefetch)
+        cmd_run._execute(output)
+        assert 1 == prefetch.call_count
+        # selected task and its dependencies
+        assert ['t3', 't1'] == list(prefetch.call_args[0][0])
+
+    def testSchedulerCriticalPath(self, dependency1, depfile_name,
+                                  monkeypatch):
+        output = StringIO()
+        cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
+                             task_list=tasks_sample(), sel_tasks=["t2", "t3"])
+        monkeypatch.setattr(cmd_run.dep_manager, 'get_duration',
+                            {'t1': 5.0, 't2': 1.0}.get)
+        result = cmd_run._execute(output, scheduler='critical-path')
+        assert 0 == result
+        got = output.getvalue().split("\n")[:-1]
+        # t3 (depends on t1) is on the critical path, executed before t2
+        assert [".  t1", ".  t3", ".  t2"] == got
+
+    def testInvalidScheduler(self, depfile_name):
+        output = StringIO()
+        cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
+                             task_list=tasks_sample(), sel_tasks=["t1"])
+        pytest.raises(InvalidCommand, cmd_run._execute,
+                      output, scheduler='xxx')
+
+    def testInvalidCapture(self, depfile_name):
+        output = StringIO()
+        cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
+                             task_list=tasks_sample(), sel_tasks=["t1"])
+        pytest.raises(InvalidCommand, cmd_run._execute,
+                      output, capture='tail:x')
+
+    def testResources(self, depfile_name, monkeypatch):
+        output = StringIO()
+        cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
+                             task_list=tasks_sample(), sel_tasks=["t1"])
+        run_args = []
+        class MockRunner(runner.MThreadRunner):
+            def __init__(self, *args, **kwargs):
+                run_args.extend(args)
+                runner.MThreadRunner.__init__(self, *args, **kwargs)
+        monkeypatch.setattr('doit.cmd_run.MThreadRunner', MockRunner)
+        result = cmd_run._execute(output, num_process=2, par_type='thread',
+                                  resources='cpu=4, mem_gb=1.5')
+        assert 0 == result
+        assert {'cpu': 4, 'mem_gb': 1.5} == run_args[6]
+
     def testProcessRunEmptyFilter(self, depfile_name):
         output = StringIO()
         cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
@@ -142,7 +217,7 @@ class TestCmdRunOptions(object):
         output = StringIO()
         t = Task('x', None)
         used_verbosity = []
-        def my_execute(out, err, verbosity):
+        def my_execute(out, err, verbosity, capture=None):
             used_verbosity.append(verbosity)
         t.execute = my_execute
         cmd_run = CmdFactory(Run, backend='dbm', dep_file=depfile_name,
@@ -162,3 +237,19 @@ class TestCmdRunOptions(object):
         finally:
             if os.path.exists('test.out'):
                 os.remove('test.out')
+
+
+def test_parse_resources():
+    assert {} == parse_resources(None)
+    assert {'cpu': 4} == parse_resources({'cpu': 4})
+    assert {'cpu': 4, 'mem': 2.5} == parse_resources('cpu:4,mem:2.5')
+    assert {'cpu': 4, 'mem': 2.5} == parse_resources('cpu=4,mem=2.5')
+    pytest.raises(InvalidCommand, parse_resources, 'cpu')
+    pytest.raises(InvalidCommand, parse_resources, 'cpu=x')
+    pytest.raises(InvalidCommand, parse_resources, {'cpu': None})
+
+
+def test_num_process_type():
+    assert 'auto' == num_process_type('auto')
+    assert 4 == num_process_type('4')
+    pytest.raises(ValueError, num_process_type, 'xxx')
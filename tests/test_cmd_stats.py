@@ -0,0 +1,90 @@
+from io import StringIO
+
+import pytest
+
+from doit.exceptions import InvalidCommand
+from doit.task import Task
+from doit.cmd_stats import Stats, timing_stats
+from .conftest import CmdFactory
+
+
+def test_timing_stats():
+    assert None == timing_stats([])
+    got = timing_stats([(10, 12), (20, 21), (30, 36)])
+    assert 3 == got['runs']
+    assert 6 == got['last']
+    assert 3 == got['mean']
+    assert 1 == got['min']
+    assert 6 == got['max']
+    assert 2 == got['change']
+    assert 30 == got['started']
+
+
+class TestCmdStats(object):
+
+    @pytest.fixture
+    def tasks(self, depfile):
+        tasks = [Task("t1", ['echo']), Task("t2", ['echo']),
+                 Task("t3", ['echo']),
+                 Task("g1", None, task_dep=['g1:a'], has_subtask=True),
+                 Task("g1:a", ['echo'], is_subtask=True)]
+        # group task without actions is not saved
+        durations = {'t1': [2, 4], 't2': [5], 'g1': [1], 'g1:a': [1]}
+        for task in tasks:
+            for duration in durations.get(task.name, []):
+                task.execution_time = (100, 100 + duration)
+                depfile.save_success(task)
+        return tasks
+
+    def _rows(self, output):
+        lines = output.getvalue().splitlines()
+        assert ['runs', 'last', 'mean', 'min', 'max', 'task'] == lines[0].split()
+        return [line.split() for line in lines[1:]]
+
+    def test_stats(self, depfile, tasks):
+        output = StringIO()
+        cmd = CmdFactory(Stats, outstream=output, dep_manager=depfile,
+                         task_list=tasks)
+        assert 0 == cmd._execute()
+        rows = self._rows(output)
+        # tasks without saved executions are not listed
+        assert ['g1:a', 't1', 't2'] == [row[-1] for row in rows]
+        assert ['2', '4.000', '3.000', '2.000', '4.000', 't1'] == rows[1]
+
+    def test_sort(self, depfile, tasks):
+        output = StringIO()
+        cmd = CmdFactory(Stats, outstream=output, dep_manager=depfile,
+                         task_list=tasks)
+        cmd._execute(sort='mean')
+        assert ['t2', 't1', 'g1:a'] == [row[-1] for row in self._rows(output)]
+
+    def test_filter(self, depfile, tasks):
+        output = StringIO()
+        cmd = CmdFactory(Stats, outstream=output, dep_manager=depfile,
+                         task_list=tasks)
+        cmd._execute(pos_args=['g1', 't2'])
+        assert ['g1:a', 't2'] == [row[-1] for row in self._rows(output)]
+
+    def test_history(self, depfile, tasks):
+        output = StringIO()
+        cmd = CmdFactory(Stats, outstream=output, dep_manager=depfile,
+                         task_list=tasks)
+        cmd._execute(history=True, pos_args=['t1'])
+        lines = output.getvalue().splitlines()
+        assert 4 == len(lines)
+        # most recent first
+        assert lines[2].endswith(' 4.000')
+        assert lines[3].endswith(' 2.000')
+
+    def test_no_history(self, depfile, tasks):
+        output = StringIO()
+        cmd = CmdFactory(Stats, outstream=output, dep_manager=depfile,
+                         task_list=tasks)
+        assert 0 == cmd._execute(history=True, pos_args=['t3'])
+        assert [] == self._rows(output)
+        assert None == depfile.get_duration('t3')
+
+    def test_invalid_task(self, depfile, tasks):
+        cmd = CmdFactory(Stats, outstream=StringIO(), dep_manager=depfile,
+                         task_list=tasks)
+        pytest.raises(InvalidCommand, cmd._execute, pos_args=['xxx'])
@@ -1,3 +1,4 @@
+import random
 from collections import deque
 
 import pytest
@@ -5,7 +6,7 @@ import pytest
 from doit.exceptions import InvalidDodoFile, InvalidCommand
 from doit.task import InvalidTask, Task, DelayedLoader
 from doit.control import TaskControl, TaskDispatcher, ExecNode
-from doit.control import no_none
+from doit.control import no_none, critical_path_priority, PriorityQueue
 
 
 
@@ -52,6 +53,27 @@ class TestTaskControlInit(object):
         TaskControl(tasks)
         assert 'foo4' in tasks[0].task_dep
 
+    def test_wild_order(self):
+        tasks = [Task('foo_b', None), Task('t1', None),
+                 Task('foo_a', None), Task('fo', None), Task('foo', None),
+                 Task('fop', None)]
+        tc = TaskControl(tasks)
+        # same order as tasks were defined
+        assert ['foo_b', 'foo_a', 'foo'] == tc._get_wild_tasks('foo*')
+        assert ['foo_b', 'foo_a'] == tc._get_wild_tasks('foo_?')
+        assert ['foo_b', 'foo_a', 'foo', 'fop'] == tc._get_wild_tasks('fo[op]*')
+        assert ['t1'] == tc._get_wild_tasks('*1')
+        assert [] == tc._get_wild_tasks('bar*')
+        # returned list can be modified without changing cached value
+        tc._get_wild_tasks('foo*').append('xxx')
+        assert ['foo_b', 'foo_a', 'foo'] == tc._get_wild_tasks('foo*')
+
+    def test_implicit_dep_no_duplicate(self):
+        t1 = Task("taskX", None, targets=['a', 'b'])
+        t2 = Task("taskY", None, file_dep=['a', 'b', 'c'], task_dep=['taskX'])
+        TaskControl([t1, t2])
+        assert ['taskX'] == t2.task_dep
+
     def test_bug770150_task_dependency_from_target(self):
         t1 = Task("taskX", None, file_dep=[], targets=['intermediate'])
         t2 = Task("taskY", None, file_dep=['intermediate'], task_dep=['taskZ'])
@@ -164,6 +186,16 @@ class TestTaskControlCmdOptions(object):
         assert (control.tasks['_regex_target_abc:taskZ'].loader.basename ==
                 t3.name)
 
+    def test_filter_delayed_subtask_and_regex(self):
+        t1 = Task("taskX", None)
+        t2 = Task("taskY", None,
+                  loader=DelayedLoader(lambda: None, target_regex='a.*'))
+        control = TaskControl([t1, t2], auto_delayed_regex=False)
+        selected = control._filter_tasks(['taskY:foo', 'abc'])
+        # sub-task created for a delayed task is also matched by regex
+        assert selected == ['taskY:foo', '_regex_target_abc:taskY',
+                            '_regex_target_abc:taskY:foo']
+
     def test_filter_delayed_regex_auto(self):
         t1 = Task("taskX", None)
         t2 = Task("taskY", None,
@@ -219,6 +251,17 @@ class TestExecNode(object):
         node = ExecNode(Task('t1', None), None)
         assert 't1' in repr(node)
 
+    def test_ancestors(self):
+        n1 = ExecNode(Task('t1', None), None)
+        n2 = ExecNode(Task('t2', None), n1)
+        n3 = ExecNode(Task('t3', None), n2)
+        assert ['t1', 't2', 't3'] == n3.ancestors
+        assert n3.has_ancestor('t1')
+        assert n3.has_ancestor('t3')
+        assert not n2.has_ancestor('t3')
+        # ancestors are not copied
+        assert n3.parent is n2
+
     def test_ready_select__not_waiting(self):
         task = Task("t1", None)
         node = ExecNode(task, None)
@@ -289,6 +332,20 @@ class TestTaskDispatcher_GenNone(object):
         n2 = td._gen_node(n1, 't2')
         pytest.raises(InvalidDodoFile, td._gen_node, n2, 't1')
 
+    def test_cyclic_message(self):
+        tasks = {'t1': Task('t1', None),
+                 't2': Task('t2', None),
+                 't3': Task('t3', None),
+                 }
+        td = TaskDispatcher(tasks, [], None)
+        n1 = td._gen_node(None, 't1')
+        n2 = td._gen_node(n1, 't2')
+        n3 = td._gen_node(n2, 't3')
+        with pytest.raises(InvalidDodoFile) as exc_info:
+            td._gen_node(n3, 't2')
+        assert (str(exc_info.value) == "Cyclic/recursive dependencies "
+                "for task t2: [t1 -> t2 -> t3 -> t2]")
+
 
 
 class TestTaskDispatcher_node_add_wait_run(object):
@@ -814,3 +871,98 @@ class TestTaskDispatcher_dispatcher_generator(object):
         nt0 = gen.send(nt1)
         assert nt0.task.name == "t0"
         pytest.raises(StopIteration, lambda gen: next(gen), gen)
+
+
+
+class TestCriticalPathPriority(object):
+    def test_priority(self):
+        tasks = {
+            'a': Task('a', None),
+            'b': Task('b', None),
+            'c': Task('c', None, task_dep=['a', 'b']),
+            'd': Task('d', None, task_dep=['c']),
+            's': Task('s', None),
+            'e': Task('e', None, setup=['s']),
+        }
+        durations = {'a': 1, 'b': 5, 'c': 2, 'd': 3, 's': 1, 'e': None}
+        got = critical_path_priority(tasks, durations, default_duration=10)
+        assert {'a': 6, 'b': 10, 'c': 5, 'd': 3, 's': 11, 'e': 10} == got
+
+    def test_diamond(self):
+        # a <- b, a <- c, (b, c) <- d
+        tasks = {
+            'a': Task('a', None),
+            'b': Task('b', None, task_dep=['a']),
+            'c': Task('c', None, task_dep=['a']),
+            'd': Task('d', None, task_dep=['b', 'c']),
+        }
+        durations = {'a': 1, 'b': 2, 'c': 7, 'd': 3}
+        got = critical_path_priority(tasks, durations)
+        assert {'a': 11, 'b': 5, 'c': 10, 'd': 3} == got
+
+    @staticmethod
+    def reference_priority(tasks, durations):
+        """simple recursive implementation"""
+        def priority(name):
+            dependents = [t.name for t in tasks.values()
+                          if name in t.task_dep]
+            return durations[name] + max(
+                [priority(dep) for dep in dependents], default=0)
+        return dict((name, priority(name)) for name in tasks)
+
+    def test_random_dag(self):
+        rand = random.Random(42)
+        for _ in range(300):
+            names = ['t{}'.format(i) for i in range(8)]
+            tasks = {}
+            for pos, name in enumerate(names):
+                # only depend on tasks defined before (no cycles)
+                task_dep = [dep for dep in names[:pos] if rand.random() < 0.4]
+                tasks[name] = Task(name, None, task_dep=task_dep)
+            durations = dict((name, rand.randint(1, 9)) for name in names)
+            expected = self.reference_priority(tasks, durations)
+            assert expected == critical_path_priority(tasks, durations)
+
+    def test_default_duration(self):
+        tasks = {'a': Task('a', None), 'b': Task('b', None),
+                 'c': Task('c', None)}
+        got = critical_path_priority(tasks, {'a': 1, 'b': 3})
+        assert 2 == got['c']
+        got = critical_path_priority(tasks, {})
+        assert {'a': 1, 'b': 1, 'c': 1} == got
+
+    def test_cyclic(self):
+        tasks = {'a': Task('a', None, task_dep=['b']),
+                 'b': Task('b', None, task_dep=['a'])}
+        got = critical_path_priority(tasks, {'a': 1, 'b': 2})
+        assert set(['a', 'b']) == set(got)
+
+
+class TestPriorityQueue(object):
+    def test_order(self):
+        queue = PriorityQueue({'a': 1, 'b': 5, 'c': 1})
+        for name in ('a', 'b', 'c', 'x'):
+            queue.append(ExecNode(Task(name, None), None))
+        assert 4 == len(queue)
+        got = [queue.popleft().task.name for _ in range(4)]
+        # same priority in FIFO order
+        assert ['b', 'a', 'c', 'x'] == got
+        assert not queue
+
+
+class TestTaskDispatcher_priority(object):
+    def _first_nodes(self, priority):
+        tasks = [Task("a", None),
+                 Task("b", None),
+                 Task("c", None, task_dep=["b"])]
+        control = TaskControl(tasks)
+        control.process(['a', 'c'])
+        gen = control.task_dispatcher(priority).generator
+        return [next(gen).task.name, next(gen).task.name]
+
+    def test_fifo(self):
+        assert ['a', 'b'] == self._first_nodes(None)
+
+    def test_priority(self):
+        priority = {'a': 1, 'b': 7, 'c': 2}
+        assert ['b', 'a'] == self._first_nodes(priority)
@@ -3,15 +3,22 @@ import time
 import sys
 import tempfile
 import uuid
+import hashlib
+import json
 
 import pytest
 
 from doit.task import Task
-from doit.dependency import get_md5, get_file_md5
-from doit.dependency import DbmDB, JsonDB, SqliteDB, Dependency
+from doit import dependency
+from doit.dependency import get_md5, get_file_md5, get_file_hash
+from doit.dependency import DbmDB, JsonDB, SqliteDB, SqliteWalDB, Dependency
+from doit.dependency import SqliteColumnarDB
 from doit.dependency import DatabaseException, UptodateCalculator
 from doit.dependency import FileChangedChecker, MD5Checker, TimestampChecker
-from doit.dependency import DependencyStatus
+from doit.dependency import ContentChecker, SHA256Checker, get_checker_name
+from doit.dependency import DependencyStatus, FileStateCache
+from doit.dependency import encode_record, decode_record, encode_db, decode_db
+from doit.dependency import index_db, decode_db_task, ShardedDB
 from .conftest import get_abspath, depfile
 
 #path to test folder
@@ -32,6 +39,23 @@ def test_md5():
     assert expected == get_file_md5(filePath)
 
 
+@pytest.mark.skipif('not hasattr(hashlib, "blake2b")')
+def test_file_hash():
+    filePath = os.path.join(os.path.dirname(__file__), "sample_md5.txt")
+    assert get_file_md5(filePath) == get_file_hash(filePath, 'md5')
+    with open(filePath, 'rb') as fp:
+        content = fp.read()
+    expected = hashlib.blake2b(content).hexdigest()
+    assert expected == get_file_hash(filePath, 'blake2b')
+
+
+def test_file_hash_mmap(monkeypatch):
+    filePath = os.path.join(os.path.dirname(__file__), "sample_md5.txt")
+    monkeypatch.setattr(dependency, 'MMAP_MIN_SIZE', 1)
+    expected = "45d1503cb985898ab5bd8e58973007dd"
+    assert expected == get_file_hash(filePath, 'md5')
+
+
 def test_sqlite_import():
     """
     Checks that SQLite module is not imported until the SQLite class is instantiated
@@ -66,7 +90,8 @@ def test_sqlite_import():
 @pytest.fixture
 def pdepfile(request):
     return depfile(request)
-pytest.fixture(params=[JsonDB, DbmDB, SqliteDB])(pdepfile)
+pytest.fixture(params=[JsonDB, DbmDB, SqliteDB, SqliteWalDB,
+                        SqliteColumnarDB])(pdepfile)
 
 # FIXME there was major refactor breaking classes from dependency,
 # unit-tests could be more specific to base classes.
@@ -171,6 +196,392 @@ class TestDependencyDb(object):
         assert None == pdepfile._get("taskId_YYY","dep_1")
 
 
+    def test_prefetch(self, pdepfile):
+        pdepfile._set("taskId_XXX", "dep_1", "x")
+        pdepfile._set("taskId_YYY", "dep_1", "y")
+        pdepfile.close()
+        reopened = Dependency(pdepfile.db_class, pdepfile.name)
+        reopened.prefetch(["taskId_XXX", "taskId_YYY", "taskId_ZZZ"])
+        assert "x" == reopened._get("taskId_XXX", "dep_1")
+        assert "y" == reopened._get("taskId_YYY", "dep_1")
+        assert reopened._in("taskId_XXX")
+        assert not reopened._in("taskId_ZZZ")
+        assert None == reopened._get("taskId_ZZZ", "dep_1")
+        reopened._set("taskId_ZZZ", "dep_1", "z")
+        reopened.close()
+        reopened2 = Dependency(pdepfile.db_class, pdepfile.name)
+        assert "z" == reopened2._get("taskId_ZZZ", "dep_1")
+        reopened2.close()
+
+    def test_read_only(self, pdepfile):
+        pdepfile._set("taskId_XXX", "dep_1", "x")
+        pdepfile._set("taskId_YYY", "dep_1", "y")
+        pdepfile.close()
+        read_only = Dependency(pdepfile.db_class, pdepfile.name,
+                               read_only=True)
+        assert read_only.backend.read_only
+        assert "x" == read_only._get("taskId_XXX", "dep_1")
+        # modifications are kept in memory
+        read_only._set("taskId_XXX", "dep_1", "x2")
+        read_only.remove("taskId_YYY")
+        assert "x2" == read_only._get("taskId_XXX", "dep_1")
+        assert None == read_only._get("taskId_YYY", "dep_1")
+        read_only.remove_all()
+        assert None == read_only._get("taskId_XXX", "dep_1")
+        read_only.close()
+        # DB file not modified
+        reopened = Dependency(pdepfile.db_class, pdepfile.name)
+        assert "x" == reopened._get("taskId_XXX", "dep_1")
+        assert "y" == reopened._get("taskId_YYY", "dep_1")
+        reopened.close()
+
+    def test_read_only_no_file(self, pdepfile, depfile_name):
+        read_only = Dependency(pdepfile.db_class, depfile_name,
+                               read_only=True)
+        assert None == read_only._get("taskId_XXX", "dep_1")
+        assert not read_only._in("taskId_XXX")
+        read_only._set("taskId_XXX", "dep_1", "x")
+        read_only.close()
+        assert [] == [f for f in os.listdir(os.path.dirname(depfile_name))
+                      if f.startswith(os.path.basename(depfile_name))]
+
+    def test_read_only_not_supported(self, depfile_name):
+        # plugin backend without read-only mode is never dumped
+        class NoReadOnlyDB(JsonDB):
+            def __init__(self, name):
+                JsonDB.__init__(self, name)
+        dep = Dependency(NoReadOnlyDB, depfile_name, read_only=True)
+        assert dep.read_only
+        assert not dep.backend_read_only
+        dep._set("taskId_XXX", "dep_1", "x")
+        dep.close()
+        assert not os.path.exists(depfile_name)
+
+    def test_read_only_sharded(self, depfile_name):
+        dep = Dependency(ShardedDB.wrap(JsonDB, 2), depfile_name,
+                         read_only=True)
+        assert dep.backend_read_only
+        dep._set("taskId_XXX", "dep_1", "x")
+        dep.close()
+        assert [] == [f for f in os.listdir(os.path.dirname(depfile_name))
+                      if f.startswith(os.path.basename(depfile_name))]
+
+    def test_prefetch_not_supported(self, depfile_name):
+        class NoPrefetchDB(JsonDB):
+            prefetch = None
+        dep = Dependency(JsonDB, depfile_name)
+        dep.backend = NoPrefetchDB(depfile_name)
+        dep.prefetch(['t1']) # nothing happens
+        dep.close()
+
+
+class TestJsonDB(object):
+    def test_dump_format(self, depfile_name):
+        db = JsonDB(depfile_name)
+        db.set('t1', 'a', [1, 2])
+        db.set('t2', 'b', 'x')
+        db.dump()
+        with open(depfile_name) as db_file:
+            assert json.dumps(db._db) == db_file.read()
+
+    def test_dump_not_dirty(self, depfile_name):
+        db = JsonDB(depfile_name)
+        db.set('t1', 'a', 1)
+        db.dump()
+        os.utime(depfile_name, (1, 1))
+        db = JsonDB(depfile_name)
+        assert 1 == db.get('t1', 'a')
+        db.dump()
+        assert 1 == os.path.getmtime(depfile_name)
+        db.remove('t1')
+        db.dump()
+        assert 1 != os.path.getmtime(depfile_name)
+        assert {} == JsonDB(depfile_name)._db
+
+    def test_dump_interrupted(self, depfile_name):
+        db = JsonDB(depfile_name)
+        db.set('t1', 'a', 1)
+        db.dump()
+        db.set('t2', 'a', object()) # not serializable
+        pytest.raises(TypeError, db.dump)
+        # DB file not modified and temporary file removed
+        assert {'t1': {'a': 1}} == JsonDB(depfile_name)._db
+        assert [os.path.basename(depfile_name)] == os.listdir(
+            os.path.dirname(depfile_name))
+
+
+class TestShardedDB(object):
+    @pytest.mark.parametrize('db_class', [JsonDB, DbmDB, SqliteDB,
+                                          SqliteColumnarDB])
+    def test_shards(self, depfile_name, db_class):
+        sharded = ShardedDB.wrap(db_class, 3)
+        assert 'Sharded' + db_class.__name__ == sharded.__name__
+        dep = Dependency(sharded, depfile_name)
+        assert {} == dep.backend._shards
+        names = ['t%s' % n for n in range(10)]
+        for name in names:
+            dep._set(name, 'a', name)
+        assert 3 == len(dep.backend._shards)
+        dep.close()
+
+        dep = Dependency(sharded, depfile_name)
+        shard_index = dep.backend._index('t1')
+        assert 't1' == dep._get('t1', 'a')
+        # only shard containing task was opened
+        assert [shard_index] == list(dep.backend._shards)
+        assert dep._in('t1')
+        dep.remove_many(['t1', 't2'])
+        dep.prefetch(names)
+        for name in names:
+            expected = None if name in ('t1', 't2') else name
+            assert expected == dep._get(name, 'a')
+        dep.remove_all()
+        assert None == dep._get('t3', 'a')
+        dep.close()
+
+    def test_dump_modified_shard(self, depfile_name):
+        dep = Dependency(ShardedDB.wrap(JsonDB, 4), depfile_name)
+        names = ['t%s' % n for n in range(20)]
+        for name in names:
+            dep._set(name, 'a', name)
+        dep.close()
+        shard_names = [dep.backend.shard_name(i) for i in range(4)]
+        assert depfile_name + '.shard-2-of-4' == shard_names[2]
+        for shard_name in shard_names:
+            os.utime(shard_name, (1, 1))
+
+        dep = Dependency(ShardedDB.wrap(JsonDB, 4), depfile_name)
+        dep._set('t1', 'a', 'new')
+        dep.close()
+        modified = [n for n in shard_names if os.path.getmtime(n) != 1]
+        assert [dep.backend.shard_name(dep.backend._index('t1'))] == modified
+
+    def test_find_shards(self, tmpdir):
+        # name with glob special characters
+        name = str(tmpdir.join('dep[1]'))
+        for fname in ('dep[1].shard-1-of-2', 'dep[1].shard-0-of-2.db',
+                      'dep[1].shard-0-of-1', 'dep1.shard-0-of-2',
+                      'dep[1].other', 'dep[1]'):
+            tmpdir.join(fname).write('')
+        assert ([name + '.shard-0-of-1', name + '.shard-0-of-2',
+                 name + '.shard-1-of-2'] == ShardedDB.find_shards(name))
+        assert [] == ShardedDB.find_shards(str(tmpdir.join('xxx', 'dep')))
+
+
+class TestSqliteWalDB(object):
+    def _count(self, name):
+        import sqlite3
+        conn = sqlite3.connect(name)
+        try:
+            return conn.execute('select count(*) from doit').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_wal_mode(self, depfile_name):
+        db = SqliteWalDB(depfile_name)
+        mode = db._conn.execute('pragma journal_mode').fetchone()
+        assert 'wal' == list(mode.values())[0]
+        db.dump()
+
+    def test_flush_count(self, depfile_name, monkeypatch):
+        monkeypatch.setattr(SqliteWalDB, 'flush_count', 2)
+        db = SqliteWalDB(depfile_name)
+        db.set('t1', 'a', 1)
+        db.set('t1', 'b', 1)
+        db.set('t2', 'a', 2)
+        assert 0 == self._count(depfile_name)
+        # flush is done only when another task is modified
+        db.set('t3', 'a', 3)
+        assert 2 == self._count(depfile_name)
+        assert set(['t3']) == db._dirty
+        db.dump()
+        assert 3 == self._count(depfile_name)
+
+    def test_flush_interval(self, depfile_name, monkeypatch):
+        monkeypatch.setattr(SqliteWalDB, 'flush_interval', 0)
+        db = SqliteWalDB(depfile_name)
+        db.set('t1', 'a', 1)
+        db.set('t2', 'a', 2)
+        assert 1 == self._count(depfile_name)
+        db.dump()
+
+
+class TestSqliteColumnarDB(object):
+    def test_schema(self, depfile_name, dependency1):
+        dep = Dependency(SqliteColumnarDB, depfile_name)
+        t1 = Task("t1", None, [dependency1])
+        t1.values = {'x': 1}
+        dep.save_success(t1)
+        dep.close()
+
+        db = SqliteColumnarDB(depfile_name)
+        rows = db._conn.execute(
+            'select path, size, digest, state from file_dep '
+            'where task_id=?', ('t1',)).fetchall()
+        assert [(dependency1, os.path.getsize(dependency1),
+                 get_file_md5(dependency1), None)] == rows
+        values = db._conn.execute(
+            'select key from task_value where task_id=?', ('t1',)).fetchall()
+        assert (set(['_values_:', 'checker:', 'deps:']) ==
+                set(v[0] for v in values))
+        assert {'x': 1} == db.get('t1', '_values_:')
+        # file states not loaded when getting values
+        assert 't1' not in db._files
+        state = db.get('t1', dependency1)
+        assert get_file_md5(dependency1) == state[2]
+        db.dump()
+
+    def test_non_tuple_state(self, depfile_name):
+        db = SqliteColumnarDB(depfile_name)
+        db.set('t1', 'file_a', 1.5)
+        db.dump()
+        db = SqliteColumnarDB(depfile_name)
+        assert 1.5 == db.get('t1', 'file_a')
+        db.dump()
+
+    def test_remove_many(self, depfile_name, monkeypatch):
+        monkeypatch.setattr(SqliteColumnarDB, 'MAX_QUERY_PARAMS', 2)
+        db = SqliteColumnarDB(depfile_name)
+        for name in ('t1', 't2', 't3', 't4'):
+            db.set(name, 'result:', name)
+            db.set(name, 'file_a', 1)
+        db.dump()
+        db = SqliteColumnarDB(depfile_name)
+        db.set('t1', 'x:', 1)
+        db.remove_many(['t1', 't2', 't4'])
+        db.dump()
+        db = SqliteColumnarDB(depfile_name)
+        assert not db.in_('t1')
+        assert not db.in_('t2')
+        assert db.in_('t3')
+        assert not db.in_('t4')
+        db.dump()
+
+    def test_prefetch(self, depfile_name, monkeypatch):
+        monkeypatch.setattr(SqliteColumnarDB, 'MAX_QUERY_PARAMS', 2)
+        db = SqliteColumnarDB(depfile_name)
+        for name in ('t1', 't2', 't3'):
+            db.set(name, 'result:', name)
+            db.set(name, 'file_a', [1, 2, name])
+        db.dump()
+        db = SqliteColumnarDB(depfile_name)
+        db.prefetch(['t1', 't2', 't3', 't4'])
+        assert set(['t1', 't2', 't3', 't4']) == set(db._values)
+        assert set(['t1', 't2', 't3', 't4']) == set(db._files)
+        assert 't2' == db.get('t2', 'result:')
+        assert [1, 2, 't3'] == db.get('t3', 'file_a')
+        assert None == db.get('t4', 'result:')
+        db.dump()
+
+
+class TestBinaryCodec(object):
+    VALUES = {
+        '/path/file1': [1487624400.123456, 1234,
+                        'd41d8cd98f00b204e9800998ecf8427e'],
+        '/path/file2': 1487624400.5,
+        'result:': 'd41d8cd98f00b204e9800998ecf8427e',
+        '_values_:': {'x': [1, 2], 'y': None},
+        'checker:': 'MD5Checker',
+        'deps:': ['/path/file1', '/path/file2'],
+        # not a file state, kept as json
+        'not-hex': [1.5, 2, 'xyz'],
+        'upper-hex': [1.5, 2, 'ABCD'],
+        'int-mtime': [1, 2, 'abcd'],
+        'ignore:': '1',
+    }
+
+    def test_record(self):
+        data = encode_record(self.VALUES)
+        assert data.startswith(b'\xd0\x02')
+        assert self.VALUES == decode_record(data)
+
+    def test_record_smaller_than_json(self):
+        # realistic record, file_dep paths are keys and items of `deps:`
+        paths = ['/home/user/project/src/package/module%s.py' % num
+                 for num in range(50)]
+        values = {'checker:': 'MD5Checker', 'deps:': paths}
+        for num, path in enumerate(paths):
+            values[path] = [1487624400.123456 + num, 12345 + num,
+                            get_md5(str(num))]
+        json_data = json.dumps(values).encode('utf-8')
+        data = encode_record(values)
+        assert values == decode_record(data)
+        assert len(data) * 3 < len(json_data)
+
+    def test_shared_strings(self):
+        values = {'deps:': ['b/x1', 'a', 'b/x2', 'c/\xe7\xe3o'],
+                  'b/x2': 1.5, 'a': [], 'c/\xe7\xe3': ['a', 'b/x1'],
+                  'b/x1': ['a', 1]}
+        assert values == decode_record(encode_record(values))
+
+    def test_non_string_key(self):
+        assert {'null': 1} == decode_record(encode_record({None: 1}))
+
+    def test_decode_json(self):
+        assert {'a': [1, 2]} == decode_record(b'{"a": [1, 2]}')
+
+    def test_unsupported_version(self):
+        data = b'\xd0\x09' + encode_record({})[2:]
+        pytest.raises(DatabaseException, decode_record, data)
+        # version 1 did not share strings
+        data = b'\xd0\x01' + encode_record({})[2:]
+        pytest.raises(DatabaseException, decode_record, data)
+
+    def test_db(self):
+        db = {'t1': self.VALUES, 't2': {}, 't3': {'a': 1}}
+        assert db == decode_db(encode_db(db))
+
+    def test_index_db(self):
+        db = {'t1': self.VALUES, 't2': {}, 't3': {'a': 1}}
+        data = encode_db(db)
+        index = index_db(data)
+        assert set(db) == set(index)
+        assert {'a': 1} == decode_db_task(data, index['t3'])
+
+    def test_json_db_read_only_lazy(self, depfile_name):
+        dep = Dependency(JsonDB, depfile_name, codec='binary')
+        dep._set('t1', 'a', 1)
+        dep._set('t2', 'a', 2)
+        dep.close()
+        db = JsonDB(depfile_name, read_only=True)
+        assert {} == db._db
+        assert set(['t1', 't2']) == set(db._index)
+        assert db.in_('t2')
+        assert 1 == db.get('t1', 'a')
+        assert {'t1': {'a': 1}} == db._db
+        assert ['t2'] == list(db._index)
+        db.remove('t2')
+        assert not db.in_('t2')
+        db.dump()
+        assert db._mmap.closed
+
+    @pytest.mark.parametrize('db_class', [JsonDB, DbmDB, SqliteDB,
+                                          SqliteWalDB])
+    def test_backend(self, depfile_name, db_class, dependency1):
+        # saved with json codec
+        dep = Dependency(db_class, depfile_name)
+        dep._set('t1', 'a', 1)
+        dep._set('t2', 'a', 2)
+        dep.close()
+        # migrated to binary codec
+        dep = Dependency(db_class, depfile_name, codec='binary')
+        assert 'binary' == dep.backend.codec
+        assert 1 == dep._get('t1', 'a')
+        t3 = Task("t3", None, [dependency1])
+        dep.save_success(t3)
+        dep._set('t1', 'a', 10)
+        dep.close()
+        # read with either codec
+        for codec in ('binary', 'json'):
+            dep = Dependency(db_class, depfile_name, codec=codec)
+            assert 10 == dep._get('t1', 'a')
+            assert 2 == dep._get('t2', 'a')
+            state = dep._get('t3', dependency1)
+            assert get_file_md5(dependency1) == state[2]
+            assert 'up-to-date' == dep.get_status(t3, {}).status
+            dep.close()
+
+
 class TestSaveSuccess(object):
 
     def test_save_result(self, pdepfile):
@@ -180,6 +591,38 @@ class TestSaveSuccess(object):
         assert get_md5("result") == pdepfile._get(t1.name, "result:")
         assert get_md5("result") == pdepfile.get_result(t1.name)
 
+    def test_save_duration(self, pdepfile):
+        t1 = Task('t_name', ['echo'])
+        pdepfile.save_success(t1)
+        assert None == pdepfile.get_duration(t1.name)
+        t1.execution_time = (10.0, 12.5)
+        pdepfile.save_success(t1)
+        assert 2.5 == pdepfile.get_duration(t1.name)
+        # duration is taken from timing history
+        assert None == pdepfile._get(t1.name, "duration:")
+        assert [(10.0, 12.5)] == pdepfile.get_timing(t1.name)
+
+    def test_save_duration_no_actions(self, pdepfile):
+        t1 = Task('t_name', None, task_dep=['t2'])
+        t1.execution_time = (10.0, 10.0)
+        pdepfile.save_success(t1)
+        assert None == pdepfile.get_duration(t1.name)
+        assert [] == pdepfile.get_timing(t1.name)
+
+    def test_save_timing_history(self, pdepfile, monkeypatch):
+        monkeypatch.setattr(pdepfile, 'TIMING_HISTORY_SIZE', 3)
+        t1 = Task('t_name', ['echo'])
+        assert [] == pdepfile.get_timing(t1.name)
+        for started in range(5):
+            t1.execution_time = (started, started + 0.5)
+            pdepfile.save_success(t1)
+        expected = [(2, 2.5), (3, 3.5), (4, 4.5)]
+        assert expected == pdepfile.get_timing(t1.name)
+        pdepfile.close()
+        # saved on file
+        dep2 = Dependency(pdepfile.db_class, pdepfile.name)
+        assert expected == dep2.get_timing(t1.name)
+
     def test_save_result_hash(self, pdepfile):
         t1 = Task('t_name', None)
         t1.result = "result"
@@ -327,6 +770,63 @@ class TestMD5Checker(object):
         assert checker.check_modified(dependency1, file_stat, state3)
 
 
+class TestFileStateCache(object):
+    def test_stat_md5(self, dependency1, monkeypatch):
+        cache = FileStateCache()
+        assert os.stat(dependency1) == cache.stat(dependency1)
+        assert get_file_md5(dependency1) == cache.file_hash(dependency1)
+        # values are not computed again
+        monkeypatch.setattr(os, 'stat', None)
+        monkeypatch.setattr('doit.dependency.get_file_hash', None)
+        assert cache.stat(dependency1).st_size
+        assert cache.file_hash(dependency1)
+
+    def test_missing_not_cached(self, dependency1):
+        cache = FileStateCache()
+        path = dependency1 + "_not_there"
+        pytest.raises(OSError, cache.stat, path)
+        assert path not in cache._stat
+
+    def test_invalidate(self, dependency1):
+        cache = FileStateCache()
+        cache.stat(dependency1)
+        cache.file_hash(dependency1)
+        cache.invalidate([dependency1, 'not_cached'])
+        assert dependency1 not in cache._stat
+        assert dependency1 not in cache._hash
+
+    def test_hash_algorithm(self, dependency1):
+        cache = FileStateCache()
+        md5 = cache.file_hash(dependency1, 'md5')
+        sha = cache.file_hash(dependency1, 'sha256')
+        assert md5 != sha
+        assert get_file_hash(dependency1, 'sha256') == sha
+
+    def test_checker_use_cache(self, dependency1):
+        checker = MD5Checker()
+        checker.file_cache = FileStateCache()
+        state = checker.get_state(dependency1, None)
+        assert get_file_md5(dependency1) == state[2]
+        assert dependency1 in checker.file_cache._hash
+        checker.file_cache._hash[dependency1] = ('md5', 'fake')
+        file_stat = os.stat(dependency1)
+        # force md5 check
+        assert checker.check_modified(dependency1, file_stat,
+                                      (0, file_stat.st_size, 'fake')) is False
+
+    def test_dependency_shared_cache(self, depfile_name, dependency1):
+        dep = Dependency(DbmDB, depfile_name, file_state_cache=True)
+        assert dep.checker.file_cache is dep.file_cache
+        t1 = Task("t1", None, [dependency1])
+        t2 = Task("t2", None, [dependency1])
+        dep.save_success(t1)
+        assert dependency1 in dep.file_cache._stat
+        assert 'run' == dep.get_status(t2, {}).status
+        dep.invalidate_files([dependency1])
+        assert dependency1 not in dep.file_cache._stat
+        dep.close()
+
+
 class TestCustomChecker(object):
 
     def test_not_implemented(self, dependency1):
@@ -339,6 +839,24 @@ class TestCustomChecker(object):
                       None, None, None)
 
 
+class TestContentChecker(object):
+    def test_state(self, dependency1):
+        checker = SHA256Checker()
+        state = checker.get_state(dependency1, None)
+        assert get_file_hash(dependency1, 'sha256') == state[2]
+        file_stat = os.stat(dependency1)
+        assert not checker.check_modified(
+            dependency1, file_stat, (0, file_stat.st_size, state[2]))
+        assert checker.check_modified(
+            dependency1, file_stat, (0, file_stat.st_size, 'xxx'))
+
+    @pytest.mark.skipif('not hasattr(hashlib, "blake2b")')
+    def test_checker_name(self):
+        assert 'MD5Checker' == get_checker_name(MD5Checker())
+        assert 'ContentChecker:blake2b' == get_checker_name(ContentChecker())
+        assert 'SHA256Checker:sha256' == get_checker_name(SHA256Checker())
+
+
 class TestTimestampChecker(object):
     def test_timestamp(self, dependency1):
         checker = TimestampChecker()
@@ -483,6 +1001,19 @@ class TestGetStatus(object):
         assert [filePath2] == result.reasons['added_file_dep']
 
 
+    @pytest.mark.skipif('not hasattr(hashlib, "blake2b")')
+    def test_change_hash_algorithm(self, pdepfile, dependency1):
+        t1 = Task("taskId_X", None, [dependency1])
+        pdepfile.checker = ContentChecker()
+        pdepfile.save_success(t1)
+        assert 'up-to-date' == pdepfile.get_status(t1, {}).status
+        pdepfile.checker = SHA256Checker()
+        result = pdepfile.get_status(t1, {}, get_log=True)
+        assert 'run' == result.status
+        assert (('ContentChecker:blake2b', 'SHA256Checker:sha256') ==
+                result.reasons['checker_changed'])
+
+
     def test_file_dependency_not_exist(self, pdepfile):
         filePath = get_abspath("data/dependency_not_exist")
         t1 = Task("t1", None, [filePath])
@@ -688,3 +1219,31 @@ class TestGetStatus(object):
         os.mkdir(folderPath)
         assert 'up-to-date' == pdepfile.get_status(t1, {}).status
         assert [] == t1.dep_changed
+
+
+class TestHashWorkers(object):
+    def test_save_and_status(self, pdepfile, dependency1, dependency2):
+        pdepfile.hash_workers = 4
+        t1 = Task("t1", None, [dependency1, dependency2])
+        assert 'run' == pdepfile.get_status(t1, {}).status
+        assert list(t1.file_dep) == t1.dep_changed
+
+        pdepfile.save_success(t1)
+        assert pdepfile._hash_pool is not None
+        state1 = pdepfile._get("t1", dependency1)
+        assert get_file_md5(dependency1) == state1[2]
+        assert 'up-to-date' == pdepfile.get_status(t1, {}).status
+        assert [] == t1.dep_changed
+
+        # pool is shutdown on close
+        pdepfile.close()
+        assert pdepfile._hash_pool is None
+
+    def test_missing_file_dep(self, pdepfile, dependency1):
+        pdepfile.hash_workers = 2
+        missing = get_abspath("data/dependency_not_exist")
+        t1 = Task("t1", None, [dependency1, missing])
+        assert 'error' == pdepfile.get_status(t1, {}).status
+        result = pdepfile.get_status(t1, {}, get_log=True)
+        assert [missing] == result.reasons['missing_file_dep']
+        assert [dependency1] == result.reasons['changed_file_dep']
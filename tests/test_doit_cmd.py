@@ -4,7 +4,7 @@ import pytest
 from mock import Mock
 
 from doit.exceptions import InvalidCommand
-from doit.cmd_run import Run
+from doit.cmd_run import Run, parse_resources
 from doit.cmd_list import List
 from doit import doit_cmd
 
@@ -50,6 +50,15 @@ class TestRun(object):
         cmd_main(['--z=5'])
         assert None == doit_cmd.get_var('--z')
 
+    def test_resources_option(self, monkeypatch):
+        # documented spelling, value is not taken as a cmdline variable
+        got = []
+        def save_params(self, params, args):
+            got.append(params['resources'])
+        monkeypatch.setattr(Run, "execute", save_params)
+        cmd_main(['-n', '8', '--resources', 'cpu:8,mem_gb:16'])
+        assert {'cpu': 8, 'mem_gb': 16} == parse_resources(got[0])
+
     def test_task_loader_has_cmd_list(self, monkeypatch):
         cmd_names = []
         def save_cmd_names(self, params, args):
@@ -1,5 +1,6 @@
 import os
 import inspect
+from collections import OrderedDict
 
 import pytest
 
@@ -175,6 +176,74 @@ class TestLoadTasks(object):
         assert 'method2' == task_list[1].name
 
 
+    def testLoadWorkers(self):
+        import threading
+        started = threading.Barrier(3, timeout=5)
+        def task_t1():
+            started.wait()
+            for n in range(3):
+                yield {'name': str(n), 'actions':None}
+        def task_t2():
+            started.wait()
+            return {'actions':None}
+        @create_after()
+        def task_t3():
+            return {'actions':None}
+        def task_t4():
+            started.wait()
+            return {'actions':None}
+        namespace = {'task_t4': task_t4, 'task_t3': task_t3,
+                     'task_t2': task_t2, 'task_t1': task_t1}
+        # creators are executed concurrently (all reach the barrier)
+        task_list = load_tasks(namespace, load_workers=3)
+        assert (['t1', 't1:0', 't1:1', 't1:2', 't2', 't3', 't4'] ==
+                [t.name for t in task_list])
+
+    def testLoadWorkersError(self):
+        def task_t1():
+            return {'actions':None}
+        def task_t2():
+            return {'actions':None, 'xxx': 1}
+        def task_t3():
+            return 5
+        namespace = {'task_t1': task_t1, 'task_t2': task_t2,
+                     'task_t3': task_t3}
+        # error from first creator (in definition order) is raised
+        with pytest.raises(InvalidTask) as exc_info:
+            load_tasks(namespace, load_workers=3)
+        assert 'xxx' in str(exc_info.value)
+
+    def testOrderWrappedAndSameLine(self):
+        import functools
+        def task_zzz1():
+            return {'actions':None}
+        @functools.wraps(task_zzz1)
+        def wrapper():
+            return task_zzz1() # pragma: no cover
+        def task_aaa2():
+            return {'actions':None}
+        # same line, sorted by name (independent of namespace order)
+        task_ccc3 = lambda: {'actions':None}; task_bbb4 = lambda: {'actions':None}
+        items = [('task_ccc3', task_ccc3), ('task_bbb4', task_bbb4),
+                 ('task_aaa2', task_aaa2), ('task_zzz1', wrapper)]
+        for namespace in (OrderedDict(items), OrderedDict(reversed(items))):
+            task_list = load_tasks(namespace)
+            assert (['zzz1', 'aaa2', 'bbb4', 'ccc3'] ==
+                    [t.name for t in task_list])
+
+    def testLineNumberFallback(self, monkeypatch):
+        # callable without code object
+        class Creator(object):
+            def __call__(self):
+                return {'actions':None}
+        monkeypatch.setattr(inspect, 'getsourcelines',
+                            lambda ref: ([], 10))
+        creator = Creator()
+        creator.create_doit_tasks = creator
+        task_list = load_tasks({'xxx': creator})
+        assert ['xxx'] == [t.name for t in task_list]
+
+
 class TestDodoConfig(object):
 
     def testConfigType_Error(self):
@@ -102,6 +102,17 @@ class TestConsoleReporter(object):
         # catched message
         assert "catched exception there" in got
 
+    def test_addFailure_output_file(self):
+        rep = reporter.ConsoleReporter(StringIO(), {'show_out': True})
+        task = Task("t_name", [(lambda: None,)])
+        task.actions[0].out = 'tail of output'
+        task.capture_files = ['/tmp/doit-capture-x']
+        rep.add_failure(task, CatchedException("failed"))
+        rep.complete_run()
+        got = rep.outstream.getvalue()
+        assert "tail of output" in got
+        assert "full output saved in: /tmp/doit-capture-x" in got
+
     def test_runtime_error(self):
         msg = "runtime error"
         rep = reporter.ConsoleReporter(StringIO(), {})
@@ -1,4 +1,5 @@
 import os
+import sys
 import pickle
 from multiprocessing import Queue
 import platform
@@ -6,7 +7,7 @@ import platform
 import pytest
 from mock import Mock
 
-from doit.exceptions import InvalidTask
+from doit.exceptions import InvalidTask, TaskError
 from doit.dependency import DbmDB, Dependency
 from doit.reporter import ConsoleReporter
 from doit.task import Task, DelayedLoader
@@ -19,6 +20,8 @@ PLAT_IMPL = platform.python_implementation()
 # sample actions
 def my_print(*args):
     pass
+def print_args(*args):
+    print(*args)
 def _fail():
     return False
 def _error():
@@ -244,6 +247,17 @@ class TestRunner_SelectTask(object):
 
 
 
+class TestRunner_ProcessTaskResult(object):
+    def test_invalidate_targets(self, reporter, depfile_name, dependency1):
+        dep_manager = Dependency(DbmDB, depfile_name, file_state_cache=True)
+        dep_manager.file_cache.stat(dependency1)
+        t1 = Task('t1', [my_print], targets=[dependency1])
+        my_runner = runner.Runner(dep_manager, reporter)
+        my_runner.process_task_result(ExecNode(t1, None), None)
+        assert dependency1 not in dep_manager.file_cache._stat
+        dep_manager.close()
+
+
 class TestTask_Teardown(object):
     def test_ok(self, reporter, dep_manager):
         touched = []
@@ -307,6 +321,9 @@ RUNNERS = [runner.Runner, runner.MThreadRunner]
 # TODO: test should be added and skipped!
 if runner.MRunner.available():
     RUNNERS.append(runner.MRunner)
+if sys.version_info >= (3, 5):
+    from doit.async_runner import AsyncRunner
+    RUNNERS.append(AsyncRunner)
 @pytest.fixture(params=RUNNERS)
 def RunnerClass(request):
     return request.param
@@ -320,6 +337,9 @@ def my_action():
     sys.stdout.write('out here')
     sys.stderr.write('err here')
     return {'bb': 5}
+def print_fail():
+    print('failed here')
+    return False
 def use_args(arg1):
     print(arg1)
 def make_args():
@@ -368,6 +388,29 @@ class TestRunner_run_tasks(object):
         assert ['out here'] == [a.out for a in task.actions]
         assert ['err here'] == [a.err for a in task.actions]
 
+    def test_capture(self, reporter, RunnerClass, dep_manager):
+        task = Task("taskY", [my_action])
+        my_runner = RunnerClass(dep_manager, reporter, capture='tail:0')
+        my_runner.run_tasks(TaskDispatcher({'taskY':task}, [], ['taskY']))
+        assert runner.SUCCESS == my_runner.finish()
+        assert {'bb': 5} == task.result
+        assert [''] == [a.out for a in task.actions]
+        assert [''] == [a.err for a in task.actions]
+
+    def test_capture_file(self, reporter, RunnerClass, dep_manager):
+        t1 = Task("t1", [my_action])
+        t2 = Task("t2", [print_fail], task_dep=['t1'])
+        my_runner = RunnerClass(dep_manager, reporter, capture='file')
+        my_runner.run_tasks(TaskDispatcher({'t1':t1, 't2':t2}, [], ['t2']))
+        assert runner.FAILURE == my_runner.finish()
+        # files of successful actions are removed
+        assert [] == t1.capture_files
+        # path of files from failed action are sent back
+        assert 1 == len(t2.capture_files)
+        with open(t2.capture_files[0]) as fp:
+            assert 'failed here\n' == fp.read()
+        os.remove(t2.capture_files[0])
+
     # whenever a task fails remaining task are not executed
     def test_failureOutput(self, reporter, RunnerClass, dep_manager):
         t1 = Task("t1", [_fail])
@@ -655,10 +698,169 @@ class TestMRunner_get_next_job(object):
         n2.run_status = 'done'
         j1 = run.get_next_job(n2)
         assert t1.name == j1.name
-        # the job for t1 contains the whole task since sub-process dont
-        # have it
-        assert j1.type == runner.JobTask.type
+        # sub-process dont have the task, tasks created by the loader
+        # are pickled in a file
+        assert j1.type == runner.JobTaskLoaded.type
+        assert [t1.name] == [t.name for t in
+                             pickle.load(open(j1.tasks_file, 'rb'))]
+        run._remove_tasks_files()
+        assert not os.path.exists(j1.tasks_file)
+
+    def test_delayed_loaded_pickle_once(self, reporter, dep_manager):
+        def create():
+            for n in range(3):
+                yield {'basename': 't1', 'name': str(n), 'actions': None}
+        t1 = Task('t1', [], loader=DelayedLoader(create))
+        run = runner.MRunner(dep_manager, reporter)
+        run._run_tasks_init(TaskDispatcher({'t1':t1}, [], ['t1']))
+        jobs = [run.get_next_job(None) for _ in range(3)]
+        assert ['t1:0', 't1:1', 't1:2'] == [j.name for j in jobs]
+        assert 1 == len(set(j.tasks_file for j in jobs))
+        assert 1 == run.pickle_count
+        run._remove_tasks_files()
+
+    def test_delayed_loaded_not_picklable(self, reporter, dep_manager):
+        import threading
+        def create():
+            for n in range(2):
+                yield {'basename': 't1', 'name': str(n), 'actions': None}
+            yield {'basename': 't1', 'name': 'lock',
+                   'actions': [(my_print, [threading.Lock()])]}
+        t1 = Task('t1', [], loader=DelayedLoader(create))
+        run = runner.MRunner(dep_manager, reporter)
+        run._run_tasks_init(TaskDispatcher({'t1':t1}, [], ['t1']))
+        # siblings of a task that can not be pickled are sent in file
+        jobs = [run.get_next_job(None) for _ in range(2)]
+        assert ['t1:0', 't1:1'] == [j.name for j in jobs]
+        assert [runner.JobTaskLoaded.type] * 2 == [j.type for j in jobs]
+        assert (['t1', 't1:0', 't1:1'] ==
+                [t.name for t in pickle.load(open(jobs[0].tasks_file, 'rb'))])
+        # only the task that can not be pickled fails
+        job = run.get_next_job(None)
+        assert runner.JobTaskFailed.type is job.type
+        assert 't1:lock' == job.name
+        assert isinstance(job.failure, TaskError)
+        assert 't1:lock' in job.failure.message
+        run._remove_tasks_files()
+
+    def test_resources(self, reporter, dep_manager):
+        t1 = Task('t1', [], resources={'cpu': 3})
+        t2 = Task('t2', [], resources={'cpu': 2, 'mem': 1})
+        t3 = Task('t3', [])
+        run = runner.MRunner(dep_manager, reporter, num_process=3,
+                             resources={'cpu': 4})
+        dispatcher = TaskDispatcher({'t1':t1, 't2':t2, 't3':t3}, [],
+                                    ['t1', 't2', 't3'])
+        run._run_tasks_init(dispatcher)
+        assert t1.name == run.get_next_job(None).name
+        # t2 does not fit, t3 is dispatched before it
+        assert t3.name == run.get_next_job(None).name
+        assert [dispatcher.nodes['t2']] == run.resource_wait
+        # hold process until t1 finishes
+        assert isinstance(run.get_next_job(None), runner.JobHold)
+        assert 1 == run.free_proc
+        assert 3 == run.resources_used['cpu']
+
+        n1 = dispatcher.nodes['t1']
+        n1.run_status = 'done'
+        run._release_resources(t1)
+        assert t2.name == run.get_next_job(n1).name
+        assert 2 == run.resources_used['cpu']
+        assert 1 == run.resources_used['mem']
+        assert [] == run.resource_wait
+        assert None == run.get_next_job(None)
 
+    def test_concurrency_limit(self, reporter, dep_manager):
+        t1 = Task('t1', [])
+        t2 = Task('t2', [])
+        auto = Mock(current=1)
+        run = runner.MRunner(dep_manager, reporter, num_process=2,
+                             concurrency=auto)
+        dispatcher = TaskDispatcher({'t1':t1, 't2':t2}, [], ['t1', 't2'])
+        run._run_tasks_init(dispatcher)
+        assert t1.name == run.get_next_job(None).name
+        assert isinstance(run.get_next_job(None), runner.JobHold)
+        assert 1 == run.running_tasks
+        # limit increased
+        auto.current = 2
+        assert t2.name == run.get_next_job(None).name
+        assert 2 == run.running_tasks
+
+    def test_resources_bigger_than_pool(self, reporter, dep_manager):
+        t1 = Task('t1', [], resources={'cpu': 8})
+        t2 = Task('t2', [], resources={'cpu': 1})
+        run = runner.MRunner(dep_manager, reporter, num_process=2,
+                             resources={'cpu': 4})
+        dispatcher = TaskDispatcher({'t1':t1, 't2':t2}, [], ['t1', 't2'])
+        run._run_tasks_init(dispatcher)
+        # executed when no other task is using resources
+        assert t1.name == run.get_next_job(None).name
+        assert isinstance(run.get_next_job(None), runner.JobHold)
+        run._release_resources(t1)
+        n1 = dispatcher.nodes['t1']
+        n1.run_status = 'done'
+        assert t2.name == run.get_next_job(n1).name
+
+
+
+class TestAutoConcurrency(object):
+    @pytest.fixture
+    def system(self, monkeypatch):
+        state = {'load': 0.5, 'memory': 0.5}
+        monkeypatch.setattr(runner.AutoConcurrency, 'get_load',
+                            staticmethod(lambda: state['load']))
+        monkeypatch.setattr(runner.AutoConcurrency, 'get_memory_available',
+                            staticmethod(lambda: state['memory']))
+        return state
+
+    def test_init(self, system):
+        system['load'] = 2.5
+        auto = runner.AutoConcurrency(cpu_count=4)
+        assert 8 == auto.max_process
+        assert 1 == auto.current # idle CPUs
+        system['load'] = 5.0
+        assert 1 == runner.AutoConcurrency(cpu_count=4).current
+        system['load'] = None
+        assert 4 == runner.AutoConcurrency(cpu_count=4).current
+
+    def test_init_cpu_count(self, system, monkeypatch):
+        system['load'] = None
+        monkeypatch.setattr(runner.multiprocessing, 'cpu_count', lambda: 3)
+        assert 3 == runner.AutoConcurrency().cpu_count
+
+    def test_adjust(self, system):
+        auto = runner.AutoConcurrency(cpu_count=4, max_process=5, interval=0)
+        assert 3 == auto.current
+        # not all slots in use
+        assert 3 == auto.adjust(2)
+        # scale up
+        assert 4 == auto.adjust(3)
+        assert 5 == auto.adjust(4)
+        assert 5 == auto.adjust(5)
+        # overloaded
+        system['load'] = 4.5
+        assert 4 == auto.adjust(5)
+        # low memory
+        system['load'] = 1.0
+        system['memory'] = 0.05
+        assert 3 == auto.adjust(4)
+        auto.current = 1
+        assert 1 == auto.adjust(1)
+
+    def test_adjust_interval(self, system):
+        auto = runner.AutoConcurrency(cpu_count=4, interval=60)
+        assert 3 == auto.adjust(3)
+        auto._last_check -= 61
+        assert 4 == auto.adjust(3)
+
+    def test_get_memory_available(self, tmpdir):
+        meminfo = tmpdir.join('meminfo')
+        meminfo.write('MemTotal:  1000 kB\nMemFree: 100 kB\n'
+                      'MemAvailable:    250 kB\n')
+        assert 0.25 == runner.AutoConcurrency.get_memory_available(
+            str(meminfo))
+        assert None == runner.AutoConcurrency.get_memory_available(
+            str(tmpdir.join('not_there')))
 
 
 @pytest.mark.skipif('not runner.MRunner.available()')
@@ -721,6 +923,13 @@ class TestMRunner_start_process(object):
 def non_pickable_creator():
     return {'basename': 't2', 'actions': [lambda: True]}
 
+def non_pickable_sibling_creator():
+    import threading
+    for name in ('a', 'b'):
+        yield {'basename': 't2', 'name': name, 'actions': [(my_print, [])]}
+    yield {'basename': 't2', 'name': 'lock',
+           'actions': [(my_print, [threading.Lock()])]}
+
 class TestMRunner_parallel_run_tasks(object):
 
     @pytest.mark.skipif('not runner.MRunner.available()')
@@ -733,6 +942,60 @@ class TestMRunner_parallel_run_tasks(object):
         my_runner.run_tasks(dispatcher)
         assert runner.SUCCESS == my_runner.finish()
 
+    @pytest.mark.skipif('not runner.MRunner.available()')
+    def test_task_not_picklable_sibling(self, reporter, dep_manager):
+        t1 = Task("t1", [(my_print, ["out a"])])
+        t2 = Task("t2", None, loader=DelayedLoader(
+            non_pickable_sibling_creator, executed='t1'))
+        my_runner = runner.MRunner(dep_manager, reporter, continue_=True,
+                                   num_process=2)
+        dispatcher = TaskDispatcher({'t1':t1, 't2':t2}, [], ['t1', 't2'])
+        my_runner.run_tasks(dispatcher)
+        assert runner.ERROR == my_runner.finish()
+        results = dict((task.name, status) for status, task in reporter.log
+                       if status in ('success', 'fail'))
+        # group task fails because of its failed sub-task
+        assert {'t1': 'success', 't2:a': 'success', 't2:b': 'success',
+                't2:lock': 'fail', 't2': 'fail'} == results
+
+    def test_resources_thread(self, reporter, dep_manager):
+        t1 = Task("t1", [(my_print, ["out a"])], resources={'cpu': 2})
+        t2 = Task("t2", [(my_print, ["out b"])], resources={'cpu': 2})
+        my_runner = runner.MThreadRunner(dep_manager, reporter, num_process=2,
+                                         resources={'cpu': 3})
+        dispatcher = TaskDispatcher({'t1':t1, 't2':t2}, [], ['t1', 't2'])
+        my_runner.run_tasks(dispatcher)
+        assert runner.SUCCESS == my_runner.finish()
+        # t2 starts only after t1 finishes
+        assert ('success', t1) in reporter.log
+        assert (reporter.log.index(('success', t1)) <
+                reporter.log.index(('execute', t2)))
+        assert 0 == my_runner.resources_used['cpu']
+
+    def test_concurrency_start_processes(self, reporter, dep_manager,
+                                         monkeypatch):
+        tasks = {name: Task(name, [(my_print, [name])])
+                 for name in ('t1', 't2', 't3', 't4')}
+        auto = runner.AutoConcurrency(cpu_count=2, max_process=3, interval=0)
+        auto.current = 1
+        monkeypatch.setattr(auto, 'get_load', lambda: 0)
+        monkeypatch.setattr(auto, 'get_memory_available', lambda: 1)
+        started = []
+        def start_process(self, job_q, result_q):
+            started.append(1)
+            return start_orig(self, job_q, result_q)
+        start_orig = runner.MThreadRunner._start_process
+        monkeypatch.setattr(runner.MThreadRunner, '_start_process',
+                            start_process)
+        my_runner = runner.MThreadRunner(dep_manager, reporter, num_process=3,
+                                         concurrency=auto)
+        dispatcher = TaskDispatcher(tasks, [], sorted(tasks))
+        my_runner.run_tasks(dispatcher)
+        assert runner.SUCCESS == my_runner.finish()
+        # started with one process, more added while executing
+        assert 1 < len(started) <= 3
+        assert 0 == my_runner.running_tasks
+
     def test_task_not_picklabe_thread(self, reporter, dep_manager):
         t1 = Task("t1", [(my_print, ["out a"] )] )
         t2 = Task("t2", None, loader=DelayedLoader(
@@ -779,6 +1042,95 @@ class TestMRunner_execute_task(object):
         assert result_q.get()['task']['result'] == 'my-result'
         assert result_q.empty()
 
+    def test_failed_task(self, reporter, dep_manager):
+        run = runner.MRunner(dep_manager, reporter)
+        task_q = Queue()
+        task_q.put(runner.JobTaskFailed('t1', TaskError('not pickled')))
+        task_q.put(None) # to terminate function
+        result_q = Queue()
+        run.execute_task_subprocess(task_q, result_q, reporter.__class__)
+        run.finish()
+        # failure is sent back, task is not executed
+        result = result_q.get()
+        assert 't1' == result['name']
+        assert 'not pickled' == result['failure'].message
+        assert result_q.empty()
+
+    def test_loaded_task(self, reporter, dep_manager, tmpdir):
+        # tasks created by DelayedLoader are loaded from file
+        run = runner.MRunner(dep_manager, reporter)
+        t1 = Task('t1', [simple_result])
+        t2 = Task('t2', [simple_result])
+        run.tasks = {}
+        tasks_file = str(tmpdir.join('tasks'))
+        with open(tasks_file, 'wb') as fp:
+            fp.write(runner.cloudpickle_tasks([t1, t2], 'loader'))
+        # task state is taken from job
+        t2.options = {'x': 1}
+        task_q = Queue()
+        task_q.put(runner.JobTaskLoaded(t1, tasks_file))
+        task_q.put(runner.JobTaskLoaded(t2, tasks_file))
+        task_q.put(None) # to terminate function
+        result_q = Queue()
+        run.execute_task_subprocess(task_q, result_q, reporter.__class__)
+        run.finish()
+        assert ['t1', 't2'] == sorted(run.tasks)
+        assert {'x': 1} == run.tasks['t2'].options
+        assert result_q.get() == {'name': 't1', 'reporter': 'execute_task'}
+        assert result_q.get()['task']['result'] == 'my-result'
+        assert result_q.get() == {'name': 't2', 'reporter': 'execute_task'}
+        assert result_q.get()['task']['result'] == 'my-result'
+
+    def test_result_delta(self, reporter, dep_manager):
+        run = runner.MRunner(dep_manager, reporter)
+        t1 = Task('t1', [simple_result], file_dep=['a.txt'])
+        run.tasks = {'t1': t1}
+        task_q = Queue()
+        task_q.put(runner.JobTaskPickle(t1))
+        task_q.put(None) # to terminate function
+        result_q = Queue()
+        run.execute_task_subprocess(task_q, result_q, reporter.__class__)
+        run.finish()
+        assert result_q.get() == {'name': 't1', 'reporter': 'execute_task'}
+        result = result_q.get()
+        # only modified attributes
+        assert 'my-result' == result['task']['result']
+        assert 'file_dep' not in result['task']
+        assert 'name' not in result['task']
+
+    def test_spooled_output(self, reporter, dep_manager, monkeypatch):
+        monkeypatch.setattr(runner.SpooledOutput, 'MIN_SIZE', 5)
+        run = runner.MRunner(dep_manager, reporter)
+        t1 = Task('t1', [(print_args, ["out a"]), (print_args, ["b"])])
+        run.tasks = {'t1': t1}
+        task_q = Queue()
+        task_q.put(runner.JobTaskPickle(t1))
+        task_q.put(None) # to terminate function
+        result_q = Queue()
+        run.execute_task_subprocess(task_q, result_q, reporter.__class__)
+        result_q.get() # execute_task
+        result = result_q.get()
+        spooled, small = result['out']
+        assert isinstance(spooled, runner.SpooledOutput)
+        assert os.path.exists(spooled.path)
+        assert "b\n" == small
+
+        # master receives result
+        master_task = Task('t1', [(print_args, ["out a"]),
+                                  (print_args, ["b"])])
+        node = ExecNode(master_task, None)
+        run._process_result(node, master_task, result)
+        assert "out a\n" == master_task.actions[0].out
+        assert "b\n" == master_task.actions[1].out
+        assert not os.path.exists(spooled.path)
+        run.finish()
+
+
+def test_task_state_delta():
+    before = {'a': 1, 'b': [1], 'c': 'x'}
+    after = {'a': 1, 'b': [1, 2], 'c': 'x', 'd': None}
+    assert {'b': [1, 2], 'd': None} == runner.task_state_delta(before, after)
+
 
 
 def test_MThreadRunner_available():
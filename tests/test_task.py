@@ -92,6 +92,24 @@ class TestTaskInit(object):
         pytest.raises(task.InvalidTask,
                       task.Task, "a=1", ["taskcmd"])
 
+    def test_resources(self):
+        assert {} == task.Task("t1", None).resources
+        t = task.Task("t1", None, resources={'cpu': 2, 'mem_gb': 0.5})
+        assert {'cpu': 2, 'mem_gb': 0.5} == t.resources
+        pytest.raises(task.InvalidTask, task.Task, "t1", None,
+                      resources=['cpu'])
+        pytest.raises(task.InvalidTask, task.Task, "t1", None,
+                      resources={'cpu': '2'})
+        pytest.raises(task.InvalidTask, task.Task, "t1", None,
+                      resources={'cpu': -1})
+
+    def test_capture(self):
+        assert None == task.Task("t1", None).capture
+        assert 'tail:8' == task.Task("t1", None, capture='tail:8').capture
+        pytest.raises(task.InvalidTask, task.Task, "t1", None,
+                      capture='tail:x')
+        pytest.raises(task.InvalidTask, task.Task, "t1", None, capture=8)
+
 
 class TestTaskValueSavers(object):
     def test_execute_value_savers(self):
@@ -259,6 +277,48 @@ class TestTaskActions(object):
         t = task.Task("taskX", [PROGRAM])
         t.execute()
 
+    def test_execution_time(self):
+        t = task.Task("taskX", [(lambda: True,)])
+        assert None == t.execution_time
+        t.execute()
+        started, finished = t.execution_time
+        assert started <= finished
+
+    def test_capture(self):
+        t = task.Task("taskX", [(lambda: print('hello'),)])
+        t.execute(capture='none')
+        assert '' == t.actions[0].out
+        # task capture has precedence over default policy
+        t.capture = 'tail:1'
+        t.execute(capture='none')
+        assert 'hello\n' == t.actions[0].out
+
+    def test_execute_steps(self):
+        t = task.Task("taskX", [(lambda: {'x': 1},), (lambda: False,)])
+        steps = t.execute_steps()
+        action1, out, err = next(steps)
+        assert t.actions[0] is action1
+        action2, _, _ = steps.send(action1.execute(out, err))
+        assert {'x': 1} == t.result
+        with pytest.raises(StopIteration) as exc_info:
+            steps.send(action2.execute(out, err))
+        assert isinstance(exc_info.value.value, CatchedException)
+        assert t.execution_time is not None
+
+    def test_capture_file(self):
+        t = task.Task("taskX", [(lambda: print('hello'),)])
+        t.execute(capture='file')
+        # success, file is removed
+        assert [] == t.capture_files
+        assert None == t.actions[0].out_file
+
+        t = task.Task("taskX", [(lambda: (print('hello'), False)[1],)])
+        assert isinstance(t.execute(capture='file'), CatchedException)
+        assert [t.actions[0].out_file] == t.capture_files
+        with open(t.capture_files[0]) as fp:
+            assert 'hello\n' == fp.read()
+        os.remove(t.capture_files[0])
+
 
     def test_result(self):
         # task.result is the value of last action
@@ -0,0 +1,104 @@
+import os
+
+from doit.task import Task, DelayedLoader
+from doit.task_cache import TaskGraphCache
+
+
+def create_tasks():
+    t1 = Task('t1', ['echo t1'], file_dep=['a.txt'], targets=['b.txt'],
+              doc='task one', clean=True)
+    t2 = Task('t2', None, task_dep=['t1'], params=[
+        {'name': 'p1', 'default': '1', 'short': 'p'}])
+    return [t1, t2]
+
+
+class TestTaskGraphCache(object):
+    def test_save_load(self, tmpdir):
+        dodo = tmpdir.join('dodo.py')
+        dodo.write('# tasks')
+        cache = TaskGraphCache(str(tmpdir.join('cache')))
+        assert None == cache.load(str(dodo))
+        assert cache.save(str(dodo), [str(dodo)], create_tasks(),
+                          {'verbosity': 2})
+
+        task_list, config, info = cache.load(str(dodo))
+        assert {'verbosity': 2} == config
+        assert {'clean_actions': False} == info
+        t1, t2 = task_list
+        assert 't1' == t1.name
+        assert {'a.txt'} == t1.file_dep
+        assert ['b.txt'] == t1.targets
+        assert 'task one' == t1.doc
+        assert t1._remove_targets is True
+        # actions are not saved
+        assert [] == t1.actions
+        assert ['t1'] == t2.task_dep
+        assert 'p1' == t2.params[0]['name']
+        assert not t2.is_subtask
+
+    def test_modified_file(self, tmpdir):
+        dodo = tmpdir.join('dodo.py')
+        dodo.write('# tasks')
+        module = tmpdir.join('mod.py')
+        module.write('X = 1')
+        cache = TaskGraphCache(str(tmpdir.join('cache')))
+        cache.save(str(dodo), [str(dodo), str(module)], create_tasks(), {})
+        assert cache.load(str(dodo)) is not None
+
+        # timestamp changed but same content
+        os.utime(str(module), (1, 1))
+        assert cache.load(str(dodo)) is not None
+
+        module.write('X = 2')
+        assert None == cache.load(str(dodo))
+
+    def test_removed_file(self, tmpdir):
+        dodo = tmpdir.join('dodo.py')
+        dodo.write('# tasks')
+        module = tmpdir.join('mod.py')
+        module.write('X = 1')
+        cache = TaskGraphCache(str(tmpdir.join('cache')))
+        cache.save(str(dodo), [str(dodo), str(module)], create_tasks(), {})
+        module.remove()
+        assert None == cache.load(str(dodo))
+
+    def test_other_dodo(self, tmpdir):
+        dodo = tmpdir.join('dodo.py')
+        dodo.write('# tasks')
+        cache = TaskGraphCache(str(tmpdir.join('cache')))
+        cache.save(str(dodo), [str(dodo)], create_tasks(), {})
+        assert None == cache.load(str(tmpdir.join('other.py')))
+
+    def test_clean_actions(self, tmpdir):
+        dodo = tmpdir.join('dodo.py')
+        dodo.write('# tasks')
+        cache = TaskGraphCache(str(tmpdir.join('cache')))
+        tasks = create_tasks() + [Task('t3', None, clean=['rm x'])]
+        cache.save(str(dodo), [str(dodo)], tasks, {})
+        assert {'clean_actions': True} == cache.load(str(dodo))[2]
+
+    def test_not_saved_delayed(self, tmpdir):
+        dodo = tmpdir.join('dodo.py')
+        dodo.write('# tasks')
+        cache = TaskGraphCache(str(tmpdir.join('cache')))
+        tasks = [Task('t3', None, loader=DelayedLoader(create_tasks))]
+        assert not cache.save(str(dodo), [str(dodo)], tasks, {})
+        assert not tmpdir.join('cache').exists()
+
+    def test_not_saved_unpicklable(self, tmpdir):
+        dodo = tmpdir.join('dodo.py')
+        dodo.write('# tasks')
+        cache = TaskGraphCache(str(tmpdir.join('cache')))
+        config = {'reporter': lambda: None}
+        assert not cache.save(str(dodo), [str(dodo)], create_tasks(), config)
+        assert not tmpdir.join('cache').exists()
+
+    def test_other_params(self, tmpdir):
+        dodo = tmpdir.join('dodo.py')
+        dodo.write('# tasks')
+        cache = TaskGraphCache(str(tmpdir.join('cache')))
+        cache.save(str(dodo), [str(dodo)], create_tasks(), {},
+                   {'vars': [('x', '1')]})
+        assert cache.load(str(dodo), {'vars': [('x', '1')]}) is not None
+        assert None == cache.load(str(dodo), {'vars': [('x', '2')]})
+        assert None == cache.load(str(dodo))